@@ -0,0 +1,28 @@
+from django import forms
+
+from apps.workflow.models import Vehicle
+from services.ranking_service import MAX_RANK_LIMIT, METRICS
+
+
+class RankingFilterForm(forms.Form):
+    metric = forms.ChoiceField(choices=[(metric, metric) for metric in METRICS])
+    order = forms.ChoiceField(
+        choices=[("top", "Top"), ("bottom", "Bottom")],
+        required=False,
+    )
+    k = forms.IntegerField(required=False, min_value=1, max_value=MAX_RANK_LIMIT)
+    vehicle_type = forms.ChoiceField(
+        choices=[("", "All")] + Vehicle.VehicleType.choices,
+        required=False,
+    )
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+
+    def clean(self):
+        data = super().clean()
+        if (
+            data.get("date_from") and data.get("date_to")
+            and data["date_from"] > data["date_to"]
+        ):
+            raise forms.ValidationError("date_from must not be after date_to.")
+        return data
@@ -1,3 +1,559 @@
-from django.test import TestCase
+import json
+import threading
+import time
+import warnings
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from asgiref.sync import async_to_sync
+
+from apps.accounts.models import User
+from apps.workflow.models import Vehicle, WorkItem, FuelLog, MaintenanceLog
+from services import finance_service
+from services.kpi_cache import cached_kpi
+from services.ranking_service import rank_vehicles
+from services.db_routing import (
+    PIN_COOKIE,
+    PrimaryPinningMiddleware,
+    analytics_reads,
+)
+
+
+class TestDashboardQueryCounts(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+        self.client.force_login(self.manager)
+
+    def add_vehicle(self, n):
+        vehicle = Vehicle.objects.create(
+            name=f"Truck-{n}",
+            license_plate=f"DASH{n}",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=100,
+        )
+        FuelLog.objects.create(
+            vehicle=vehicle,
+            liters=10,
+            cost=50,
+            odometer_reading=200,
+            date=date(2026, 1, 1),
+        )
+        MaintenanceLog.objects.create(
+            vehicle=vehicle,
+            description="Service",
+            cost=25,
+        )
+        WorkItem.objects.create(
+            title=f"Trip {n}",
+            description="Test",
+            created_by=self.manager,
+            vehicle=vehicle,
+            revenue=500,
+        )
+        return vehicle
+
+    def count_queries(self, url_name):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_financial_analytics_constant_queries(self):
+        self.add_vehicle(1)
+        baseline = self.count_queries("financial_analytics")
+
+        for n in range(2, 6):
+            self.add_vehicle(n)
+
+        self.assertEqual(self.count_queries("financial_analytics"), baseline)
+
+    def test_operational_reports_constant_queries(self):
+        self.add_vehicle(1)
+        baseline = self.count_queries("operational_reports")
+
+        for n in range(2, 8):
+            self.add_vehicle(n)
+
+        self.assertEqual(self.count_queries("operational_reports"), baseline)
+
+    def test_fleet_dashboard_constant_queries(self):
+        self.add_vehicle(1)
+        baseline = self.count_queries("dashboard")
+
+        for n in range(2, 6):
+            self.add_vehicle(n)
+
+        self.assertEqual(self.count_queries("dashboard"), baseline)
+
+    def test_async_financial_analytics_totals(self):
+        self.add_vehicle(1)
+        self.add_vehicle(2)
+
+        response = self.client.get(reverse("financial_analytics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["vehicles"]), 2)
+        self.assertEqual(response.context["total_revenue"], 1000)
+        self.assertEqual(response.context["total_operational_cost"], 2150)
+        self.assertEqual(response.context["total_profit"], -1150)
+        self.assertEqual(response.context["profit_margin"], -115)
+
+    def test_gather_kpis_matches_sync_services(self):
+        self.add_vehicle(1)
+
+        async def collect():
+            return await finance_service.gather_kpis(
+                revenue=finance_service.afleet_total_revenue(),
+                costliest=finance_service.acostliest_vehicles(5),
+            )
+
+        kpis = async_to_sync(collect)()
+
+        self.assertEqual(kpis["revenue"], finance_service.fleet_total_revenue())
+        self.assertEqual(kpis["costliest"], [("Truck-1", 1075)])
+
+
+class TestFleetKPISnapshot(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+
+    def test_snapshot_matches_individual_services(self):
+        for n, status in enumerate(Vehicle.Status.values):
+            vehicle = Vehicle.objects.create(
+                name=f"Truck-{n}",
+                license_plate=f"KPI{n}",
+                vehicle_type=Vehicle.VehicleType.TRUCK,
+                max_capacity=1000,
+                acquisition_cost=1000 + n,
+                odometer_current=100,
+                status=status,
+            )
+            FuelLog.objects.create(
+                vehicle=vehicle,
+                liters=10,
+                cost=40 + n,
+                odometer_reading=150,
+                date=date.today(),
+            )
+        WorkItem.objects.create(
+            title="Trip",
+            description="Test",
+            created_by=self.manager,
+            revenue=900,
+        )
+
+        with self.assertNumQueries(1):
+            snapshot = finance_service.fleet_kpi_snapshot()
+
+        self.assertEqual(snapshot.active_fleet, finance_service.active_fleet())
+        self.assertEqual(
+            snapshot.maintenance_alerts, finance_service.maintenance_alerts()
+        )
+        self.assertEqual(
+            snapshot.utilization_rate, finance_service.utilization_rate()
+        )
+        self.assertEqual(snapshot.pending_cargo, finance_service.pending_cargo())
+        self.assertEqual(
+            snapshot.total_revenue, finance_service.fleet_total_revenue()
+        )
+        self.assertEqual(
+            snapshot.total_operational_cost,
+            finance_service.fleet_total_operational_cost(),
+        )
+        self.assertEqual(snapshot.total_profit, finance_service.fleet_total_profit())
+        self.assertEqual(
+            snapshot.fuel_cost_this_month, finance_service.fuel_cost_this_month()
+        )
+
+    def test_snapshot_on_empty_fleet(self):
+        snapshot = finance_service.fleet_kpi_snapshot()
+
+        self.assertEqual(snapshot.active_fleet, 0)
+        self.assertEqual(snapshot.utilization_rate, 0)
+        self.assertEqual(snapshot.total_revenue, 0)
+        self.assertEqual(snapshot.total_profit, 0)
+
+
+class TestKPICache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.vehicle = Vehicle.objects.create(
+            name="Truck-1",
+            license_plate="CACHE1",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=100,
+        )
+
+    def test_cached_until_dependency_changes(self):
+        self.assertEqual(finance_service.fleet_total_operational_cost(), 1000)
+
+        with self.assertNumQueries(0):
+            finance_service.fleet_total_operational_cost()
+
+        FuelLog.objects.create(
+            vehicle=self.vehicle,
+            liters=10,
+            cost=50,
+            odometer_reading=200,
+            date=date(2026, 1, 1),
+        )
+
+        self.assertEqual(finance_service.fleet_total_operational_cost(), 1050)
+
+    def test_unrelated_change_keeps_entry(self):
+        fuel = FuelLog.objects.create(
+            vehicle=self.vehicle,
+            liters=10,
+            cost=50,
+            odometer_reading=200,
+            date=date(2026, 1, 1),
+        )
+        finance_service.pending_cargo()
+
+        fuel.delete()
+
+        with self.assertNumQueries(0):
+            finance_service.pending_cargo()
+
+    def test_evicted_generation_does_not_revive_old_entries(self):
+        self.assertEqual(finance_service.pending_cargo(), 0)
+        cache.delete("kpi:gen:workflow.workitem")
+
+        WorkItem.objects.create(
+            title="Trip",
+            description="Test",
+            created_by=User.objects.create(username="creator"),
+        )
+        cache.delete("kpi:gen:workflow.workitem")
+
+        self.assertEqual(finance_service.pending_cargo(), 1)
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        @cached_kpi(Vehicle)
+        def slow_kpi():
+            calls.append(1)
+            time.sleep(0.1)
+            return 42
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(slow_kpi()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [42] * 8)
+        self.assertEqual(len(calls), 1)
+
+
+class TestFinanceExport(TestCase):
+
+    def setUp(self):
+        self.analyst = User.objects.create(
+            username="analyst_test",
+            role=User.Role.FINANCIAL_ANALYST
+        )
+        self.client.force_login(self.analyst)
+
+        self.vehicle = Vehicle.objects.create(
+            name="Truck-1",
+            license_plate="EXP1",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=100,
+        )
+        for day in (1, 15, 28):
+            FuelLog.objects.create(
+                vehicle=self.vehicle,
+                liters=10,
+                cost=day,
+                odometer_reading=100 + day,
+                date=date(2026, 2, day),
+            )
+
+    def export(self, fmt, **params):
+        response = self.client.get(
+            reverse("finance_export", args=["fuel-logs", fmt]), params
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export_with_date_range(self):
+        lines = self.export(
+            "csv", date_from="2026-02-10", date_to="2026-02-28"
+        ).splitlines()
+
+        self.assertEqual(lines[0].split(",")[:2], ["id", "vehicle_id"])
+        self.assertEqual(len(lines), 3)
+
+    def test_ndjson_export_with_vehicle_filter(self):
+        rows = [
+            json.loads(line)
+            for line in self.export("ndjson", vehicle=self.vehicle.pk).splitlines()
+        ]
+
+        self.assertEqual([row["cost"] for row in rows], ["1.00", "15.00", "28.00"])
+        self.assertEqual(self.export("ndjson", vehicle=self.vehicle.pk + 1), "")
+
+    async def test_asgi_export_streams_without_buffering(self):
+        await self.async_client.aforce_login(self.analyst)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            response = await self.async_client.get(
+                reverse("finance_export", args=["fuel-logs", "csv"])
+            )
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+
+        self.assertEqual(b"".join(chunks).decode().count("\n"), 4)
+        self.assertFalse(
+            [w for w in caught if "synchronous iterators" in str(w.message)]
+        )
+
+    def test_unknown_dataset_is_404(self):
+        response = self.client.get(
+            reverse("finance_export", args=["users", "csv"])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(ANALYTICS_DB_ALIAS="replica")
+class TestReplicaRouting(TestCase):
+
+    # "replica" is a separate SQLite file under tests, so rows written
+    # to the primary are not visible there.
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+        vehicle = Vehicle.objects.create(
+            name="Truck-1",
+            license_plate="REPL1",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=100,
+        )
+        WorkItem.objects.create(
+            title="Trip",
+            description="Test",
+            created_by=self.manager,
+            vehicle=vehicle,
+            revenue=500,
+        )
+
+    def test_analytics_reads_use_replica(self):
+        with analytics_reads():
+            self.assertEqual(Vehicle.objects.count(), 0)
+        self.assertEqual(Vehicle.objects.count(), 1)
+
+    def test_async_finance_services_read_replica(self):
+        revenue = async_to_sync(finance_service.afleet_total_revenue)()
+        self.assertEqual(revenue, 0)
+
+    def test_writes_pin_reads_to_primary(self):
+        def view(request):
+            with analytics_reads():
+                return HttpResponse(Vehicle.objects.all().db)
+
+        middleware = PrimaryPinningMiddleware(view)
+        factory = RequestFactory()
+
+        self.assertEqual(middleware(factory.get("/")).content, b"replica")
+
+        response = middleware(factory.post("/"))
+        self.assertEqual(response.content, b"default")
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        pinned = factory.get("/")
+        pinned.COOKIES[PIN_COOKIE] = "1"
+        self.assertEqual(middleware(pinned).content, b"default")
+
+    def test_pinned_reads_skip_replica_cached_kpis(self):
+        def view(request):
+            if request.method == "POST":
+                WorkItem.objects.create(
+                    title="Trip",
+                    description="Test",
+                    created_by=self.manager,
+                    revenue=200,
+                )
+            with analytics_reads():
+                return HttpResponse(finance_service.fleet_total_revenue())
+
+        middleware = PrimaryPinningMiddleware(view)
+        factory = RequestFactory()
+
+        self.assertEqual(middleware(factory.post("/")).content, b"700")
+
+        # Another user's unpinned read caches the lagging replica's
+        # figure under the new generation.
+        self.assertEqual(middleware(factory.get("/")).content, b"0")
+
+        pinned = factory.get("/")
+        pinned.COOKIES[PIN_COOKIE] = "1"
+        self.assertEqual(middleware(pinned).content, b"700")
+
+
+class TestVehicleRankings(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+        self.client.force_login(self.manager)
+
+        self.a = self.add_vehicle("Truck-A", Vehicle.VehicleType.TRUCK, 100)
+        self.b = self.add_vehicle("Truck-B", Vehicle.VehicleType.TRUCK, 0)
+        self.c = self.add_vehicle("Van-C", Vehicle.VehicleType.VAN, 400)
+
+        self.fuel(self.a, 500, date(2026, 1, 10))
+        self.fuel(self.a, 50, date(2025, 6, 1))
+        self.fuel(self.b, 900, date(2025, 6, 1))
+        self.fuel(self.c, 200, date(2026, 1, 10))
+
+        self.trip(self.a, revenue=3000, distance=100)
+        self.trip(self.b, revenue=100, distance=50)
+
+    def add_vehicle(self, name, vehicle_type, odometer):
+        return Vehicle.objects.create(
+            name=name,
+            license_plate=name.upper(),
+            vehicle_type=vehicle_type,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=odometer,
+        )
+
+    def fuel(self, vehicle, cost, day):
+        FuelLog.objects.create(
+            vehicle=vehicle,
+            liters=10,
+            cost=cost,
+            odometer_reading=vehicle.odometer_current,
+            date=day,
+        )
+
+    def trip(self, vehicle, revenue, distance):
+        WorkItem.objects.create(
+            title=f"{vehicle.name} trip",
+            description="Test",
+            created_by=self.manager,
+            vehicle=vehicle,
+            revenue=revenue,
+            start_odometer=0,
+            end_odometer=distance,
+        )
+
+    def ranking(self, metric, **kwargs):
+        return [
+            (row["name"], row["rank"], row["type_percentile"])
+            for row in rank_vehicles(metric, **kwargs)
+        ]
+
+    def test_all_time_ranks_and_type_percentiles(self):
+        self.assertEqual(self.ranking("cost"), [
+            ("Truck-B", 1, 1.0), ("Truck-A", 2, 0.0), ("Van-C", 3, 0.0),
+        ])
+        self.assertEqual(
+            [name for name, _, _ in self.ranking("cost", k=2, bottom=True)],
+            ["Van-C", "Truck-A"],
+        )
+        self.assertEqual(
+            [row["value"] for row in rank_vehicles("profit", k=1)],
+            [Decimal("1450.00")],
+        )
+        # Truck-B has no distance and is left out.
+        self.assertEqual(
+            [(row["name"], row["value"]) for row in rank_vehicles("cost_per_km")],
+            [("Truck-A", 15.5), ("Van-C", 3.0)],
+        )
+
+    def test_date_range_uses_period_figures(self):
+        self.assertEqual(
+            [name for name, _, _ in self.ranking(
+                "cost", date_from=date(2026, 1, 1), date_to=date(2026, 12, 31)
+            )],
+            ["Truck-A", "Van-C", "Truck-B"],
+        )
+        self.assertEqual(
+            [name for name, _, _ in self.ranking(
+                "cost", vehicle_type=Vehicle.VehicleType.TRUCK,
+                date_to=date(2025, 12, 31),
+            )],
+            ["Truck-B", "Truck-A"],
+        )
+        self.assertEqual(
+            [name for name, _, _ in self.ranking(
+                "cost_per_km", date_from=date(2000, 1, 1)
+            )],
+            ["Truck-B", "Truck-A"],
+        )
+        self.assertEqual(
+            [row["value"] for row in rank_vehicles(
+                "profit", k=1, date_from=date(2026, 1, 1)
+            )],
+            [Decimal("2500.00")],
+        )
+
+    def test_period_annotations_keep_all_time_methods(self):
+        vehicle = Vehicle.objects.with_period_financials(
+            date_from=date(2026, 1, 1)
+        ).get(pk=self.a.pk)
+
+        self.assertEqual(vehicle.period_fuel_cost, 500)
+        self.assertEqual(vehicle.period_operational_cost, 500)
+        # Acquisition plus all fuel, not the period's figures.
+        self.assertEqual(vehicle.total_operational_cost(), 1550)
+
+    def test_endpoint(self):
+        response = self.client.get(
+            reverse("vehicle_rankings"), {"metric": "revenue", "k": 1}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["name"], "Truck-A")
+        self.assertEqual(response.json()["results"][0]["value"], "3000.00")
+
+        response = self.client.get(reverse("vehicle_rankings"), {"metric": "speed"})
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_login(User.objects.create(
+            username="dispatcher_test", role=User.Role.DISPATCHER
+        ))
+        response = self.client.get(reverse("vehicle_rankings"), {"metric": "cost"})
+        self.assertEqual(response.status_code, 403)
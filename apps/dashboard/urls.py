@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import financial_analytics, fleet_dashboard, operational_reports
+from .views import financial_analytics, fleet_dashboard, operational_reports, finance_export, vehicle_rankings
 
 urlpatterns = [
     path("", fleet_dashboard, name="dashboard"),
     path("financials/", financial_analytics, name="financial_analytics"),
     path("reports/", operational_reports, name="operational_reports"),
+    path("rankings/", vehicle_rankings, name="vehicle_rankings"),
+    path("export/<slug:dataset>.<slug:fmt>", finance_export, name="finance_export"),
 ]
\ No newline at end of file
@@ -1,21 +1,25 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models.functions import TruncMonth
 from django.core.exceptions import PermissionDenied
-from django.db.models import Sum
-from django.http import JsonResponse
+from django.http import HttpResponseBadRequest, JsonResponse
+from dataclasses import asdict
 import json
 from services.finance_service import (
-    fleet_total_revenue,
-    fleet_total_operational_cost,
-    fleet_total_profit,
-    fuel_cost_this_month,
-    active_fleet,
-    maintenance_alerts,
-    utilization_rate,
-    pending_cargo,
+    afleet_kpi_snapshot,
+    afleet_total_revenue,
+    afleet_total_operational_cost,
+    afleet_total_fuel_cost,
+    afleet_total_maintenance_cost,
+    avehicle_financials,
+    acostliest_vehicles,
+    amonthly_totals,
+    gather_kpis,
 )
-from apps.workflow.models import Vehicle, FuelLog, MaintenanceLog, WorkItem
+from services.export_service import build_export_response
+from services.db_routing import analytics_reads
+from apps.workflow.models import MonthlyFinanceRollup
+from services.ranking_service import rank_vehicles
+from .forms import RankingFilterForm
 """
 Fleet dashboard view for FleetFlow.
 
@@ -25,127 +29,144 @@ maintenance alerts, and trip metrics.
 
 Access restricted to Fleet Managers only.
 Business logic is delegated to the finance service layer.
+
+The KPI views are async: independent finance service calls are
+awaited together with asyncio.gather (see services.finance_service
+for when they actually overlap). Their reads go to the analytics
+replica when one is configured (services.db_routing).
 """
 
 @login_required
-def fleet_dashboard(request):
+@analytics_reads()
+async def fleet_dashboard(request):
 
-    if not request.user.is_manager:
+    user = await request.auser()
+    if not user.is_manager:
         raise PermissionDenied("You are not authorized to view this dashboard.")
 
-    context = {
-        "active_fleet": active_fleet(),
-        "maintenance_alerts": maintenance_alerts(),
-        "utilization_rate": utilization_rate(),
-        "pending_cargo": pending_cargo(),
-        "total_revenue": fleet_total_revenue(),
-        "total_operational_cost": fleet_total_operational_cost(),
-        "total_profit": fleet_total_profit(),
-        "fuel_cost_this_month": fuel_cost_this_month(),
-    }
+    # All KPIs in a single round-trip.
+    context = asdict(await afleet_kpi_snapshot())
 
     return render(request, "dashboard/fleet.html", context)
 
 @login_required
-def financial_analytics(request):
+@analytics_reads()
+async def financial_analytics(request):
 
     # RBAC
-    if request.user.role not in [
-        request.user.Role.FLEET_MANAGER,
-        request.user.Role.FINANCIAL_ANALYST,
+    user = await request.auser()
+    if user.role not in [
+        user.Role.FLEET_MANAGER,
+        user.Role.FINANCIAL_ANALYST,
     ]:
         raise PermissionDenied
 
-    vehicles = Vehicle.objects.all()
-
-    total_revenue = WorkItem.objects.aggregate(
-        total=Sum("revenue")
-    )["total"] or 0
-
-    total_fuel_cost = FuelLog.objects.aggregate(
-        total=Sum("cost")
-    )["total"] or 0
-
-    total_maintenance_cost = MaintenanceLog.objects.aggregate(
-        total=Sum("cost")
-    )["total"] or 0
-
-    total_operational_cost = sum(
-        v.total_operational_cost() for v in vehicles
+    # Vehicles come back as a list with financials annotated from the
+    # rollup table; the template's per-row method calls read them.
+    kpis = await gather_kpis(
+        vehicles=avehicle_financials(),
+        total_revenue=afleet_total_revenue(),
+        total_operational_cost=afleet_total_operational_cost(),
+        total_fuel_cost=afleet_total_fuel_cost(),
+        total_maintenance_cost=afleet_total_maintenance_cost(),
     )
 
-    total_profit = total_revenue - total_operational_cost
+    total_revenue = kpis["total_revenue"]
+    total_profit = total_revenue - kpis["total_operational_cost"]
 
     profit_margin = 0
     if total_revenue > 0:
         profit_margin = round((total_profit / total_revenue) * 100, 2)
 
     context = {
-        "vehicles": vehicles,
-        "total_revenue": total_revenue,
-        "total_operational_cost": total_operational_cost,
+        **kpis,
         "total_profit": total_profit,
         "profit_margin": profit_margin,
-        "total_fuel_cost": total_fuel_cost,
-        "total_maintenance_cost": total_maintenance_cost,
     }
 
     return render(request, "dashboard/financial_analytics.html", context)
 
 @login_required
-def operational_reports(request):
+@analytics_reads()
+async def operational_reports(request):
 
-    if request.user.role not in [
-        request.user.Role.FLEET_MANAGER,
-        request.user.Role.FINANCIAL_ANALYST,
+    user = await request.auser()
+    if user.role not in [
+        user.Role.FLEET_MANAGER,
+        user.Role.FINANCIAL_ANALYST,
     ]:
         raise PermissionDenied
 
-    # Monthly Revenue
-    revenue_data = (
-        WorkItem.objects
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(total=Sum("revenue"))
-        .order_by("month")
-    )
-
-    # Monthly Fuel Cost
-    fuel_data = (
-        FuelLog.objects
-        .annotate(month=TruncMonth("date"))
-        .values("month")
-        .annotate(total=Sum("cost"))
-        .order_by("month")
+    # Monthly trends come from the precomputed rollup, so cost is
+    # proportional to months x metrics, not to raw history size.
+    Metric = MonthlyFinanceRollup.Metric
+    kpis = await gather_kpis(
+        revenue_data=amonthly_totals(Metric.REVENUE),
+        fuel_data=amonthly_totals(Metric.FUEL_COST),
+        maintenance_data=amonthly_totals(Metric.MAINTENANCE_COST),
+        vehicle_costs=acostliest_vehicles(5),
     )
 
-    # Monthly Maintenance Cost
-    maintenance_data = (
-        MaintenanceLog.objects
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(total=Sum("cost"))
-        .order_by("month")
-    )
-
-    vehicles = Vehicle.objects.all()
-
-    vehicle_costs = sorted(
-        vehicles,
-        key=lambda v: v.total_operational_cost(),
-        reverse=True
-    )[:5]
-
-    vehicle_labels = [v.name for v in vehicle_costs]
-    # vehicle_values = [v.total_operational_cost() for v in vehicle_costs]
-    vehicle_values = [float(v.total_operational_cost()) for v in vehicle_costs]
+    vehicle_labels = [name for name, _ in kpis["vehicle_costs"]]
+    vehicle_values = [float(cost) for _, cost in kpis["vehicle_costs"]]
 
     context = {
-        "revenue_data": json.dumps(list(revenue_data), default=str),
-        "fuel_data": json.dumps(list(fuel_data), default=str),
-        "maintenance_data": json.dumps(list(maintenance_data), default=str),
+        "revenue_data": json.dumps(kpis["revenue_data"], default=str),
+        "fuel_data": json.dumps(kpis["fuel_data"], default=str),
+        "maintenance_data": json.dumps(kpis["maintenance_data"], default=str),
         "vehicle_labels": json.dumps(vehicle_labels),
         "vehicle_values": json.dumps(vehicle_values),
     }
 
-    return render(request, "dashboard/reports.html", context)
\ No newline at end of file
+    return render(request, "dashboard/reports.html", context)
+
+@login_required
+@analytics_reads()
+def vehicle_rankings(request):
+    """
+    Top / bottom K vehicles by cost, revenue, profit or cost per km
+    for an optional date range, with percentiles within their type.
+    """
+
+    if request.user.role not in [
+        request.user.Role.FLEET_MANAGER,
+        request.user.Role.FINANCIAL_ANALYST,
+    ]:
+        raise PermissionDenied
+
+    filters = RankingFilterForm(request.GET)
+    if not filters.is_valid():
+        return HttpResponseBadRequest(filters.errors.as_text())
+    data = filters.cleaned_data
+
+    rows = rank_vehicles(
+        data["metric"],
+        k=data["k"] or 10,
+        bottom=data["order"] == "bottom",
+        date_from=data["date_from"],
+        date_to=data["date_to"],
+        vehicle_type=data["vehicle_type"],
+    )
+
+    return JsonResponse({
+        "metric": data["metric"],
+        "order": data["order"] or "top",
+        "date_from": data["date_from"],
+        "date_to": data["date_to"],
+        "results": [{**row, "value": str(row["value"])} for row in rows],
+    })
+
+@login_required
+def finance_export(request, dataset, fmt):
+    """
+    Full-history exports for finance reconciliation; streams any
+    dataset in services.export_service.EXPORTS.
+    """
+
+    if request.user.role not in [
+        request.user.Role.FLEET_MANAGER,
+        request.user.Role.FINANCIAL_ANALYST,
+    ]:
+        raise PermissionDenied
+
+    return build_export_response(request, dataset, fmt)
@@ -6,7 +6,27 @@ from .models import (
     MaintenanceLog,
     FuelLog,
     ActivityLog,
+    TripFinancials,
 )
+from .pagination import EstimatedCountPaginator
+from services import trip_search
+
+
+# ==========================
+# Base
+# ==========================
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelists with a fixed number of queries however big the table:
+    subclasses list the relations their columns touch in
+    list_select_related, totals are estimated on large tables, and
+    filtered views skip the second, unfiltered COUNT(*).
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
 
 
 # ==========================
@@ -14,7 +34,7 @@ from .models import (
 # ==========================
 
 @admin.register(Vehicle)
-class VehicleAdmin(admin.ModelAdmin):
+class VehicleAdmin(LargeTableAdmin):
     list_display = (
         "name",
         "license_plate",
@@ -32,7 +52,7 @@ class VehicleAdmin(admin.ModelAdmin):
 # ==========================
 
 @admin.register(WorkItem)
-class WorkItemAdmin(admin.ModelAdmin):
+class WorkItemAdmin(LargeTableAdmin):
     list_display = (
         "title",
         "status",
@@ -41,29 +61,84 @@ class WorkItemAdmin(admin.ModelAdmin):
         "created_by",
         "created_at",
     )
-    list_filter = (
-        "status",
-        "created_at",
-    )
+    list_filter = ("status",)
+    list_select_related = ("vehicle", "driver__user", "created_by")
+    date_hierarchy = "created_at"
     search_fields = (
         "title",
         "description",
     )
     ordering = ("-created_at",)
-    autocomplete_fields = ("created_by",)
+    autocomplete_fields = ("vehicle", "driver", "created_by")
+
+    def get_search_results(self, request, queryset, search_term):
+        # Served by the full-text index instead of icontains scans.
+        if not search_term.strip():
+            return queryset, False
+        return trip_search.matching(queryset, search_term), False
+
+
+# ==========================
+# Driver Admin
+# ==========================
+
+@admin.register(Driver)
+class DriverAdmin(LargeTableAdmin):
+    list_display = ("user", "status", "license_expiry")
+    list_filter = ("status",)
+    list_select_related = ("user",)
+    search_fields = ("user__username",)
+    ordering = ("user__username",)
+    autocomplete_fields = ("user",)
 
 
 # ==========================
-# Other Models
+# Log Admins
 # ==========================
 
-admin.site.register(Driver)
-admin.site.register(MaintenanceLog)
-admin.site.register(FuelLog)
+@admin.register(MaintenanceLog)
+class MaintenanceLogAdmin(LargeTableAdmin):
+    list_display = ("vehicle", "status", "cost", "created_at", "closed_at")
+    list_filter = ("status",)
+    list_select_related = ("vehicle",)
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
+    autocomplete_fields = ("vehicle",)
+
+
+@admin.register(FuelLog)
+class FuelLogAdmin(LargeTableAdmin):
+    list_display = ("vehicle", "trip", "date", "liters", "cost", "odometer_reading")
+    list_select_related = ("vehicle", "trip")
+    date_hierarchy = "date"
+    ordering = ("-date",)
+    autocomplete_fields = ("vehicle",)
+    raw_id_fields = ("trip",)
 
 
 @admin.register(ActivityLog)
-class ActivityLogAdmin(admin.ModelAdmin):
-    list_display = ("work_item", "action", "performed_by", "timestamp")
+class ActivityLogAdmin(LargeTableAdmin):
+    list_display = ("work_item", "from_status", "to_status", "performed_by", "timestamp")
     list_filter = ("timestamp",)
-    ordering = ("-timestamp",)
\ No newline at end of file
+    list_select_related = ("work_item", "performed_by")
+    ordering = ("-timestamp",)
+    raw_id_fields = ("work_item", "performed_by")
+
+
+@admin.register(TripFinancials)
+class TripFinancialsAdmin(LargeTableAdmin):
+    list_display = (
+        "work_item",
+        "vehicle",
+        "driver",
+        "distance",
+        "revenue",
+        "fuel_cost",
+        "profit",
+        "margin",
+        "completed_at",
+    )
+    list_select_related = ("work_item", "vehicle", "driver__user")
+    date_hierarchy = "completed_at"
+    ordering = ("-completed_at",)
+    raw_id_fields = ("work_item", "vehicle", "driver")
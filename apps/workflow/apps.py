@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 
 class WorkflowConfig(AppConfig):
-    name = 'apps.workflow'
\ No newline at end of file
+    name = 'apps.workflow'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,7 +1,22 @@
+from datetime import datetime, time, timedelta
+
 from django import forms
+from django.urls import reverse_lazy
+from django.utils import timezone
 from .models import WorkItem, Vehicle, Driver, MaintenanceLog, FuelLog
 
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
 class TripCreateForm(forms.ModelForm):
+    """
+    Vehicle and driver are submitted by primary key (picked through the
+    autocomplete endpoints), so the form never renders or loads the
+    full choice lists; validation is a single lookup per field.
+    """
+
     class Meta:
         model = WorkItem
         fields = [
@@ -23,11 +38,23 @@ class TripCreateForm(forms.ModelForm):
         self.fields["vehicle"].queryset = Vehicle.objects.filter(
             status=Vehicle.Status.AVAILABLE
         )
+        self.fields["vehicle"].widget = forms.NumberInput(
+            attrs={
+                "placeholder": "Search vehicles",
+                "data-autocomplete": reverse_lazy("vehicle_autocomplete"),
+            }
+        )
 
         # Only show ON_DUTY drivers
         self.fields["driver"].queryset = Driver.objects.filter(
             status=Driver.Status.ON_DUTY
         )
+        self.fields["driver"].widget = forms.NumberInput(
+            attrs={
+                "placeholder": "Search drivers",
+                "data-autocomplete": reverse_lazy("driver_autocomplete"),
+            }
+        )
 
     def clean(self):
         cleaned_data = super().clean()
@@ -47,6 +74,67 @@ class TripCreateForm(forms.ModelForm):
 
         return cleaned_data
     
+class TripFilterForm(forms.Form):
+    """
+    GET filters for the trip board. Vehicle and driver are entered by
+    id so the filter never renders a full choice list.
+    """
+
+    status = forms.ChoiceField(
+        choices=[("", "All statuses")] + WorkItem.TripStatus.choices,
+        required=False,
+    )
+    vehicle = forms.ModelChoiceField(
+        queryset=Vehicle.objects.all(),
+        required=False,
+        widget=forms.NumberInput(attrs={"placeholder": "Vehicle ID"}),
+    )
+    driver = forms.ModelChoiceField(
+        queryset=Driver.objects.all(),
+        required=False,
+        widget=forms.NumberInput(attrs={"placeholder": "Driver ID"}),
+    )
+    date_from = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date"}),
+    )
+    date_to = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date"}),
+    )
+
+    def filter(self, queryset):
+        if not self.is_valid():
+            return queryset
+
+        data = self.cleaned_data
+
+        if data["status"]:
+            queryset = queryset.filter(status=data["status"])
+        if data["vehicle"]:
+            queryset = queryset.filter(vehicle=data["vehicle"])
+        if data["driver"]:
+            queryset = queryset.filter(driver=data["driver"])
+        # Compare against day boundaries rather than created_at__date
+        # so the (created_at, id) indexes stay usable.
+        if data["date_from"]:
+            queryset = queryset.filter(
+                created_at__gte=_start_of_day(data["date_from"])
+            )
+        if data["date_to"]:
+            queryset = queryset.filter(
+                created_at__lt=_start_of_day(data["date_to"] + timedelta(days=1))
+            )
+
+        return queryset
+
+
+class ExportFilterForm(forms.Form):
+    vehicle = forms.IntegerField(required=False, min_value=1)
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+
+
 class MaintenanceForm(forms.ModelForm):
     class Meta:
         model = MaintenanceLog
@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.workflow.models import ActivityLog
+from services.activity_archive import FIELDS, ArchiveWriter, archive_dir
+
+"""
+Move old ActivityLog rows to the compressed archive.
+
+Rows older than --older-than days are streamed in primary-key order,
+written to this run's file of their month partition
+(services.activity_archive) and, once the batch is on disk, deleted with one DELETE per batch. Memory
+use is bounded by --batch-size however many rows qualify.
+"""
+
+
+class Command(BaseCommand):
+    help = "Archive ActivityLog rows older than N days to gzip JSONL and delete them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            required=True,
+            metavar="DAYS",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many rows would be archived.",
+        )
+
+    def handle(self, *args, **options):
+        if options["older_than"] < 0:
+            raise CommandError("--older-than must not be negative.")
+
+        cutoff = timezone.now() - timedelta(days=options["older_than"])
+        batch_size = options["batch_size"]
+        old = ActivityLog.objects.filter(timestamp__lt=cutoff)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{old.count()} rows older than {cutoff:%Y-%m-%d} would be archived.")
+            return
+
+        archived = 0
+        last_pk = 0
+        with ArchiveWriter() as writer:
+            while True:
+                rows = list(
+                    old.filter(pk__gt=last_pk)
+                    .order_by("pk")
+                    .values_list(*FIELDS)[:batch_size]
+                )
+                if not rows:
+                    break
+
+                for row in rows:
+                    writer.write(row)
+                writer.sync()
+
+                ids = [row[0] for row in rows]
+                ActivityLog.objects.filter(pk__in=ids).delete()
+
+                archived += len(rows)
+                last_pk = ids[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Archived {archived} activity rows to {archive_dir()}.")
+        )
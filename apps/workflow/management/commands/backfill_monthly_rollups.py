@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from apps.workflow.models import (
+    WorkItem,
+    FuelLog,
+    MaintenanceLog,
+    MonthlyFinanceRollup,
+)
+from services.kpi_cache import invalidate_kpis
+
+"""
+Rebuild the MonthlyFinanceRollup table from raw history.
+
+Runs one GROUP BY (month, vehicle) per source table and replaces
+the rollup contents in a single transaction. Needed once after the
+table is created and whenever drift is suspected.
+"""
+
+# metric -> (model, amount field, month source field)
+SOURCES = {
+    MonthlyFinanceRollup.Metric.FUEL_COST: (FuelLog, "cost", "date"),
+    MonthlyFinanceRollup.Metric.MAINTENANCE_COST: (
+        MaintenanceLog, "cost", "created_at"
+    ),
+    MonthlyFinanceRollup.Metric.REVENUE: (WorkItem, "revenue", "created_at"),
+}
+
+
+def _as_date(value):
+    # TruncMonth over a DateTimeField yields a datetime.
+    return value.date() if hasattr(value, "date") else value
+
+
+class Command(BaseCommand):
+    help = "Rebuild MonthlyFinanceRollup from trips, fuel and maintenance logs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        rows = []
+
+        for metric, (model, field, month_field) in SOURCES.items():
+            grouped = (
+                model.objects
+                .annotate(month=TruncMonth(month_field))
+                .values_list("month", "vehicle_id")
+                .annotate(total=Sum(field))
+                .order_by()
+            )
+            for month, vehicle_id, total in grouped.iterator(chunk_size=batch_size):
+                if total:
+                    rows.append(
+                        MonthlyFinanceRollup(
+                            month=_as_date(month),
+                            vehicle_id=vehicle_id,
+                            metric=metric,
+                            amount=total,
+                        )
+                    )
+
+        with transaction.atomic():
+            MonthlyFinanceRollup.objects.all().delete()
+            MonthlyFinanceRollup.objects.bulk_create(rows, batch_size=batch_size)
+
+        invalidate_kpis(MonthlyFinanceRollup)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {len(rows)} monthly rollup rows.")
+        )
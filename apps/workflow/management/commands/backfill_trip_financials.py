@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+
+from apps.workflow.models import TripFinancials, WorkItem
+from services.trip_financials import completion_times, snapshot_trips
+
+"""
+Create TripFinancials snapshots for completed trips.
+
+By default only trips without a snapshot are processed; --refresh
+recomputes every completed trip (e.g. after fuel logs were attached
+late). Trips are read in primary-key batches and each batch costs a
+fixed number of queries. The completion time comes from the trip's
+COMPLETED audit entry, or its updated_at once that entry has been
+archived.
+"""
+
+
+class Command(BaseCommand):
+    help = "Backfill (or with --refresh, recompute) per-trip P&L snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--refresh",
+            action="store_true",
+            help="Recompute existing snapshots too.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        trips = WorkItem.objects.filter(status=WorkItem.TripStatus.COMPLETED)
+        if not options["refresh"]:
+            trips = trips.exclude(
+                pk__in=TripFinancials.objects.values("work_item_id")
+            )
+
+        written = 0
+        last_pk = 0
+        while True:
+            batch = list(trips.filter(pk__gt=last_pk).order_by("pk")[:batch_size])
+            if not batch:
+                break
+
+            snapshot_trips(
+                batch, completed_at=completion_times([trip.pk for trip in batch])
+            )
+
+            written += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {written} trip financial snapshots.")
+        )
@@ -0,0 +1,279 @@
+import json
+import math
+import time
+from decimal import Decimal
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Avg, Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from apps.accounts.models import User
+from apps.workflow.management.commands.seed_fleet import USER_PREFIX, clear_seeded
+from apps.workflow.models import MonthlyFinanceRollup
+from services import columnar_analytics, finance_service
+from services.metrics import RequestStats
+
+"""
+Latency and query-count benchmark for FleetFlow views and services.
+
+For each --sizes value the fleet is reseeded with seed_fleet
+(--vehicles N --months M), then every target is run --repeat times
+and its p50 / p95 latency and query count are reported. The KPI cache
+is cleared before each run unless --warm is given, so the numbers
+reflect the queries rather than cache hits.
+
+Results print as a table, or as JSON with --json (a path, or - for
+stdout). Budgets from settings.BENCH_BUDGETS, overlaid with --budget
+<file>, map target names to {"p95_ms": ..., "queries": ...}; any
+target over budget at any size makes the command fail.
+
+The comparison targets "orm:fleet_statistics" and
+"numpy:fleet_statistics" compute the same per-vehicle, per-type and
+per-month statistics of fuel, maintenance and revenue amounts, once
+with ORM aggregates plus Decimal percentiles and once with
+services.columnar_analytics.
+
+Seeded rows are removed afterwards unless --keep is given. Run it
+against a development database, never production.
+"""
+
+VIEWS = [
+    "dashboard",
+    "financial_analytics",
+    "operational_reports",
+    "trip-management",
+    "fuel_management",
+]
+
+SERVICES = {
+    "fleet_kpi_snapshot": finance_service.fleet_kpi_snapshot,
+    "fleet_total_operational_cost": finance_service.fleet_total_operational_cost,
+    "vehicle_financials": finance_service.vehicle_financials,
+    "costliest_vehicles": finance_service.costliest_vehicles,
+    "monthly_totals": lambda: finance_service.monthly_totals(
+        MonthlyFinanceRollup.Metric.REVENUE
+    ),
+}
+
+
+def percentile(samples, pct):
+    # Nearest-rank percentile.
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _interpolated(ordered, pct):
+    position = (len(ordered) - 1) * pct / 100
+    low = math.floor(position)
+    high = math.ceil(position)
+    return ordered[low] + (ordered[high] - ordered[low]) * Decimal(position - low)
+
+
+def orm_fleet_statistics():
+    """
+    Reference for columnar_analytics.fleet_statistics() on the ORM:
+    grouped aggregates in SQL, percentiles over Decimal values in
+    Python.
+    """
+    result = {}
+    for metric, (model, field, date_field) in columnar_analytics.SOURCES.items():
+        rows = model.objects.filter(**{f"{field}__isnull": False})
+        month = (
+            TruncMonth(TruncDate(date_field))
+            if date_field == "created_at" else TruncMonth(date_field)
+        )
+        groupings = {
+            "by_vehicle": F("vehicle_id"),
+            "by_type": F("vehicle__vehicle_type"),
+            "by_month": month,
+        }
+        result[metric] = {}
+        for name, key in groupings.items():
+            grouped = rows.annotate(key=key).order_by("key")
+            values = {}
+            for group, amount in grouped.values_list("key", field).order_by("key", field):
+                values.setdefault(group, []).append(amount)
+            result[metric][name] = [
+                {
+                    **row,
+                    **{
+                        f"p{pct}": _interpolated(values[row["key"]], pct)
+                        for pct in columnar_analytics.PERCENTILES
+                    },
+                }
+                for row in grouped.values("key").annotate(
+                    count=Count("pk"),
+                    sum=Sum(field),
+                    min=Min(field),
+                    max=Max(field),
+                    mean=Avg(field),
+                )
+            ]
+    return result
+
+
+COMPARISONS = {
+    "orm:fleet_statistics": orm_fleet_statistics,
+    "numpy:fleet_statistics": columnar_analytics.fleet_statistics,
+}
+
+
+class Command(BaseCommand):
+    help = "Benchmark dashboard/workflow views and finance services at several data sizes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="10,100",
+            help="Comma-separated vehicle counts to seed (default: 10,100).",
+        )
+        parser.add_argument("--months", type=int, default=12)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--no-seed",
+            action="store_true",
+            help="Benchmark the current data once instead of seeding.",
+        )
+        parser.add_argument("--warm", action="store_true", help="Keep the KPI cache between runs.")
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded data.")
+        parser.add_argument("--json", help="Write JSON results to this path (- for stdout).")
+        parser.add_argument("--budget", help="JSON file of per-target budgets.")
+
+    def handle(self, *args, **options):
+        self.repeat = options["repeat"]
+        self.warm = options["warm"]
+        if self.repeat < 1:
+            raise CommandError("--repeat must be positive.")
+
+        if options["no_seed"]:
+            sizes = [None]
+        else:
+            try:
+                sizes = [int(size) for size in options["sizes"].split(",")]
+            except ValueError:
+                raise CommandError("--sizes must be comma-separated integers.")
+
+        budgets = dict(getattr(settings, "BENCH_BUDGETS", {}))
+        if options["budget"]:
+            with open(options["budget"]) as fh:
+                budgets.update(json.load(fh))
+
+        results = []
+        try:
+            for size in sizes:
+                if size is not None:
+                    call_command(
+                        "seed_fleet",
+                        vehicles=size,
+                        months=options["months"],
+                        clear=True,
+                        stdout=self.stderr,
+                    )
+                results.extend(self.run_size(size))
+        finally:
+            if not options["keep"] and sizes != [None]:
+                clear_seeded()
+
+        violations = [
+            violation
+            for result in results
+            for violation in self.check_budget(result, budgets.get(result["target"]))
+        ]
+
+        report = {"sizes": sizes, "results": results, "violations": violations}
+        if options["json"] == "-":
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            if options["json"]:
+                with open(options["json"], "w") as fh:
+                    json.dump(report, fh, indent=2)
+            self.write_table(results)
+
+        if violations:
+            raise CommandError(
+                "Budget exceeded:\n" + "\n".join(f"  {v}" for v in violations)
+            )
+
+    # ==========================================================
+    # Measurement
+    # ==========================================================
+
+    def run_size(self, size):
+        user, _ = User.objects.get_or_create(
+            username=f"{USER_PREFIX}bench",
+            defaults={"role": User.Role.FLEET_MANAGER},
+        )
+        client = Client()
+        client.force_login(user)
+
+        results = []
+        # The test client's default host must pass host validation.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for name in VIEWS:
+                url = reverse(name)
+
+                def request(url=url):
+                    response = client.get(url)
+                    if response.status_code != 200:
+                        raise CommandError(f"GET {url} returned {response.status_code}.")
+
+                results.append(self.measure(f"view:{name}", size, request))
+
+        for name, func in SERVICES.items():
+            results.append(self.measure(f"service:{name}", size, func))
+
+        for target, func in COMPARISONS.items():
+            results.append(self.measure(target, size, func))
+
+        return results
+
+    def measure(self, target, size, func):
+        timings, queries = [], []
+        for _ in range(self.repeat):
+            if not self.warm:
+                caches[getattr(settings, "KPI_CACHE_ALIAS", "default")].clear()
+
+            stats = RequestStats()
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                start = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(stats.queries)
+
+        return {
+            "target": target,
+            "size": size,
+            "p50_ms": round(percentile(timings, 50), 2),
+            "p95_ms": round(percentile(timings, 95), 2),
+            "queries": max(queries),
+        }
+
+    def check_budget(self, result, budget):
+        if not budget:
+            return
+        for key in ("p95_ms", "queries"):
+            if key in budget and result[key] > budget[key]:
+                yield (
+                    f"{result['target']} at size {result['size']}: "
+                    f"{key} {result[key]} > {budget[key]}"
+                )
+
+    def write_table(self, results):
+        self.stdout.write(
+            f"{'target':<40} {'size':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}"
+        )
+        for r in results:
+            size = "-" if r["size"] is None else r["size"]
+            self.stdout.write(
+                f"{r['target']:<40} {size:>6} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['queries']:>8}"
+            )
@@ -0,0 +1,240 @@
+import csv
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from apps.workflow.models import (
+    Vehicle,
+    WorkItem,
+    FuelLog,
+    VehicleFinancials,
+    MonthlyFinanceRollup,
+)
+from services import trip_financials
+from services.kpi_cache import invalidate_kpis
+
+"""
+Bulk import of fuel-card CSV exports.
+
+Batched equivalent of saving FuelLog rows one by one:
+- field values are validated with the model fields' own clean()
+- odometer readings are checked per vehicle in date order against
+  the vehicle's current odometer and the previously accepted row
+- accepted rows are written with bulk_create in chunks; each chunk
+  advances vehicle odometers with one UPDATE and applies its
+  VehicleFinancials / MonthlyFinanceRollup deltas and refreshes the
+  TripFinancials snapshots of the completed trips it touches
+- rejected rows are written to a side CSV with the reason
+
+Expected columns: license_plate, date (YYYY-MM-DD), liters, cost,
+odometer_reading, and optionally trip_id.
+"""
+
+REQUIRED_COLUMNS = ("license_plate", "date", "liters", "cost", "odometer_reading")
+
+Parsed = namedtuple("Parsed", ["rows", "vehicles", "known_trips"])
+
+
+class Command(BaseCommand):
+    help = "Import fuel logs from a CSV file in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+        )
+        parser.add_argument(
+            "--rejects",
+            help="Where to write rejected rows (default: <csv_path>.rejects.csv).",
+        )
+
+    def handle(self, *args, **options):
+        path = options["csv_path"]
+        batch_size = options["batch_size"]
+        rejects_path = options["rejects"] or f"{path}.rejects.csv"
+
+        try:
+            source = open(path, newline="")
+        except OSError as exc:
+            raise CommandError(f"Cannot open {path}: {exc}")
+
+        with source, open(rejects_path, "w", newline="") as rejects_file:
+            reader = csv.DictReader(source)
+            missing = set(REQUIRED_COLUMNS) - set(reader.fieldnames or [])
+            if missing:
+                raise CommandError(
+                    f"Missing columns: {', '.join(sorted(missing))}"
+                )
+
+            rejects = csv.writer(rejects_file)
+            rejects.writerow(["line", *reader.fieldnames, "error"])
+
+            self.rejected = 0
+
+            def reject(line, raw, error):
+                self.rejected += 1
+                rejects.writerow(
+                    [line, *(raw.get(name, "") for name in reader.fieldnames), error]
+                )
+
+            parsed = self._parse(reader, reject)
+            accepted = self._check_odometers(parsed, reject)
+
+        imported = 0
+        for start in range(0, len(accepted), batch_size):
+            imported += self._write_batch(accepted[start:start + batch_size])
+
+        invalidate_kpis(FuelLog)
+        invalidate_kpis(Vehicle)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} fuel logs; {self.rejected} rejected "
+                f"(see {rejects_path})."
+            )
+        )
+
+    # ----------------------------------------------------------
+    # Parsing
+    # ----------------------------------------------------------
+
+    def _parse(self, reader, reject):
+        fields = {
+            name: FuelLog._meta.get_field(name)
+            for name in ("liters", "cost", "odometer_reading", "date")
+        }
+
+        rows = []
+        plates = set()
+        trip_ids = set()
+
+        # line 1 is the header
+        for line, raw in enumerate(reader, start=2):
+            try:
+                plate = (raw["license_plate"] or "").strip()
+                if not plate:
+                    raise ValidationError("license_plate is required.")
+
+                values = {
+                    name: field.clean(raw[name], None)
+                    for name, field in fields.items()
+                }
+
+                trip_id = (raw.get("trip_id") or "").strip()
+                values["trip_id"] = int(trip_id) if trip_id else None
+            except (ValidationError, ValueError) as exc:
+                message = "; ".join(getattr(exc, "messages", [str(exc)]))
+                reject(line, raw, message)
+                continue
+
+            plates.add(plate)
+            if values["trip_id"]:
+                trip_ids.add(values["trip_id"])
+            rows.append((line, raw, plate, values))
+
+        vehicles = {
+            plate: (pk, odometer)
+            for pk, plate, odometer in Vehicle.objects.filter(
+                license_plate__in=plates
+            ).values_list("pk", "license_plate", "odometer_current")
+        }
+        known_trips = set(
+            WorkItem.objects.filter(pk__in=trip_ids).values_list("pk", flat=True)
+        )
+
+        return Parsed(rows, vehicles, known_trips)
+
+    # ----------------------------------------------------------
+    # Validation
+    # ----------------------------------------------------------
+
+    def _check_odometers(self, parsed, reject):
+        by_vehicle = defaultdict(list)
+
+        for line, raw, plate, values in parsed.rows:
+            if plate not in parsed.vehicles:
+                reject(line, raw, f"Unknown vehicle {plate}.")
+                continue
+            if values["trip_id"] and values["trip_id"] not in parsed.known_trips:
+                reject(line, raw, f"Unknown trip {values['trip_id']}.")
+                continue
+            by_vehicle[plate].append((line, raw, values))
+
+        accepted = []
+        for plate, entries in by_vehicle.items():
+            vehicle_id, odometer = parsed.vehicles[plate]
+            entries.sort(key=lambda e: (e[2]["date"], e[2]["odometer_reading"], e[0]))
+
+            for line, raw, values in entries:
+                if values["odometer_reading"] < odometer:
+                    reject(
+                        line,
+                        raw,
+                        "Odometer reading cannot be less than vehicle's "
+                        f"current odometer ({odometer}).",
+                    )
+                    continue
+                odometer = values["odometer_reading"]
+                accepted.append(FuelLog(vehicle_id=vehicle_id, **values))
+
+        return accepted
+
+    # ----------------------------------------------------------
+    # Writing
+    # ----------------------------------------------------------
+
+    def _write_batch(self, logs):
+        odometers = {}
+        fuel_totals = defaultdict(Decimal)
+        monthly_totals = defaultdict(Decimal)
+        trip_ids = set()
+
+        for log in logs:
+            odometers[log.vehicle_id] = max(
+                odometers.get(log.vehicle_id, 0), log.odometer_reading
+            )
+            fuel_totals[log.vehicle_id] += log.cost
+            monthly_totals[(log.date.replace(day=1), log.vehicle_id)] += log.cost
+            if log.trip_id:
+                trip_ids.add(log.trip_id)
+
+        with transaction.atomic():
+            FuelLog.objects.bulk_create(logs)
+
+            # One UPDATE for every vehicle touched by this batch; never
+            # moves an odometer backwards.
+            Vehicle.objects.filter(pk__in=odometers).update(
+                odometer_current=Greatest(
+                    F("odometer_current"),
+                    Case(
+                        *(When(pk=pk, then=Value(reading))
+                          for pk, reading in odometers.items()),
+                        default=F("odometer_current"),
+                        output_field=PositiveIntegerField(),
+                    ),
+                )
+            )
+
+            for vehicle_id, total in fuel_totals.items():
+                VehicleFinancials.apply_delta(vehicle_id, fuel_cost=total)
+            for (month, vehicle_id), total in monthly_totals.items():
+                MonthlyFinanceRollup.apply_delta(
+                    month,
+                    vehicle_id,
+                    MonthlyFinanceRollup.Metric.FUEL_COST,
+                    total,
+                )
+
+            # bulk_create skips the post_save snapshot refresh; only
+            # completed trips have a snapshot to recompute.
+            if trip_ids:
+                trip_financials.refresh_snapshots(trip_ids)
+
+        return len(logs)
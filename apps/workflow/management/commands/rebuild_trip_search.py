@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from services.trip_search import rebuild
+
+"""
+Rebuild the SQLite full-text index over trips.
+
+Recreates the FTS5 table and its sync triggers when missing (Django
+drops the triggers whenever it rebuilds workflow_workitem during a
+migration) and reindexes every trip. On PostgreSQL the generated
+search_vector column needs no maintenance and this does nothing.
+"""
+
+
+class Command(BaseCommand):
+    help = "Recreate and repopulate the trip full-text index (SQLite)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default="default",
+        )
+
+    def handle(self, *args, **options):
+        if rebuild(options["database"]):
+            self.stdout.write(self.style.SUCCESS("Trip search index rebuilt."))
+        else:
+            self.stdout.write("Nothing to rebuild on this database backend.")
@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.workflow.models import Vehicle, VehicleFinancials
+from services.kpi_cache import invalidate_kpis
+
+"""
+Rebuild or verify the VehicleFinancials rollup.
+
+Recomputes every vehicle's fuel, maintenance and revenue totals
+from the raw logs and compares them with the rollup table.
+Drifted or missing rows are rewritten unless --verify is given.
+"""
+
+COLUMNS = {
+    "fuel_cost": "fuel_cost_sum",
+    "maintenance_cost": "maintenance_cost_sum",
+    "revenue": "revenue_sum",
+}
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or with --verify, only check) the VehicleFinancials rollup."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Report drift without writing; exit with an error if any is found.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+        )
+
+    def handle(self, *args, **options):
+        verify = options["verify"]
+        batch_size = options["batch_size"]
+
+        drifted = []
+        checked = 0
+
+        vehicles = (
+            Vehicle.objects
+            .with_financials()
+            .order_by("pk")
+            .values("pk", *COLUMNS.values())
+        )
+        stored = {
+            row["vehicle_id"]: row
+            for row in VehicleFinancials.objects.values(
+                "vehicle_id", *COLUMNS
+            ).iterator(chunk_size=batch_size)
+        }
+
+        for row in vehicles.iterator(chunk_size=batch_size):
+            checked += 1
+            current = stored.get(row["pk"])
+            expected = {column: row[alias] for column, alias in COLUMNS.items()}
+
+            if current is None or any(
+                current[column] != value for column, value in expected.items()
+            ):
+                drifted.append(VehicleFinancials(vehicle_id=row["pk"], **expected))
+
+        if verify:
+            for rollup in drifted:
+                self.stdout.write(f"Drift: vehicle {rollup.vehicle_id}")
+            if drifted:
+                raise CommandError(
+                    f"{len(drifted)} of {checked} vehicle rollups have drifted."
+                )
+            self.stdout.write(self.style.SUCCESS(f"{checked} vehicle rollups verified."))
+            return
+
+        with transaction.atomic():
+            VehicleFinancials.objects.bulk_create(
+                drifted,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=["vehicle"],
+                update_fields=list(COLUMNS),
+            )
+
+        if drifted:
+            invalidate_kpis(VehicleFinancials)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Repaired {len(drifted)} of {checked} vehicle rollups."
+            )
+        )
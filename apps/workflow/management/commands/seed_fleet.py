@@ -0,0 +1,386 @@
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.workflow.models import (
+    Vehicle,
+    Driver,
+    WorkItem,
+    FuelLog,
+    MaintenanceLog,
+    ActivityLog,
+    VehicleFinancials,
+    MonthlyFinanceRollup,
+    TripFinancials,
+)
+from services.kpi_cache import invalidate_kpis
+
+"""
+Synthetic fleet data for benchmarking.
+
+Generates --vehicles vehicles (each with its own driver) and --months
+months of history per vehicle: trips with revenue and odometer
+ranges, refuelling every few hundred km, periodic maintenance, and
+activity log entries for each trip. A handful of vehicles end up in
+the shop or on an active trip so every dashboard widget has data.
+
+Rows are written with bulk_create in batches. auto_now_add stamps
+created_at at insert time, so the back-dated values are restored with
+one CASE UPDATE per batch (_bulk_create_backdated). Bulk writes skip
+signals, so the VehicleFinancials and MonthlyFinanceRollup tables are
+rebuilt at the end.
+
+Seeded rows are recognisable by the SEED- plate / seed_ username
+prefix; --clear removes them first.
+"""
+
+PLATE_PREFIX = "SEED-"
+USER_PREFIX = "seed_"
+
+CITIES = [
+    "Ahmedabad", "Mumbai", "Pune", "Surat", "Jaipur",
+    "Delhi", "Indore", "Vadodara", "Nagpur", "Rajkot",
+]
+
+# vehicle type -> (capacity kg, acquisition cost, km per litre)
+PROFILES = {
+    Vehicle.VehicleType.TRUCK: (12000, 2500000, 4),
+    Vehicle.VehicleType.VAN: (1500, 900000, 11),
+    Vehicle.VehicleType.BIKE: (40, 90000, 45),
+}
+
+FUEL_PRICE = 96.5
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic vehicles, drivers, trips and logs with bulk_create."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--vehicles", type=int, default=50)
+        parser.add_argument("--months", type=int, default=12)
+        parser.add_argument(
+            "--trips-per-month",
+            type=int,
+            default=8,
+            help="Trips per vehicle per month.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete previously seeded rows first.",
+        )
+
+    def handle(self, *args, **options):
+        if options["vehicles"] < 1 or options["months"] < 1:
+            raise CommandError("--vehicles and --months must be positive.")
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.trips_per_month = options["trips_per_month"]
+
+        if options["clear"]:
+            clear_seeded()
+        elif Vehicle.objects.filter(license_plate__startswith=PLATE_PREFIX).exists():
+            raise CommandError("Seeded data already exists; pass --clear to replace it.")
+
+        today = timezone.localdate()
+        self.months = [
+            _add_months(today.replace(day=1), -offset)
+            for offset in reversed(range(options["months"]))
+        ]
+        self.today = today
+
+        with transaction.atomic():
+            owner = User.objects.create(
+                username=f"{USER_PREFIX}manager",
+                role=User.Role.FLEET_MANAGER,
+                password=make_password(None),
+            )
+            vehicles, drivers = self.create_vehicles(options["vehicles"])
+
+            totals = {"trips": 0, "fuel": 0, "maintenance": 0, "activity": 0}
+            step = max(1, self.batch_size // (self.trips_per_month * len(self.months)))
+            for start in range(0, len(vehicles), step):
+                counts = self.create_history(
+                    vehicles[start:start + step],
+                    drivers[start:start + step],
+                    owner,
+                )
+                for key, value in counts.items():
+                    totals[key] += value
+
+        # Bulk writes bypass the rollup signals.
+        call_command("rebuild_vehicle_financials", stdout=self.stdout)
+        call_command("backfill_monthly_rollups", stdout=self.stdout)
+        call_command("backfill_trip_financials", stdout=self.stdout)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {len(vehicles)} vehicles, {len(drivers)} drivers, "
+                f"{totals['trips']} trips, {totals['fuel']} fuel logs, "
+                f"{totals['maintenance']} maintenance logs and "
+                f"{totals['activity']} activity entries."
+            )
+        )
+
+    # ==========================================================
+    # Generators
+    # ==========================================================
+
+    def create_vehicles(self, count):
+        rng = self.rng
+        types = list(PROFILES)
+
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f"{USER_PREFIX}driver_{n}",
+                    role=User.Role.DISPATCHER,
+                    password=make_password(None),
+                )
+                for n in range(count)
+            ],
+            batch_size=self.batch_size,
+        )
+        drivers = Driver.objects.bulk_create(
+            [
+                Driver(
+                    user=user,
+                    license_expiry=self.today + timedelta(days=rng.randint(-30, 1500)),
+                    status=rng.choices(
+                        [Driver.Status.ON_DUTY, Driver.Status.OFF_DUTY, Driver.Status.SUSPENDED],
+                        weights=[80, 17, 3],
+                    )[0],
+                )
+                for user in users
+            ],
+            batch_size=self.batch_size,
+        )
+
+        vehicles = []
+        for n in range(count):
+            vehicle_type = types[n % len(types)]
+            capacity, cost, _ = PROFILES[vehicle_type]
+            vehicles.append(
+                Vehicle(
+                    name=f"{vehicle_type.label} {n + 1:05d}",
+                    license_plate=f"{PLATE_PREFIX}{n:06d}",
+                    vehicle_type=vehicle_type,
+                    max_capacity=capacity,
+                    acquisition_cost=_money(cost * rng.uniform(0.8, 1.2)),
+                    odometer_current=rng.randint(0, 50000),
+                )
+            )
+        for vehicle in vehicles:
+            vehicle.created_at = self.random_moment(self.months[0])
+        vehicles = _bulk_create_backdated(Vehicle, vehicles, self.batch_size)
+
+        return vehicles, drivers
+
+    def create_history(self, vehicles, drivers, owner):
+        rng = self.rng
+        trips, fuel_logs, maintenance_logs = [], [], []
+
+        for vehicle, driver in zip(vehicles, drivers):
+            capacity, _, km_per_litre = PROFILES[vehicle.vehicle_type]
+            odometer = vehicle.odometer_current
+            since_refuel = 0
+
+            for month in self.months:
+                moments = sorted(
+                    self.random_moment(month) for _ in range(self.trips_per_month)
+                )
+                for when in moments:
+                    distance = rng.randint(20, 600)
+                    origin, destination = rng.sample(CITIES, 2)
+                    trips.append(
+                        WorkItem(
+                            title=f"{origin} to {destination}",
+                            description="Seeded trip",
+                            origin=origin,
+                            destination=destination,
+                            status=rng.choices(
+                                [WorkItem.TripStatus.COMPLETED, WorkItem.TripStatus.CANCELLED],
+                                weights=[92, 8],
+                            )[0],
+                            vehicle=vehicle,
+                            driver=driver,
+                            cargo_weight=_money(capacity * rng.uniform(0.2, 1.0)),
+                            start_odometer=odometer,
+                            end_odometer=odometer + distance,
+                            revenue=_money(distance * rng.uniform(30, 90)),
+                            estimated_fuel_cost=_money(distance / km_per_litre * FUEL_PRICE),
+                            created_by=owner,
+                            created_at=when,
+                        )
+                    )
+                    odometer += distance
+                    since_refuel += distance
+
+                    if since_refuel >= km_per_litre * 60:
+                        liters = since_refuel / km_per_litre
+                        fuel_logs.append(
+                            FuelLog(
+                                vehicle=vehicle,
+                                liters=_money(liters),
+                                cost=_money(liters * FUEL_PRICE * rng.uniform(0.95, 1.05)),
+                                odometer_reading=odometer,
+                                date=when.date(),
+                            )
+                        )
+                        since_refuel = 0
+
+                if rng.random() < 0.3:
+                    opened = self.random_moment(month)
+                    maintenance_logs.append(
+                        MaintenanceLog(
+                            vehicle=vehicle,
+                            description=rng.choice(
+                                ["Oil change", "Brake pads", "Tyre replacement", "Engine service"]
+                            ),
+                            cost=_money(rng.uniform(1500, 40000)),
+                            status=MaintenanceLog.Status.CLOSED,
+                            created_at=opened,
+                            closed_at=opened + timedelta(days=rng.randint(0, 3)),
+                        )
+                    )
+
+            vehicle.odometer_current = odometer
+
+            # Current state: a few vehicles in the shop, some mid-trip.
+            roll = rng.random()
+            if roll < 0.05:
+                vehicle.status = Vehicle.Status.IN_SHOP
+                maintenance_logs.append(
+                    MaintenanceLog(
+                        vehicle=vehicle,
+                        description="Awaiting parts",
+                        cost=_money(rng.uniform(1500, 40000)),
+                        created_at=timezone.now(),
+                    )
+                )
+            elif roll < 0.25 and driver.status == Driver.Status.ON_DUTY:
+                vehicle.status = Vehicle.Status.ON_TRIP
+                trips[-1].status = WorkItem.TripStatus.IN_PROGRESS
+                trips[-1].end_odometer = None
+
+        _bulk_create_backdated(WorkItem, trips, self.batch_size)
+        FuelLog.objects.bulk_create(fuel_logs, batch_size=self.batch_size)
+        _bulk_create_backdated(MaintenanceLog, maintenance_logs, self.batch_size)
+
+        Vehicle.objects.bulk_update(
+            vehicles, ["odometer_current", "status"], batch_size=self.batch_size
+        )
+
+        Status = WorkItem.TripStatus
+        activity = []
+        for trip in trips:
+            if trip.status == Status.CANCELLED:
+                path = [Status.DRAFT, Status.CANCELLED]
+            else:
+                path = [Status.DRAFT, Status.DISPATCHED, Status.IN_PROGRESS]
+                if trip.status == Status.COMPLETED:
+                    path.append(Status.COMPLETED)
+            for n, (from_status, to_status) in enumerate(zip(path, path[1:])):
+                activity.append(
+                    ActivityLog(
+                        work_item=trip,
+                        action=f"Status changed to {to_status}",
+                        from_status=from_status,
+                        to_status=to_status,
+                        performed_by=owner,
+                        timestamp=trip.created_at + timedelta(hours=(n + 1) * 2),
+                    )
+                )
+        ActivityLog.objects.bulk_create(activity, batch_size=self.batch_size)
+
+        return {
+            "trips": len(trips),
+            "fuel": len(fuel_logs),
+            "maintenance": len(maintenance_logs),
+            "activity": len(activity),
+        }
+
+    # ==========================================================
+    # Helpers
+    # ==========================================================
+
+    def random_moment(self, month):
+        last = min(_add_months(month, 1) - timedelta(days=1), self.today)
+        day = month + timedelta(days=self.rng.randint(0, (last - month).days))
+        return timezone.make_aware(
+            datetime.combine(day, time(self.rng.randint(6, 21), self.rng.randint(0, 59)))
+        )
+
+
+def _bulk_create_backdated(model, objs, batch_size):
+    """
+    bulk_create ``objs``, then put back the created_at values that
+    auto_now_add overwrote, with one CASE UPDATE per batch.
+    """
+    moments = [obj.created_at for obj in objs]
+    objs = model.objects.bulk_create(objs, batch_size=batch_size)
+
+    for start in range(0, len(objs), batch_size):
+        batch = list(zip(objs[start:start + batch_size], moments[start:start + batch_size]))
+        model.objects.filter(pk__in=[obj.pk for obj, _ in batch]).update(
+            created_at=Case(
+                *[When(pk=obj.pk, then=Value(moment)) for obj, moment in batch],
+                output_field=DateTimeField(),
+            )
+        )
+        for obj, moment in batch:
+            obj.created_at = moment
+
+    return objs
+
+
+def _money(value):
+    return Decimal(f"{value:.2f}")
+
+
+def _add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def clear_seeded():
+    """
+    Delete seeded rows leaf-first. The vehicles' rollup rows go first,
+    so the per-row rollup handlers QuerySet.delete() runs for logs and
+    trips find nothing left to adjust.
+    """
+    vehicles = Vehicle.objects.filter(license_plate__startswith=PLATE_PREFIX)
+    users = User.objects.filter(username__startswith=USER_PREFIX)
+    querysets = [
+        VehicleFinancials.objects.filter(vehicle__in=vehicles),
+        MonthlyFinanceRollup.objects.filter(vehicle__in=vehicles),
+        ActivityLog.objects.filter(work_item__vehicle__in=vehicles),
+        FuelLog.objects.filter(vehicle__in=vehicles),
+        MaintenanceLog.objects.filter(vehicle__in=vehicles),
+        TripFinancials.objects.filter(work_item__vehicle__in=vehicles),
+        WorkItem.objects.filter(vehicle__in=vehicles),
+        vehicles,
+        Driver.objects.filter(user__in=users),
+        users,
+    ]
+    with transaction.atomic():
+        for queryset in querysets:
+            queryset.delete()
+
+    for model in (FuelLog, MaintenanceLog, WorkItem, Vehicle):
+        invalidate_kpis(model)
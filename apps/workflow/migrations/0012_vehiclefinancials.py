@@ -0,0 +1,63 @@
+# Generated by Django 6.0.2 on 2026-10-18 05:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_vehicle_financials(apps, schema_editor):
+    Vehicle = apps.get_model('workflow', 'Vehicle')
+    FuelLog = apps.get_model('workflow', 'FuelLog')
+    MaintenanceLog = apps.get_model('workflow', 'MaintenanceLog')
+    WorkItem = apps.get_model('workflow', 'WorkItem')
+    VehicleFinancials = apps.get_model('workflow', 'VehicleFinancials')
+
+    def totals(model, field):
+        return dict(
+            model.objects
+            .exclude(vehicle=None)
+            .values_list('vehicle_id')
+            .annotate(total=Sum(field))
+            .order_by()
+        )
+
+    fuel = totals(FuelLog, 'cost')
+    maintenance = totals(MaintenanceLog, 'cost')
+    revenue = totals(WorkItem, 'revenue')
+
+    VehicleFinancials.objects.bulk_create(
+        [
+            VehicleFinancials(
+                vehicle_id=vehicle_id,
+                fuel_cost=fuel.get(vehicle_id) or 0,
+                maintenance_cost=maintenance.get(vehicle_id) or 0,
+                revenue=revenue.get(vehicle_id) or 0,
+            )
+            for vehicle_id in Vehicle.objects.values_list('pk', flat=True).iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0011_workitem_destination_workitem_estimated_fuel_cost_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleFinancials',
+            fields=[
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='financials', serialize=False, to='workflow.vehicle')),
+                ('fuel_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('maintenance_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'vehicle financials',
+            },
+        ),
+        migrations.RunPython(backfill_vehicle_financials, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 6.0.2 on 2026-10-18 05:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_monthly_rollups(apps, schema_editor):
+    MonthlyFinanceRollup = apps.get_model('workflow', 'MonthlyFinanceRollup')
+    sources = {
+        'fuel_cost': (apps.get_model('workflow', 'FuelLog'), 'cost', 'date'),
+        'maintenance_cost': (apps.get_model('workflow', 'MaintenanceLog'), 'cost', 'created_at'),
+        'revenue': (apps.get_model('workflow', 'WorkItem'), 'revenue', 'created_at'),
+    }
+
+    rows = []
+    for metric, (model, field, month_field) in sources.items():
+        grouped = (
+            model.objects
+            .annotate(month=TruncMonth(month_field))
+            .values_list('month', 'vehicle_id')
+            .annotate(total=Sum(field))
+            .order_by()
+        )
+        for month, vehicle_id, total in grouped.iterator():
+            if total:
+                rows.append(
+                    MonthlyFinanceRollup(
+                        # TruncMonth over a DateTimeField yields a datetime.
+                        month=month.date() if hasattr(month, 'date') else month,
+                        vehicle_id=vehicle_id,
+                        metric=metric,
+                        amount=total,
+                    )
+                )
+
+    MonthlyFinanceRollup.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0012_vehiclefinancials'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyFinanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('metric', models.CharField(choices=[('fuel_cost', 'Fuel Cost'), ('maintenance_cost', 'Maintenance Cost'), ('revenue', 'Revenue')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vehicle', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='workflow.vehicle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['metric', 'month'], name='workflow_mo_metric_19d71c_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('vehicle__isnull', False)), fields=('month', 'vehicle', 'metric'), name='monthly_rollup_unique_vehicle'), models.UniqueConstraint(condition=models.Q(('vehicle__isnull', True)), fields=('month', 'metric'), name='monthly_rollup_unique_unassigned')],
+            },
+        ),
+        migrations.RunPython(backfill_monthly_rollups, migrations.RunPython.noop),
+    ]
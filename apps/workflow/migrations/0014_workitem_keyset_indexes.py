@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-18 06:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0013_monthlyfinancerollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workitem',
+            index=models.Index(fields=['-created_at', '-id'], name='workitem_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workitem',
+            index=models.Index(fields=['vehicle', '-created_at', '-id'], name='workitem_vehicle_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workitem',
+            index=models.Index(fields=['driver', '-created_at', '-id'], name='workitem_driver_created_idx'),
+        ),
+    ]
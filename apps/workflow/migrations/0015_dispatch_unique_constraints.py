@@ -0,0 +1,87 @@
+# Generated by Django 6.0.2 on 2026-10-18 06:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+ACTIVE_TRIP_STATUSES = ['DISPATCHED', 'IN_PROGRESS']
+
+
+def _duplicates(model, field, **condition):
+    """
+    {field value: [ids]} for every value held by more than one row
+    matching ``condition``.
+    """
+    rows = model.objects.filter(**condition).exclude(**{f'{field}__isnull': True})
+    values = (
+        rows.values(field)
+        .annotate(n=Count('pk'))
+        .filter(n__gt=1)
+        .values_list(field, flat=True)
+        .order_by()
+    )
+    conflicts = {}
+    for value, pk in (
+        rows.filter(**{f'{field}__in': values})
+        .order_by(field, 'pk')
+        .values_list(field, 'pk')
+    ):
+        conflicts.setdefault(value, []).append(pk)
+    return conflicts
+
+
+def check_active_duplicates(apps, schema_editor):
+    """
+    Refuse to add the constraints below while existing rows violate
+    them, listing the rows to fix. The conflicts need a dispatcher's
+    decision (which trip really holds the vehicle / driver), so they
+    are reported rather than resolved here.
+    """
+    WorkItem = apps.get_model('workflow', 'WorkItem')
+    MaintenanceLog = apps.get_model('workflow', 'MaintenanceLog')
+
+    problems = []
+    for label, conflicts in (
+        ('vehicle', _duplicates(WorkItem, 'vehicle_id', status__in=ACTIVE_TRIP_STATUSES)),
+        ('driver', _duplicates(WorkItem, 'driver_id', status__in=ACTIVE_TRIP_STATUSES)),
+    ):
+        for value, trip_ids in conflicts.items():
+            problems.append(
+                f'{label} {value} is on active trips {", ".join(map(str, trip_ids))}'
+            )
+    for value, log_ids in _duplicates(MaintenanceLog, 'vehicle_id', status='OPEN').items():
+        problems.append(
+            f'vehicle {value} has open maintenance logs {", ".join(map(str, log_ids))}'
+        )
+
+    if problems:
+        raise RuntimeError(
+            'Cannot add the one-active-trip / one-open-maintenance constraints:\n  '
+            + '\n  '.join(problems)
+            + '\nCancel or complete all but one trip per vehicle and driver, and '
+            'close all but one open maintenance log per vehicle, then run migrate again.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0014_workitem_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_active_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='maintenancelog',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'OPEN')), fields=('vehicle',), name='one_open_maintenance_per_vehicle', violation_error_message='Vehicle already has an active maintenance record.'),
+        ),
+        migrations.AddConstraint(
+            model_name='workitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['DISPATCHED', 'IN_PROGRESS'])), fields=('vehicle',), name='one_active_trip_per_vehicle', violation_error_message='Vehicle already assigned to an active trip.'),
+        ),
+        migrations.AddConstraint(
+            model_name='workitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['DISPATCHED', 'IN_PROGRESS'])), fields=('driver',), name='one_active_trip_per_driver', violation_error_message='Driver already assigned to an active trip.'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-18 06:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+STATUSES = ['DRAFT', 'DISPATCHED', 'IN_PROGRESS', 'COMPLETED', 'CANCELLED']
+
+
+def backfill_to_status(apps, schema_editor):
+    ActivityLog = apps.get_model('workflow', 'ActivityLog')
+    for status in STATUSES:
+        ActivityLog.objects.filter(
+            action=f'Status changed to {status}'
+        ).update(to_status=status)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0015_dispatch_unique_constraints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='from_status',
+            field=models.CharField(blank=True, choices=[('DRAFT', 'Draft'), ('DISPATCHED', 'Dispatched'), ('IN_PROGRESS', 'In Progress'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='to_status',
+            field=models.CharField(blank=True, choices=[('DRAFT', 'Draft'), ('DISPATCHED', 'Dispatched'), ('IN_PROGRESS', 'In Progress'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='activitylog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['work_item', 'timestamp'], name='activitylog_item_time_idx'),
+        ),
+        migrations.AlterField(
+            model_name='activitylog',
+            name='work_item',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='activity_logs', to='workflow.workitem'),
+        ),
+        migrations.RunPython(backfill_to_status, migrations.RunPython.noop),
+    ]
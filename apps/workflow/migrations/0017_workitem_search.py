@@ -0,0 +1,81 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:05
+
+from django.db import migrations
+
+# Kept in step with services.trip_search.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE workflow_workitem_fts USING fts5(
+        title, description, origin, destination,
+        content='workflow_workitem', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER workflow_workitem_fts_ai AFTER INSERT ON workflow_workitem BEGIN
+        INSERT INTO workflow_workitem_fts(rowid, title, description, origin, destination)
+        VALUES (new.id, new.title, new.description, new.origin, new.destination);
+    END
+    """,
+    """
+    CREATE TRIGGER workflow_workitem_fts_ad AFTER DELETE ON workflow_workitem BEGIN
+        INSERT INTO workflow_workitem_fts(workflow_workitem_fts, rowid, title, description, origin, destination)
+        VALUES ('delete', old.id, old.title, old.description, old.origin, old.destination);
+    END
+    """,
+    """
+    CREATE TRIGGER workflow_workitem_fts_au
+    AFTER UPDATE OF title, description, origin, destination ON workflow_workitem BEGIN
+        INSERT INTO workflow_workitem_fts(workflow_workitem_fts, rowid, title, description, origin, destination)
+        VALUES ('delete', old.id, old.title, old.description, old.origin, old.destination);
+        INSERT INTO workflow_workitem_fts(rowid, title, description, origin, destination)
+        VALUES (new.id, new.title, new.description, new.origin, new.destination);
+    END
+    """,
+    "INSERT INTO workflow_workitem_fts(workflow_workitem_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS workflow_workitem_fts_au",
+    "DROP TRIGGER IF EXISTS workflow_workitem_fts_ad",
+    "DROP TRIGGER IF EXISTS workflow_workitem_fts_ai",
+    "DROP TABLE IF EXISTS workflow_workitem_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE workflow_workitem ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(origin, '') || ' ' || coalesce(destination, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX workflow_workitem_search_idx ON workflow_workitem USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS workflow_workitem_search_idx",
+    "ALTER TABLE workflow_workitem DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0016_activitylog_structured_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
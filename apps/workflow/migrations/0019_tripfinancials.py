@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0018_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripFinancials',
+            fields=[
+                ('work_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='financials', serialize=False, to='workflow.workitem')),
+                ('origin', models.CharField(blank=True, max_length=255)),
+                ('destination', models.CharField(blank=True, max_length=255)),
+                ('completed_at', models.DateTimeField(db_index=True)),
+                ('distance', models.PositiveIntegerField(blank=True, help_text='Odometer delta in km', null=True)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fuel_cost', models.DecimalField(decimal_places=2, default=0, help_text="Sum of the trip's fuel logs", max_digits=12)),
+                ('fuel_variance', models.DecimalField(blank=True, decimal_places=2, help_text='Actual minus estimated fuel cost', max_digits=12, null=True)),
+                ('profit', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('revenue_per_km', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('margin', models.DecimalField(blank=True, decimal_places=4, help_text='Profit / revenue', max_digits=9, null=True)),
+                ('driver', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trip_financials', to='workflow.driver')),
+                ('vehicle', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trip_financials', to='workflow.vehicle')),
+            ],
+            options={
+                'verbose_name_plural': 'trip financials',
+                'indexes': [models.Index(fields=['vehicle', 'completed_at'], name='tripfin_vehicle_time_idx'), models.Index(fields=['driver', 'completed_at'], name='tripfin_driver_time_idx'), models.Index(fields=['origin', 'destination'], name='tripfin_lane_idx')],
+            },
+        ),
+    ]
@@ -1,8 +1,19 @@
-from django.db import models
+from datetime import datetime, time, timedelta
+
+from django.db import models, transaction
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import (
+    Sum,
+    F,
+    OuterRef,
+    Subquery,
+    Value,
+    DecimalField,
+    IntegerField,
+)
+from django.db.models.functions import Coalesce
 
 """
 Core business models for FleetFlow.
@@ -14,6 +25,9 @@ Defines operational entities:
 - MaintenanceLog (Preventative/reactive service)
 - FuelLog (Fuel cost tracking + odometer sync)
 - ActivityLog (Audit trail)
+- VehicleFinancials (Denormalized per-vehicle cost/revenue rollup)
+- MonthlyFinanceRollup (Per-month, per-vehicle cost/revenue rollup)
+- TripFinancials (Per-trip P&L snapshot taken at completion)
 
 Implements rule-based validation and financial aggregation
 at the model level for data integrity.
@@ -110,11 +124,276 @@ class WorkItem(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["status", "created_at"]),
+            # Keyset pagination on the trip board: (created_at, id)
+            # plus per-vehicle / per-driver variants for its filters.
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="workitem_created_id_idx",
+            ),
+            models.Index(
+                fields=["vehicle", "-created_at", "-id"],
+                name="workitem_vehicle_created_idx",
+            ),
+            models.Index(
+                fields=["driver", "-created_at", "-id"],
+                name="workitem_driver_created_idx",
+            ),
+        ]
+        # Dispatch invariants, enforced by partial unique indexes so
+        # concurrent dispatchers cannot both win.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["vehicle"],
+                condition=models.Q(status__in=["DISPATCHED", "IN_PROGRESS"]),
+                name="one_active_trip_per_vehicle",
+                violation_error_message="Vehicle already assigned to an active trip.",
+            ),
+            models.UniqueConstraint(
+                fields=["driver"],
+                condition=models.Q(status__in=["DISPATCHED", "IN_PROGRESS"]),
+                name="one_active_trip_per_driver",
+                violation_error_message="Driver already assigned to an active trip.",
+            ),
         ]
 
+    def save(self, *args, **kwargs):
+        # Atomic so the VehicleFinancials rollup (post_save signal)
+        # commits or rolls back together with the row itself.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        _invalidate_vehicle_financials(self)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        _invalidate_vehicle_financials(self)
+        return result
+
     def __str__(self):
         return f"{self.title} ({self.status})"    
 
+# Output type for money annotations summed across many rows.
+_MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _sum_subquery(model, field, fk="vehicle", output_field=_MONEY, **filters):
+    """
+    Correlated scalar subquery summing ``field`` on ``model`` rows
+    belonging to the outer vehicle (and matching ``filters``).
+    Coalesced to 0 so vehicles with no history annotate a number
+    instead of NULL.
+    """
+    subquery = (
+        model.objects
+        .filter(**{fk: OuterRef("pk")}, **filters)
+        .order_by()
+        .values(fk)
+        .annotate(total=Sum(field))
+        .values("total")
+    )
+    return Coalesce(
+        Subquery(subquery, output_field=output_field),
+        Value(0),
+        output_field=output_field,
+    )
+
+
+def _period_filters(field, date_from, date_to, is_datetime=True):
+    """
+    Filters for ``field`` within [date_from, date_to], both inclusive
+    days. Datetime columns get half-open ranges on local day starts so
+    their indexes stay usable.
+    """
+    def day_start(day):
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    filters = {}
+    if date_from is not None:
+        filters[f"{field}__gte"] = day_start(date_from) if is_datetime else date_from
+    if date_to is not None:
+        if is_datetime:
+            filters[f"{field}__lt"] = day_start(date_to + timedelta(days=1))
+        else:
+            filters[f"{field}__lte"] = date_to
+    return filters
+
+
+# Attributes the Vehicle financial methods read; set as annotations
+# by the querysets below, by prefetch_financials(), or memoized by
+# the methods themselves.
+FINANCIAL_ATTRS = (
+    "fuel_cost_sum",
+    "maintenance_cost_sum",
+    "revenue_sum",
+    "operational_cost",
+    "profit",
+)
+
+
+def _invalidate_vehicle_financials(log):
+    """
+    Drop the memoized figures of the Vehicle instance a log or trip
+    was saved through (if it was loaded), so its methods see the
+    change.
+    """
+    vehicle = type(log)._meta.get_field("vehicle").get_cached_value(log, None)
+    if vehicle is not None:
+        vehicle.invalidate_financials()
+
+
+def prefetch_financials(vehicles):
+    """
+    Fill the financial attributes of ``vehicles`` from the
+    VehicleFinancials rollup with one query, like
+    prefetch_related_objects(). Vehicles that already carry them are
+    left alone.
+    """
+    pending = {
+        vehicle.pk: vehicle
+        for vehicle in vehicles
+        if "fuel_cost_sum" not in vehicle.__dict__
+    }
+    if not pending:
+        return
+
+    rows = {
+        vehicle_id: (fuel, maintenance, revenue)
+        for vehicle_id, fuel, maintenance, revenue in (
+            VehicleFinancials.objects
+            .filter(vehicle_id__in=pending)
+            .values_list("vehicle_id", "fuel_cost", "maintenance_cost", "revenue")
+        )
+    }
+    for pk, vehicle in pending.items():
+        fuel, maintenance, revenue = rows.get(pk, (0, 0, 0))
+        vehicle.fuel_cost_sum = fuel
+        vehicle.maintenance_cost_sum = maintenance
+        vehicle.revenue_sum = revenue
+
+
+class VehicleQuerySet(models.QuerySet):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._prefetch_financials = False
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._prefetch_financials = self._prefetch_financials
+        return clone
+
+    def _fetch_all(self):
+        fetched = self._result_cache is not None
+        super()._fetch_all()
+        if (
+            self._prefetch_financials
+            and not fetched
+            and issubclass(self._iterable_class, models.query.ModelIterable)
+        ):
+            prefetch_financials(self._result_cache)
+
+    def prefetch_financials(self):
+        """
+        Fill every fetched vehicle's financial figures with one extra
+        query once the queryset is evaluated (see
+        prefetch_financials()), so the Vehicle financial methods run
+        none. Unlike with_rollup_financials() the main SELECT is left
+        untouched.
+        """
+        clone = self._chain()
+        clone._prefetch_financials = True
+        return clone
+
+    def with_financials(self):
+        """
+        Annotate fuel, maintenance, revenue, operational cost and
+        profit per vehicle in a single SELECT.
+
+        Vehicle financial methods read these annotations when present
+        instead of running their own aggregate queries.
+        """
+        return self.annotate(
+            fuel_cost_sum=_sum_subquery(FuelLog, "cost"),
+            maintenance_cost_sum=_sum_subquery(MaintenanceLog, "cost"),
+            revenue_sum=_sum_subquery(WorkItem, "revenue"),
+        )._with_derived_financials()
+
+    def with_rollup_financials(self):
+        """
+        Same annotations as with_financials(), read from the
+        VehicleFinancials rollup via a primary-key join instead of
+        aggregating the full log history.
+        """
+        return self.annotate(
+            fuel_cost_sum=Coalesce(
+                "financials__fuel_cost", Value(0), output_field=_MONEY
+            ),
+            maintenance_cost_sum=Coalesce(
+                "financials__maintenance_cost", Value(0), output_field=_MONEY
+            ),
+            revenue_sum=Coalesce(
+                "financials__revenue", Value(0), output_field=_MONEY
+            ),
+        )._with_derived_financials()
+
+    def with_period_financials(self, date_from=None, date_to=None):
+        """
+        Fuel, maintenance and revenue within a date range (inclusive
+        days; either end may be open) plus the distance of its trips
+        that have both odometer readings, in a single SELECT.
+
+        Annotations are named period_* so they never stand in for the
+        all-time figures Vehicle's financial methods read.
+        period_operational_cost is the running cost of the period (fuel
+        + maintenance); acquisition cost is not spread over periods.
+        Rows are bucketed by the same dates as MonthlyFinanceRollup.
+        """
+        trip_period = _period_filters("created_at", date_from, date_to)
+        return self.annotate(
+            period_fuel_cost=_sum_subquery(
+                FuelLog, "cost",
+                **_period_filters("date", date_from, date_to, is_datetime=False),
+            ),
+            period_maintenance_cost=_sum_subquery(
+                MaintenanceLog, "cost",
+                **_period_filters("created_at", date_from, date_to),
+            ),
+            period_revenue=_sum_subquery(WorkItem, "revenue", **trip_period),
+            period_distance=_sum_subquery(
+                WorkItem,
+                F("end_odometer") - F("start_odometer"),
+                output_field=IntegerField(),
+                end_odometer__isnull=False,
+                start_odometer__isnull=False,
+                **trip_period,
+            ),
+        ).annotate(
+            period_operational_cost=models.ExpressionWrapper(
+                F("period_fuel_cost") + F("period_maintenance_cost"),
+                output_field=_MONEY,
+            ),
+        ).annotate(
+            period_profit=models.ExpressionWrapper(
+                F("period_revenue") - F("period_operational_cost"),
+                output_field=_MONEY,
+            ),
+        )
+
+    def _with_derived_financials(self):
+        return self.annotate(
+            operational_cost=models.ExpressionWrapper(
+                F("fuel_cost_sum")
+                + F("maintenance_cost_sum")
+                + F("acquisition_cost"),
+                output_field=_MONEY,
+            ),
+        ).annotate(
+            profit=models.ExpressionWrapper(
+                F("revenue_sum") - F("operational_cost"),
+                output_field=_MONEY,
+            ),
+        )
+
+
 class Vehicle(models.Model):
 
     class VehicleType(models.TextChoices):
@@ -164,6 +443,8 @@ class Vehicle(models.Model):
     odometer_current = models.PositiveIntegerField()
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
+    objects = VehicleQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
 
@@ -174,17 +455,37 @@ class Vehicle(models.Model):
     # Financial Aggregations
     # ========================
 
+    # Methods prefer values annotated by
+    # Vehicle.objects.with_financials() or filled by
+    # prefetch_financials(). Otherwise each aggregate runs once per
+    # instance and is memoized under the same attribute, until
+    # invalidate_financials() (called when a log or trip is saved
+    # through this instance).
+
+    def _memoized(self, attr, compute):
+        if attr not in self.__dict__:
+            self.__dict__[attr] = compute()
+        return self.__dict__[attr]
+
+    def invalidate_financials(self):
+        for attr in FINANCIAL_ATTRS:
+            self.__dict__.pop(attr, None)
+
     def total_fuel_cost(self):
-        return self.fuel_logs.aggregate(
-            total=Sum("cost")
-        )["total"] or 0
+        return self._memoized(
+            "fuel_cost_sum",
+            lambda: self.fuel_logs.aggregate(total=Sum("cost"))["total"] or 0,
+        )
 
     def total_maintenance_cost(self):
-        return self.maintenance_logs.aggregate(
-            total=Sum("cost")
-        )["total"] or 0
+        return self._memoized(
+            "maintenance_cost_sum",
+            lambda: self.maintenance_logs.aggregate(total=Sum("cost"))["total"] or 0,
+        )
 
     def total_operational_cost(self):
+        if hasattr(self, "operational_cost"):
+            return self.operational_cost
         return (
             self.total_fuel_cost()
             + self.total_maintenance_cost()
@@ -204,11 +505,14 @@ class Vehicle(models.Model):
     # ========================
 
     def total_revenue(self):
-        return self.trips.aggregate(
-            total=Sum("revenue")
-        )["total"] or 0
+        return self._memoized(
+            "revenue_sum",
+            lambda: self.trips.aggregate(total=Sum("revenue"))["total"] or 0,
+        )
 
     def total_profit(self):
+        if hasattr(self, "profit"):
+            return self.profit
         return self.total_revenue() - self.total_operational_cost()
 
     def profit_per_km(self):
@@ -271,26 +575,34 @@ class MaintenanceLog(models.Model):
         db_index=True,
     )
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     closed_at = models.DateTimeField(null=True, blank=True)
 
-    def clean(self):
-        if self.status == self.Status.OPEN:
-            active_exists = MaintenanceLog.objects.filter(
-                vehicle=self.vehicle,
-                status=self.Status.OPEN
-            ).exclude(id=self.id).exists()
-
-            if active_exists:
-                raise ValidationError(
-                    "Vehicle already has an active maintenance record."
-                )
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["vehicle"],
+                condition=models.Q(status="OPEN"),
+                name="one_open_maintenance_per_vehicle",
+                violation_error_message="Vehicle already has an active maintenance record.",
+            ),
+        ]
 
     def close(self):
         self.status = self.Status.CLOSED
         self.closed_at = timezone.now()
         self.save()
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        _invalidate_vehicle_financials(self)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        _invalidate_vehicle_financials(self)
+        return result
+
     def __str__(self):
         return f"{self.vehicle} - {self.status}"
     
@@ -327,7 +639,7 @@ class FuelLog(models.Model):
         help_text="Vehicle odometer at time of refueling"
     )
 
-    date = models.DateField()
+    date = models.DateField(db_index=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -345,11 +657,19 @@ class FuelLog(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean() 
-        super().save(*args, **kwargs)
 
-        if self.odometer_reading > self.vehicle.odometer_current:
-            self.vehicle.odometer_current = self.odometer_reading
-            self.vehicle.save()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            if self.odometer_reading > self.vehicle.odometer_current:
+                self.vehicle.odometer_current = self.odometer_reading
+                self.vehicle.save()
+        _invalidate_vehicle_financials(self)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        _invalidate_vehicle_financials(self)
+        return result
             
     def __str__(self):
         return f"{self.vehicle} - {self.liters}L"
@@ -359,14 +679,297 @@ class ActivityLog(models.Model):
     work_item = models.ForeignKey(
         WorkItem,
         on_delete=models.CASCADE,
-        related_name="activity_logs"
+        related_name="activity_logs",
+        # Covered by the (work_item, timestamp) index below.
+        db_index=False,
     )
     action = models.CharField(max_length=255)
+    from_status = models.CharField(
+        max_length=20,
+        choices=WorkItem.TripStatus.choices,
+        blank=True,
+    )
+    to_status = models.CharField(
+        max_length=20,
+        choices=WorkItem.TripStatus.choices,
+        blank=True,
+    )
     performed_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the event is recorded, not when the (possibly buffered)
+    # row is written; see services.audit.
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["work_item", "timestamp"],
+                name="activitylog_item_time_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.action} by {self.performed_by}"
+
+
+class VehicleFinancials(models.Model):
+    """
+    Denormalized running totals per vehicle.
+
+    Maintained incrementally by signal handlers in
+    apps.workflow.signals with F() increments whenever a FuelLog,
+    MaintenanceLog or WorkItem.revenue changes. Repair drift with
+    ``manage.py rebuild_vehicle_financials``.
+    """
+
+    vehicle = models.OneToOneField(
+        Vehicle,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="financials",
+    )
+
+    fuel_cost = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+    )
+
+    maintenance_cost = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+    )
+
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "vehicle financials"
+
+    @classmethod
+    def apply_delta(cls, vehicle_id, create=True, **deltas):
+        """
+        Atomically add ``deltas`` (column -> amount) to a vehicle's
+        rollup row. Creates the row on first use unless ``create`` is
+        False (used on delete paths, where the vehicle may be going away).
+        """
+        deltas = {k: v for k, v in deltas.items() if v}
+        if vehicle_id is None or not deltas:
+            return
+
+        changes = {k: F(k) + v for k, v in deltas.items()}
+        changes["updated_at"] = timezone.now()
+
+        with transaction.atomic():
+            updated = cls.objects.filter(vehicle_id=vehicle_id).update(**changes)
+            if updated or not create:
+                return
+
+            _, created = cls.objects.get_or_create(
+                vehicle_id=vehicle_id,
+                defaults=deltas,
+            )
+            if not created:
+                cls.objects.filter(vehicle_id=vehicle_id).update(**changes)
+
+    def total_operational_cost(self):
+        return (
+            self.fuel_cost
+            + self.maintenance_cost
+            + self.vehicle.acquisition_cost
+        )
+
+    def __str__(self):
+        return f"{self.vehicle} - financials"
+
+
+
+class MonthlyFinanceRollup(models.Model):
+    """
+    Monthly totals per (month, vehicle, metric).
+
+    Metric values match the VehicleFinancials column names. Maintained
+    incrementally alongside VehicleFinancials by apps.workflow.signals;
+    rebuild with ``manage.py backfill_monthly_rollups``. Revenue from
+    trips without a vehicle is kept under vehicle=NULL.
+    """
+
+    class Metric(models.TextChoices):
+        FUEL_COST = "fuel_cost", "Fuel Cost"
+        MAINTENANCE_COST = "maintenance_cost", "Maintenance Cost"
+        REVENUE = "revenue", "Revenue"
+
+    month = models.DateField(help_text="First day of the month")
+
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.CASCADE,
+        related_name="monthly_rollups",
+        null=True,
+        blank=True,
+    )
+
+    metric = models.CharField(
+        max_length=20,
+        choices=Metric.choices,
+    )
+
+    amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["month", "vehicle", "metric"],
+                condition=models.Q(vehicle__isnull=False),
+                name="monthly_rollup_unique_vehicle",
+            ),
+            models.UniqueConstraint(
+                fields=["month", "metric"],
+                condition=models.Q(vehicle__isnull=True),
+                name="monthly_rollup_unique_unassigned",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["metric", "month"]),
+        ]
+
+    @classmethod
+    def apply_delta(cls, month, vehicle_id, metric, amount, create=True):
+        """
+        Atomically add ``amount`` to one (month, vehicle, metric) row,
+        creating it on first use unless ``create`` is False.
+        """
+        if not amount or month is None:
+            return
+
+        rows = cls.objects.filter(month=month, vehicle_id=vehicle_id, metric=metric)
+
+        with transaction.atomic():
+            if rows.update(amount=F("amount") + amount) or not create:
+                return
+
+            _, created = cls.objects.get_or_create(
+                month=month,
+                vehicle_id=vehicle_id,
+                metric=metric,
+                defaults={"amount": amount},
+            )
+            if not created:
+                rows.update(amount=F("amount") + amount)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.metric} {self.vehicle_id}: {self.amount}"
+
+
+class TripFinancials(models.Model):
+    """
+    Profit and loss of one completed trip, frozen when it completes.
+
+    Written by services.trip_financials from transition() /
+    transition_many(); ``manage.py backfill_trip_financials`` covers
+    older trips and refreshes snapshots after late fuel entries.
+    Vehicle, driver and lane are copied in so profitability reports
+    group these narrow rows without joining trips or fuel logs.
+    """
+
+    work_item = models.OneToOneField(
+        WorkItem,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="financials",
+    )
+
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="trip_financials",
+        db_index=False,
+    )
+
+    driver = models.ForeignKey(
+        Driver,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="trip_financials",
+        db_index=False,
+    )
+
+    origin = models.CharField(max_length=255, blank=True)
+    destination = models.CharField(max_length=255, blank=True)
+
+    completed_at = models.DateTimeField(db_index=True)
+
+    distance = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Odometer delta in km",
+    )
+
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    fuel_cost = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of the trip's fuel logs",
+    )
+
+    fuel_variance = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Actual minus estimated fuel cost",
+    )
+
+    profit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    revenue_per_km = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+    )
+
+    margin = models.DecimalField(
+        max_digits=9,
+        decimal_places=4,
+        null=True,
+        blank=True,
+        help_text="Profit / revenue",
+    )
+
+    class Meta:
+        verbose_name_plural = "trip financials"
+        indexes = [
+            models.Index(
+                fields=["vehicle", "completed_at"],
+                name="tripfin_vehicle_time_idx",
+            ),
+            models.Index(
+                fields=["driver", "completed_at"],
+                name="tripfin_driver_time_idx",
+            ),
+            models.Index(
+                fields=["origin", "destination"],
+                name="tripfin_lane_idx",
+            ),
+        ]
 
     def __str__(self):
-        return f"{self.action} by {self.performed_by}"
\ No newline at end of file
+        return f"Trip {self.work_item_id} P&L: {self.profit}"
@@ -0,0 +1,134 @@
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+"""
+Keyset (cursor) pagination for FleetFlow list views.
+
+Pages are ordered newest first on (created_at, id). The cursor
+encodes the last row's key, and the next page is fetched with a
+range predicate on that key instead of OFFSET, so every page costs
+one index range scan regardless of depth.
+
+EstimatedCountPaginator is for the admin, whose changelists need a
+total: on large tables it takes the planner's estimate rather than
+counting every row.
+"""
+
+
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Return (created_at, pk) for a cursor token, or None when the token
+    is missing or malformed (callers fall back to the first page).
+    """
+    if not token:
+        return None
+
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(queryset, cursor, page_size):
+    """
+    One page of ``queryset`` newest first, starting after ``cursor``.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by("-created_at", "-id")
+
+    position = decode_cursor(cursor)
+    if position is not None:
+        created_at, pk = position
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at)
+            | Q(created_at=created_at, id__lt=pk)
+        )
+
+    rows = list(queryset[:page_size + 1])
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.pk)
+
+    return rows, next_cursor
+
+
+# ==========================================================
+# Estimated counts
+# ==========================================================
+
+def estimated_count(queryset):
+    """
+    The database's row estimate for ``queryset``, or None when the
+    backend has none.
+
+    PostgreSQL: pg_class.reltuples for a whole table, the planner's
+    "Plan Rows" otherwise. SQLite: the ANALYZE statistics in
+    sqlite_stat1, whole tables only.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    filtered = bool(queryset.query.where)
+
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                if not filtered:
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                        [table],
+                    )
+                    row = cursor.fetchone()
+                    return row[0] if row and row[0] >= 0 else None
+
+                sql, params = queryset.order_by().query.sql_with_params()
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return int(plan[0]["Plan"]["Plan Rows"])
+
+            if connection.vendor == "sqlite" and not filtered:
+                cursor.execute(
+                    "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table]
+                )
+                row = cursor.fetchone()
+                return int(row[0].split()[0]) if row else None
+    except DatabaseError:
+        # e.g. sqlite_stat1 does not exist until the first ANALYZE.
+        return None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses estimated_count() once it reaches
+    ADMIN_ESTIMATED_COUNT_THRESHOLD; below that (or without an
+    estimate) counts exactly as usual.
+    """
+
+    @cached_property
+    def count(self):
+        threshold = getattr(settings, "ADMIN_ESTIMATED_COUNT_THRESHOLD", 100_000)
+        if hasattr(self.object_list, "query"):
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate >= threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,202 @@
+from datetime import datetime
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    Vehicle,
+    WorkItem,
+    FuelLog,
+    MaintenanceLog,
+    VehicleFinancials,
+    MonthlyFinanceRollup,
+)
+from services import trip_financials
+from services.kpi_cache import invalidate_kpis
+
+"""
+Signal handlers for FleetFlow workflow models.
+
+Keeps the VehicleFinancials and MonthlyFinanceRollup rollups in step
+with FuelLog, MaintenanceLog and WorkItem.revenue by applying the
+difference between the stored and the new row as F() increments,
+refreshes the TripFinancials snapshot of completed trips whose fuel
+logs change, and invalidates cached KPIs that depend on the changed
+model.
+"""
+
+# model -> (amount field, rollup column / metric, month source field)
+ROLLUP_SOURCES = {
+    FuelLog: ("cost", "fuel_cost", "date"),
+    MaintenanceLog: ("cost", "maintenance_cost", "created_at"),
+    WorkItem: ("revenue", "revenue", "created_at"),
+}
+
+
+def _tracks(sender, update_fields):
+    """
+    Whether a save with ``update_fields`` can change the rollup (or
+    snapshot) state of ``sender``. Saves limited to other fields, such
+    as the status-only saves of transition(), need no lookup.
+    """
+    if update_fields is None:
+        return True
+    field, _, month_field = ROLLUP_SOURCES[sender]
+    tracked = {"vehicle", "vehicle_id", field, month_field}
+    if sender is FuelLog:
+        tracked |= {"trip", "trip_id"}
+    return not tracked.isdisjoint(update_fields)
+
+
+def _month_of(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        # Same bucketing as TruncMonth in the current time zone.
+        value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value.replace(day=1)
+
+
+def _rollup_state(instance):
+    field, _, month_field = ROLLUP_SOURCES[type(instance)]
+    return (
+        instance.vehicle_id,
+        getattr(instance, field) or 0,
+        _month_of(getattr(instance, month_field)),
+    )
+
+
+def _shift(apply, old_key, old_amount, new_key, new_amount):
+    """
+    Move an amount between rollup rows: one delta when the key is
+    unchanged, otherwise a decrement on the old row and an increment
+    on the new one. A key of None means "no row".
+    """
+    if old_key == new_key:
+        if new_key is not None:
+            apply(new_key, new_amount - old_amount, True)
+        return
+
+    if old_key is not None:
+        apply(old_key, -old_amount, False)
+    if new_key is not None:
+        apply(new_key, new_amount, True)
+
+
+def _apply_vehicle_financials(column):
+    def apply(key, amount, create):
+        VehicleFinancials.apply_delta(key[0], create=create, **{column: amount})
+    return apply
+
+
+def _apply_monthly(metric):
+    def apply(key, amount, create):
+        month, vehicle_id = key
+        MonthlyFinanceRollup.apply_delta(
+            month, vehicle_id, metric, amount, create=create
+        )
+    return apply
+
+
+@receiver(post_save, sender=Vehicle)
+def create_vehicle_financials(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        VehicleFinancials.objects.get_or_create(vehicle=instance)
+
+
+@receiver(pre_save, sender=FuelLog)
+@receiver(pre_save, sender=MaintenanceLog)
+@receiver(pre_save, sender=WorkItem)
+def remember_rollup_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._rollup_previous = None
+    if sender is FuelLog:
+        instance._previous_trip_id = None
+
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if not _tracks(sender, update_fields):
+        return
+
+    field, _, month_field = ROLLUP_SOURCES[sender]
+    columns = ["vehicle_id", field, month_field]
+    if sender is FuelLog:
+        # Same read also gives the trip whose snapshot may need refreshing.
+        columns.append("trip_id")
+    previous = sender.objects.filter(pk=instance.pk).values(*columns).first()
+    if previous is not None:
+        instance._rollup_previous = (
+            previous["vehicle_id"],
+            previous[field] or 0,
+            _month_of(previous[month_field]),
+        )
+        if sender is FuelLog:
+            instance._previous_trip_id = previous["trip_id"]
+
+
+@receiver(post_save, sender=FuelLog)
+@receiver(post_save, sender=MaintenanceLog)
+@receiver(post_save, sender=WorkItem)
+def update_rollup_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _tracks(sender, update_fields):
+        return
+
+    _, column, _ = ROLLUP_SOURCES[sender]
+    vehicle_id, amount, month = _rollup_state(instance)
+    previous = getattr(instance, "_rollup_previous", None)
+
+    old_vehicle_key = old_month_key = None
+    old_amount = 0
+    if previous is not None:
+        old_vehicle_id, old_amount, old_month = previous
+        old_month_key = (old_month, old_vehicle_id)
+        if old_vehicle_id is not None:
+            old_vehicle_key = (old_vehicle_id,)
+
+    # VehicleFinancials only tracks vehicle-assigned rows.
+    _shift(
+        _apply_vehicle_financials(column),
+        old_vehicle_key, old_amount,
+        (vehicle_id,) if vehicle_id is not None else None, amount,
+    )
+    _shift(
+        _apply_monthly(column),
+        old_month_key, old_amount,
+        (month, vehicle_id), amount,
+    )
+
+
+@receiver(post_delete, sender=FuelLog)
+@receiver(post_delete, sender=MaintenanceLog)
+@receiver(post_delete, sender=WorkItem)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    _, column, _ = ROLLUP_SOURCES[sender]
+    vehicle_id, amount, month = _rollup_state(instance)
+
+    VehicleFinancials.apply_delta(vehicle_id, create=False, **{column: -amount})
+    MonthlyFinanceRollup.apply_delta(
+        month, vehicle_id, column, -amount, create=False
+    )
+
+
+@receiver(post_save, sender=FuelLog)
+@receiver(post_delete, sender=FuelLog)
+def refresh_trip_snapshot(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _tracks(sender, update_fields):
+        return
+    trip_ids = {instance.trip_id, getattr(instance, "_previous_trip_id", None)}
+    trip_ids.discard(None)
+    if trip_ids:
+        trip_financials.refresh_snapshots(trip_ids)
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_save, sender=WorkItem)
+@receiver(post_save, sender=FuelLog)
+@receiver(post_save, sender=MaintenanceLog)
+@receiver(post_delete, sender=Vehicle)
+@receiver(post_delete, sender=WorkItem)
+@receiver(post_delete, sender=FuelLog)
+@receiver(post_delete, sender=MaintenanceLog)
+def invalidate_kpi_cache(sender, **kwargs):
+    invalidate_kpis(sender)
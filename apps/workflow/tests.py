@@ -1,10 +1,45 @@
 from django.test import TestCase
+from django.utils import timezone
+from django.urls import reverse
+from django.db import connection, transaction, IntegrityError
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.core.exceptions import ValidationError
-from datetime import date
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib.util import module_from_spec, spec_from_file_location
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+import csv
+import json
+import os
+import re
+import tempfile
+import threading
+import time
 
-from apps.workflow.models import WorkItem, Vehicle, Driver
+from apps.workflow.models import (
+    WorkItem,
+    Vehicle,
+    Driver,
+    FuelLog,
+    MaintenanceLog,
+    VehicleFinancials,
+    MonthlyFinanceRollup,
+    ActivityLog,
+    TripFinancials,
+)
 from apps.accounts.models import User
-from services.workflow_service import transition
+from services.workflow_service import transition, transition_many
+from services.db_timeouts import statement_timeout
+from services import audit, metrics
+from services.activity_archive import FIELDS, ArchiveWriter, activity_history, archived_history
+from services.trip_search import search_trips
+from services.trip_financials import profitability, snapshot_trips
+from services.fuel_analytics import fuel_anomalies, vehicle_efficiency
+from services import columnar_analytics
 
 
 class TestWorkflowTransitions(TestCase):
@@ -74,4 +109,1730 @@ class TestWorkflowTransitions(TestCase):
         )
 
         with self.assertRaises(ValidationError):
-            transition(trip2, WorkItem.TripStatus.DISPATCHED, self.dispatcher)
\ No newline at end of file
+            transition(trip2, WorkItem.TripStatus.DISPATCHED, self.dispatcher)
+
+    def test_driver_overlap_reports_constraint_message(self):
+        other_vehicle = Vehicle.objects.create(
+            name="Truck-02",
+            license_plate="TEST456",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=5000000,
+            odometer_current=10000,
+        )
+        trip1 = WorkItem.objects.create(
+            title="Trip 1",
+            description="Test",
+            created_by=self.manager,
+            driver=self.driver,
+            vehicle=self.vehicle,
+            cargo_weight=500
+        )
+        transition(trip1, WorkItem.TripStatus.DISPATCHED, self.dispatcher)
+
+        trip2 = WorkItem.objects.create(
+            title="Trip 2",
+            description="Test",
+            created_by=self.manager,
+            driver=self.driver,
+            vehicle=other_vehicle,
+            cargo_weight=300
+        )
+
+        with self.assertRaisesMessage(
+            ValidationError, "Driver already assigned to an active trip."
+        ):
+            transition(trip2, WorkItem.TripStatus.DISPATCHED, self.dispatcher)
+
+        self.assertEqual(trip2.status, WorkItem.TripStatus.DRAFT)
+
+    def test_second_open_maintenance_rejected(self):
+        MaintenanceLog.objects.create(
+            vehicle=self.vehicle,
+            description="Brakes",
+            cost=100,
+        )
+
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                MaintenanceLog.objects.create(
+                    vehicle=self.vehicle,
+                    description="Tyres",
+                    cost=50,
+                )
+
+        self.client.force_login(self.manager)
+        response = self.client.post(
+            reverse("maintenance_management"),
+            {"vehicle": self.vehicle.pk, "description": "Tyres", "cost": "50"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "Vehicle already has an active maintenance record.",
+            response.context["form"].non_field_errors(),
+        )
+        self.assertEqual(MaintenanceLog.objects.count(), 1)
+
+class TestVehicleFinancials(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+
+        self.vehicle = Vehicle.objects.create(
+            name="Truck-01",
+            license_plate="FIN123",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=100,
+        )
+
+        FuelLog.objects.create(
+            vehicle=self.vehicle,
+            liters=20,
+            cost=150,
+            odometer_reading=400,
+            date=date(2026, 1, 1),
+        )
+        MaintenanceLog.objects.create(
+            vehicle=self.vehicle,
+            description="Brakes",
+            cost=250,
+        )
+        WorkItem.objects.create(
+            title="Trip A",
+            description="Test",
+            created_by=self.manager,
+            vehicle=self.vehicle,
+            revenue=3000,
+        )
+
+    def test_with_financials_matches_aggregates(self):
+        plain = Vehicle.objects.get(pk=self.vehicle.pk)
+        annotated = Vehicle.objects.with_financials().get(pk=self.vehicle.pk)
+
+        expected = [
+            plain.total_fuel_cost(),
+            plain.total_maintenance_cost(),
+            plain.total_revenue(),
+            plain.total_operational_cost(),
+            plain.total_profit(),
+            plain.cost_per_km(),
+            plain.profit_per_km(),
+        ]
+
+        with self.assertNumQueries(0):
+            actual = [
+                annotated.total_fuel_cost(),
+                annotated.total_maintenance_cost(),
+                annotated.total_revenue(),
+                annotated.total_operational_cost(),
+                annotated.total_profit(),
+                annotated.cost_per_km(),
+                annotated.profit_per_km(),
+            ]
+
+        self.assertEqual(actual, expected)
+
+    def test_with_financials_without_history(self):
+        empty = Vehicle.objects.create(
+            name="Van-01",
+            license_plate="FIN999",
+            vehicle_type=Vehicle.VehicleType.VAN,
+            max_capacity=500,
+            acquisition_cost=800,
+            odometer_current=0,
+        )
+
+        annotated = Vehicle.objects.with_financials().get(pk=empty.pk)
+
+        self.assertEqual(annotated.total_revenue(), 0)
+        self.assertEqual(annotated.total_operational_cost(), 800)
+        self.assertEqual(annotated.cost_per_km(), 0)
+
+
+class TestVehicleFinancialsRollup(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+
+        self.vehicle = Vehicle.objects.create(
+            name="Truck-01",
+            license_plate="ROLL123",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=100,
+        )
+
+        self.other_vehicle = Vehicle.objects.create(
+            name="Truck-02",
+            license_plate="ROLL456",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=100,
+        )
+
+    def rollup(self, vehicle):
+        return VehicleFinancials.objects.get(vehicle=vehicle)
+
+    def test_rollup_tracks_create_update_delete(self):
+        fuel = FuelLog.objects.create(
+            vehicle=self.vehicle,
+            liters=10,
+            cost=100,
+            odometer_reading=200,
+            date=date(2026, 1, 1),
+        )
+        maintenance = MaintenanceLog.objects.create(
+            vehicle=self.vehicle,
+            description="Tyres",
+            cost=40,
+        )
+        self.assertEqual(self.rollup(self.vehicle).fuel_cost, 100)
+        self.assertEqual(self.rollup(self.vehicle).maintenance_cost, 40)
+
+        fuel.cost = 130
+        fuel.save()
+        self.assertEqual(self.rollup(self.vehicle).fuel_cost, 130)
+
+        maintenance.delete()
+        self.assertEqual(self.rollup(self.vehicle).maintenance_cost, 0)
+
+    def test_rollup_moves_revenue_between_vehicles(self):
+        trip = WorkItem.objects.create(
+            title="Trip A",
+            description="Test",
+            created_by=self.manager,
+            vehicle=self.vehicle,
+            revenue=500,
+        )
+        self.assertEqual(self.rollup(self.vehicle).revenue, 500)
+
+        trip.vehicle = self.other_vehicle
+        trip.save()
+
+        self.assertEqual(self.rollup(self.vehicle).revenue, 0)
+        self.assertEqual(self.rollup(self.other_vehicle).revenue, 500)
+
+    def test_unrelated_update_fields_skip_rollup_lookup(self):
+        trip = WorkItem.objects.create(
+            title="Trip A",
+            description="Test",
+            created_by=self.manager,
+            vehicle=self.vehicle,
+            revenue=500,
+        )
+        trip.status = WorkItem.TripStatus.DISPATCHED
+        with CaptureQueriesContext(connection) as ctx:
+            trip.save(update_fields=["status", "updated_at"])
+        self.assertFalse(
+            [q for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+        )
+        self.assertEqual(self.rollup(self.vehicle).revenue, 500)
+
+        trip.revenue = 700
+        trip.save(update_fields=["revenue"])
+        self.assertEqual(self.rollup(self.vehicle).revenue, 700)
+
+    def test_fuel_log_update_reads_previous_state_once(self):
+        fuel = FuelLog.objects.create(
+            vehicle=self.vehicle,
+            liters=10,
+            cost=100,
+            odometer_reading=200,
+            date=date(2026, 1, 1),
+        )
+        fuel.cost = 130
+        with CaptureQueriesContext(connection) as ctx:
+            fuel.save()
+        reads = [
+            q for q in ctx.captured_queries
+            if q["sql"].startswith("SELECT") and "workflow_fuellog" in q["sql"]
+        ]
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(self.rollup(self.vehicle).fuel_cost, 130)
+
+    def test_rebuild_command_repairs_drift(self):
+        WorkItem.objects.create(
+            title="Trip A",
+            description="Test",
+            created_by=self.manager,
+            vehicle=self.vehicle,
+            revenue=500,
+        )
+        VehicleFinancials.objects.filter(vehicle=self.vehicle).update(revenue=1)
+        VehicleFinancials.objects.filter(vehicle=self.other_vehicle).delete()
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_vehicle_financials", "--verify", stdout=StringIO())
+
+        call_command("rebuild_vehicle_financials", stdout=StringIO())
+
+        self.assertEqual(self.rollup(self.vehicle).revenue, 500)
+        self.assertEqual(self.rollup(self.other_vehicle).revenue, 0)
+        call_command("rebuild_vehicle_financials", "--verify", stdout=StringIO())
+
+
+
+class TestMonthlyFinanceRollup(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+
+        self.vehicle = Vehicle.objects.create(
+            name="Truck-01",
+            license_plate="MONTH1",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=100,
+        )
+
+    def snapshot(self):
+        return sorted(
+            MonthlyFinanceRollup.objects
+            .exclude(amount=0)
+            .values_list("month", "vehicle_id", "metric", "amount")
+        )
+
+    def test_incremental_rollup_matches_backfill(self):
+        january = FuelLog.objects.create(
+            vehicle=self.vehicle,
+            liters=10,
+            cost=100,
+            odometer_reading=200,
+            date=date(2026, 1, 15),
+        )
+
+        # Move a log to another month and change its amount.
+        january.date = date(2026, 2, 20)
+        january.cost = 80
+        january.save()
+
+        FuelLog.objects.create(
+            vehicle=self.vehicle,
+            liters=10,
+            cost=60,
+            odometer_reading=300,
+            date=date(2026, 2, 3),
+        )
+        WorkItem.objects.create(
+            title="Unassigned",
+            description="Test",
+            created_by=self.manager,
+            revenue=700,
+        )
+
+        self.assertEqual(
+            MonthlyFinanceRollup.objects.get(
+                month=date(2026, 2, 1),
+                vehicle=self.vehicle,
+                metric=MonthlyFinanceRollup.Metric.FUEL_COST,
+            ).amount,
+            140,
+        )
+
+        incremental = self.snapshot()
+        call_command("backfill_monthly_rollups", stdout=StringIO())
+
+        self.assertEqual(self.snapshot(), incremental)
+
+
+
+class TestTripBoardPagination(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+        self.client.force_login(self.manager)
+
+        self.trips = [
+            WorkItem.objects.create(
+                title=f"Trip {n}",
+                description="Test",
+                created_by=self.manager,
+                status=(
+                    WorkItem.TripStatus.COMPLETED if n % 2
+                    else WorkItem.TripStatus.DRAFT
+                ),
+            )
+            for n in range(7)
+        ]
+
+    def walk(self, **params):
+        url = reverse("trip-management")
+        seen = []
+        query = {"page_size": 3, **params}
+
+        while True:
+            response = self.client.get(url, query)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(trip.pk for trip in response.context["trips"])
+
+            next_query = response.context["next_query"]
+            if not next_query:
+                return seen
+            url = reverse("trip-management") + "?" + next_query
+            query = {}
+
+    def test_pages_cover_every_trip_newest_first(self):
+        seen = self.walk()
+
+        self.assertEqual(seen, [trip.pk for trip in reversed(self.trips)])
+
+    def test_status_filter_carries_across_pages(self):
+        seen = self.walk(status=WorkItem.TripStatus.DRAFT)
+
+        expected = [
+            trip.pk for trip in reversed(self.trips)
+            if trip.status == WorkItem.TripStatus.DRAFT
+        ]
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(
+            reverse("trip-management"), {"cursor": "not-a-cursor", "page_size": 3}
+        )
+
+        self.assertEqual(
+            [trip.pk for trip in response.context["trips"]],
+            [trip.pk for trip in reversed(self.trips)][:3],
+        )
+
+
+
+class TestImportFuelLogs(TestCase):
+
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(
+            name="Truck-01",
+            license_plate="IMP1",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=1000,
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_csv(self, rows, extra_columns=()):
+        path = os.path.join(self.tmpdir.name, "fuel.csv")
+        with open(path, "w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow([
+                "license_plate", "date", "liters", "cost", "odometer_reading",
+                *extra_columns,
+            ])
+            writer.writerows(rows)
+        return path
+
+    def test_import_validates_and_batches(self):
+        path = self.write_csv([
+            ["IMP1", "2026-03-05", "40", "300.00", "1500"],
+            ["IMP1", "2026-03-01", "30", "200.00", "1200"],
+            # Older than the 2026-03-05 reading once sorted by date.
+            ["IMP1", "2026-03-09", "10", "90.00", "1400"],
+            ["NOPE", "2026-03-02", "10", "80.00", "10"],
+            ["IMP1", "2026-03-10", "ten", "80.00", "1600"],
+        ])
+
+        call_command(
+            "import_fuel_logs", path, "--batch-size", "1", stdout=StringIO()
+        )
+
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.odometer_current, 1500)
+        self.assertEqual(
+            sorted(FuelLog.objects.values_list("odometer_reading", flat=True)),
+            [1200, 1500],
+        )
+        self.assertEqual(VehicleFinancials.objects.get(vehicle=self.vehicle).fuel_cost, 500)
+        self.assertEqual(
+            MonthlyFinanceRollup.objects.get(
+                vehicle=self.vehicle,
+                metric=MonthlyFinanceRollup.Metric.FUEL_COST,
+            ).amount,
+            500,
+        )
+
+        with open(path + ".rejects.csv", newline="") as handle:
+            rejected_lines = [row[0] for row in csv.reader(handle)][1:]
+        self.assertEqual(sorted(rejected_lines), ["4", "5", "6"])
+
+    def test_import_refreshes_completed_trip_snapshot(self):
+        user = User.objects.create(username="importer")
+        completed = WorkItem.objects.create(
+            title="Done",
+            created_by=user,
+            vehicle=self.vehicle,
+            status=WorkItem.TripStatus.COMPLETED,
+            revenue=1000,
+        )
+        open_trip = WorkItem.objects.create(
+            title="Open",
+            created_by=user,
+            vehicle=self.vehicle,
+            status=WorkItem.TripStatus.IN_PROGRESS,
+            revenue=1000,
+        )
+        completed_at = timezone.now() - timedelta(days=1)
+        snapshot_trips([completed], completed_at=completed_at)
+
+        path = self.write_csv([
+            ["IMP1", "2026-03-01", "30", "200.00", "1200", completed.pk],
+            ["IMP1", "2026-03-02", "10", "50.00", "1300", completed.pk],
+            ["IMP1", "2026-03-03", "10", "80.00", "1400", open_trip.pk],
+        ], extra_columns=["trip_id"])
+
+        call_command(
+            "import_fuel_logs", path, "--batch-size", "2", stdout=StringIO()
+        )
+
+        snapshot = TripFinancials.objects.get(work_item=completed)
+        self.assertEqual(snapshot.fuel_cost, 250)
+        self.assertEqual(snapshot.profit, 750)
+        self.assertEqual(snapshot.completed_at, completed_at)
+        self.assertFalse(TripFinancials.objects.filter(work_item=open_trip).exists())
+
+
+
+class TestTransitionMany(TestCase):
+
+    def setUp(self):
+        self.dispatcher = User.objects.create(
+            username="dispatcher_test",
+            role=User.Role.DISPATCHER
+        )
+
+    def make_trip(self, n, vehicle=None, driver=None):
+        if vehicle is None:
+            vehicle = Vehicle.objects.create(
+                name=f"Truck-{n}",
+                license_plate=f"BATCH{n}",
+                vehicle_type=Vehicle.VehicleType.TRUCK,
+                max_capacity=1000,
+                acquisition_cost=1000,
+                odometer_current=100,
+            )
+        if driver is None:
+            driver = Driver.objects.create(
+                user=User.objects.create(username=f"driver_{n}"),
+                license_expiry=date(2099, 12, 31),
+            )
+        return WorkItem.objects.create(
+            title=f"Trip {n}",
+            description="Test",
+            created_by=self.dispatcher,
+            vehicle=vehicle,
+            driver=driver,
+            cargo_weight=100,
+        )
+
+    def test_batch_reports_per_item_results(self):
+        first = self.make_trip(1)
+        same_vehicle = self.make_trip(2, vehicle=first.vehicle)
+        too_heavy = self.make_trip(3)
+        too_heavy.cargo_weight = 5000
+        too_heavy.save()
+        ok = self.make_trip(4)
+
+        # Audit entries are written once the transaction commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            results = transition_many(
+                [first, same_vehicle, too_heavy, ok],
+                WorkItem.TripStatus.DISPATCHED,
+                self.dispatcher,
+            )
+
+        self.assertEqual([r.ok for r in results], [True, False, False, True])
+        self.assertEqual(
+            results[1].error, "Vehicle already assigned to an active trip."
+        )
+        self.assertEqual(results[2].error, "Cargo exceeds vehicle capacity.")
+        self.assertEqual(
+            list(
+                WorkItem.objects.filter(
+                    status=WorkItem.TripStatus.DISPATCHED
+                ).order_by("pk").values_list("pk", flat=True)
+            ),
+            [first.pk, ok.pk],
+        )
+        self.assertEqual(
+            ActivityLog.objects.filter(work_item__in=[first, ok]).count(), 2
+        )
+        self.assertEqual(same_vehicle.status, WorkItem.TripStatus.DRAFT)
+
+    def test_constraint_race_fails_only_conflicting_trips(self):
+        racing = self.make_trip(1)
+        WorkItem.objects.filter(pk=racing.pk).update(
+            status=WorkItem.TripStatus.DISPATCHED
+        )
+        conflicting = self.make_trip(2, vehicle=racing.vehicle)
+        ok = self.make_trip(3)
+
+        # The racing dispatch committed after the conflict sets were read.
+        with mock.patch(
+            "services.workflow_service._BatchConflicts.vehicle_busy",
+            return_value=False,
+        ), self.captureOnCommitCallbacks(execute=True):
+            results = transition_many(
+                [conflicting, ok],
+                WorkItem.TripStatus.DISPATCHED,
+                self.dispatcher,
+            )
+
+        self.assertEqual([r.ok for r in results], [False, True])
+        self.assertEqual(
+            results[0].error, "Vehicle already assigned to an active trip."
+        )
+        self.assertEqual(conflicting.status, WorkItem.TripStatus.DRAFT)
+        conflicting.refresh_from_db()
+        ok.refresh_from_db()
+        self.assertEqual(conflicting.status, WorkItem.TripStatus.DRAFT)
+        self.assertEqual(ok.status, WorkItem.TripStatus.DISPATCHED)
+        self.assertEqual(ActivityLog.objects.filter(work_item=ok).count(), 1)
+
+    def test_query_count_independent_of_batch_size(self):
+        def dispatch(trips):
+            trips = list(WorkItem.objects.filter(pk__in=[t.pk for t in trips]))
+            with CaptureQueriesContext(connection) as ctx:
+                results = transition_many(
+                    trips, WorkItem.TripStatus.DISPATCHED, self.dispatcher
+                )
+            self.assertTrue(all(r.ok for r in results))
+            return len(ctx.captured_queries)
+
+        small = dispatch([self.make_trip(n) for n in range(2)])
+        large = dispatch([self.make_trip(n) for n in range(10, 20)])
+
+        self.assertEqual(small, large)
+
+
+class TestPostgresProfile(TestCase):
+
+    def load_settings(self, **env):
+        # Fresh copy of config/settings.py; django.conf.settings is
+        # already configured and unaffected.
+        path = Path(__file__).resolve().parents[2] / "config" / "settings.py"
+        spec = spec_from_file_location("settings_probe", path)
+        module = module_from_spec(spec)
+        with mock.patch.dict(os.environ, env):
+            spec.loader.exec_module(module)
+        return module
+
+    def test_default_profile_is_sqlite(self):
+        module = self.load_settings()
+        self.assertEqual(
+            module.DATABASES["default"]["ENGINE"],
+            "django.db.backends.sqlite3",
+        )
+
+    def test_postgres_profile_from_environment(self):
+        module = self.load_settings(
+            FLEETFLOW_DB_ENGINE="postgres",
+            FLEETFLOW_DB_NAME="fleet",
+            FLEETFLOW_DB_STATEMENT_TIMEOUT="3000",
+        )
+        db = module.DATABASES["default"]
+
+        self.assertEqual(db["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(db["NAME"], "fleet")
+        self.assertTrue(db["CONN_HEALTH_CHECKS"])
+        self.assertIn("statement_timeout=3000", db["OPTIONS"]["options"])
+        # Pooling and persistent connections are mutually exclusive.
+        if "pool" in db["OPTIONS"]:
+            self.assertEqual(db["CONN_MAX_AGE"], 0)
+        else:
+            self.assertGreater(db["CONN_MAX_AGE"], 0)
+        self.assertTrue(module.KPI_PARALLEL_QUERIES)
+
+    def test_statement_timeout_is_noop_off_postgres(self):
+        if connection.vendor == "postgresql":
+            self.skipTest("PostgreSQL backend")
+
+        with CaptureQueriesContext(connection) as ctx:
+            with statement_timeout("interactive"):
+                pass
+
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    @skipUnless(connection.vendor == "postgresql", "PostgreSQL only")
+    def test_statement_timeout_sets_and_resets(self):
+        def current():
+            with connection.cursor() as cursor:
+                cursor.execute("SHOW statement_timeout")
+                return cursor.fetchone()[0]
+
+        default = current()
+        with self.settings(STATEMENT_TIMEOUTS={"interactive": 1500}):
+            with statement_timeout("interactive"):
+                self.assertEqual(current(), "1500ms")
+
+        self.assertEqual(current(), default)
+
+
+class TestRequestMetrics(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+        self.client.force_login(self.manager)
+        override = self.settings(METRICS_TOKEN="secret")
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def sample(self, text, line_prefix):
+        for line in text.splitlines():
+            if line.startswith(line_prefix):
+                return float(line.rsplit(" ", 1)[1])
+        return 0.0
+
+    def scrape(self):
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        return response.content.decode()
+
+    def test_trip_board_request_is_recorded(self):
+        count = 'fleetflow_request_duration_seconds_count{view="trip-management",method="GET"}'
+        queries = 'fleetflow_request_sql_queries_sum{view="trip-management"}'
+        templates = 'fleetflow_request_template_duration_seconds_sum{view="trip-management"}'
+
+        before = self.scrape()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("trip-management"))
+        # Read before the next request resets connection.queries.
+        executed = len(ctx.captured_queries)
+        after = self.scrape()
+
+        self.assertEqual(self.sample(after, count) - self.sample(before, count), 1)
+        self.assertEqual(
+            self.sample(after, queries) - self.sample(before, queries),
+            executed,
+        )
+        self.assertGreater(self.sample(after, templates), self.sample(before, templates))
+        self.assertIn(
+            'fleetflow_request_duration_seconds_bucket{view="trip-management",method="GET",le="+Inf"}',
+            after,
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram("test_seconds", "Test.", ("view",), (0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, "v")
+
+        text = metrics.render_metrics([histogram])
+
+        self.assertIn('test_seconds_bucket{view="v",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{view="v",le="1.0"} 2', text)
+        self.assertIn('test_seconds_bucket{view="v",le="+Inf"} 3', text)
+        self.assertIn('test_seconds_count{view="v"} 3', text)
+
+    def test_token_protects_endpoint(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_endpoint_closed_without_token_outside_debug(self):
+        with self.settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+            with self.settings(DEBUG=True):
+                self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
+
+
+class TestSeedAndBench(TestCase):
+
+    def seed(self, **options):
+        call_command(
+            "seed_fleet",
+            vehicles=3,
+            months=2,
+            trips_per_month=2,
+            stdout=StringIO(),
+            **options,
+        )
+
+    def test_seed_fleet_generates_consistent_history(self):
+        self.seed()
+
+        self.assertEqual(Vehicle.objects.count(), 3)
+        self.assertEqual(Driver.objects.count(), 3)
+        self.assertEqual(WorkItem.objects.count(), 3 * 2 * 2)
+        self.assertTrue(ActivityLog.objects.exists())
+        # Trips are back-dated across the requested months.
+        months = {
+            (d.year, d.month)
+            for d in WorkItem.objects.values_list("created_at", flat=True)
+        }
+        self.assertEqual(len(months), 2)
+        # Rollups were rebuilt after the bulk writes.
+        call_command("rebuild_vehicle_financials", verify=True, stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed(clear=True)
+        self.assertEqual(Vehicle.objects.count(), 3)
+
+    def test_bench_reports_json_and_enforces_budget(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "bench.json")
+            budget = os.path.join(tmp, "budget.json")
+            with open(budget, "w") as fh:
+                fh.write('{"service:monthly_totals": {"queries": 0}}')
+
+            with self.assertRaisesMessage(CommandError, "service:monthly_totals"):
+                call_command(
+                    "bench",
+                    sizes="2",
+                    months=1,
+                    repeat=2,
+                    json=out,
+                    budget=budget,
+                    stdout=StringIO(),
+                    stderr=StringIO(),
+                )
+
+            with open(out) as fh:
+                report = json.load(fh)
+
+        targets = {result["target"] for result in report["results"]}
+        self.assertIn("view:financial_analytics", targets)
+        self.assertIn("service:fleet_kpi_snapshot", targets)
+        for result in report["results"]:
+            self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+        self.assertEqual(len(report["violations"]), 1)
+        # Seeded rows are removed afterwards.
+        self.assertFalse(Vehicle.objects.exists())
+
+
+class TestAuditWriter(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+        self.trip = WorkItem.objects.create(
+            title="Trip",
+            description="Test",
+            created_by=self.manager,
+        )
+
+    def test_entries_written_on_commit_with_structured_fields(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            audit.record(
+                self.trip, self.manager,
+                WorkItem.TripStatus.DRAFT, WorkItem.TripStatus.CANCELLED,
+            )
+            self.assertFalse(ActivityLog.objects.exists())
+
+        entry = ActivityLog.objects.get()
+        self.assertEqual(entry.from_status, WorkItem.TripStatus.DRAFT)
+        self.assertEqual(entry.to_status, WorkItem.TripStatus.CANCELLED)
+        self.assertEqual(entry.action, "Status changed to CANCELLED")
+
+    def test_rolled_back_entries_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    audit.record(self.trip, self.manager, to_status="DISPATCHED")
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            audit.record(self.trip, self.manager, to_status="CANCELLED")
+
+        self.assertEqual(
+            list(ActivityLog.objects.values_list("to_status", flat=True)),
+            ["CANCELLED"],
+        )
+
+    def test_batch_flushes_with_one_insert(self):
+        with CaptureQueriesContext(connection) as ctx:
+            with audit.audit_batch():
+                with self.captureOnCommitCallbacks(execute=True):
+                    for status in ("DISPATCHED", "IN_PROGRESS", "COMPLETED"):
+                        audit.record(self.trip, self.manager, to_status=status)
+                self.assertFalse(ActivityLog.objects.exists())
+
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ActivityLog.objects.count(), 3)
+
+    def test_background_writer_applies_backpressure(self):
+        release = threading.Event()
+        written = []
+
+        def slow_write(entries):
+            if threading.current_thread().name == "audit-writer":
+                release.wait()
+            written.append(list(entries))
+
+        writer = audit.AuditWriter(maxsize=1, put_timeout=0.01, write=slow_write)
+        writer.submit(["a"])    # taken by the writer thread, which blocks
+        time.sleep(0.05)
+        writer.submit(["b"])    # fills the queue
+        writer.submit(["c"])    # queue full: the caller writes it
+        self.assertEqual(written, [["c"]])
+
+        release.set()
+        writer.drain()
+
+        self.assertEqual(sorted(sum(written, [])), ["a", "b", "c"])
+
+    @override_settings(AUDIT_RETRY_DELAY=0)
+    def test_failed_writes_are_retried(self):
+        attempts = []
+
+        def flaky_write(entries):
+            attempts.append(list(entries))
+            if len(attempts) < 3:
+                raise IntegrityError("database is locked")
+
+        writer = audit.AuditWriter(write=flaky_write)
+        writer.submit(["a"])
+        writer.drain()
+
+        self.assertEqual(attempts, [["a"]] * 3)
+
+    @override_settings(AUDIT_RETRY_DELAY=0, AUDIT_WRITE_RETRIES=1)
+    def test_failed_flush_is_logged_not_raised(self):
+        with mock.patch.object(
+            ActivityLog.objects, "bulk_create", side_effect=IntegrityError("down")
+        ), self.assertLogs("services.audit", "ERROR") as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                audit.record(self.trip, self.manager, to_status="DISPATCHED")
+
+        self.assertIn("Dropping 1 audit entries after 2 attempts", logs.output[0])
+        self.assertIn("to='DISPATCHED'", logs.output[0])
+        self.assertFalse(ActivityLog.objects.exists())
+
+
+class TestActivityArchive(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = self.settings(ACTIVITY_ARCHIVE_DIR=self.tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+        self.trip = WorkItem.objects.create(
+            title="Trip",
+            description="Test",
+            created_by=self.manager,
+        )
+        self.other = WorkItem.objects.create(
+            title="Other",
+            description="Test",
+            created_by=self.manager,
+        )
+
+    def log(self, work_item, to_status, timestamp):
+        return ActivityLog.objects.create(
+            work_item=work_item,
+            action=f"Status changed to {to_status}",
+            to_status=to_status,
+            performed_by=self.manager,
+            timestamp=timestamp,
+        )
+
+    def archive(self, **options):
+        call_command("archive_activity", stdout=StringIO(), **options)
+
+    def test_old_rows_move_to_partitioned_archive(self):
+        jan = datetime(2025, 1, 10, tzinfo=dt_timezone.utc)
+        feb = datetime(2025, 2, 3, tzinfo=dt_timezone.utc)
+        self.log(self.trip, "DISPATCHED", jan)
+        self.log(self.trip, "IN_PROGRESS", feb)
+        self.log(self.other, "CANCELLED", jan)
+        recent = self.log(self.trip, "COMPLETED", timezone.now())
+
+        self.archive(older_than=30, batch_size=2)
+
+        self.assertEqual(list(ActivityLog.objects.values_list("pk", flat=True)), [recent.pk])
+        # One data file per run and partition, named after the run.
+        run = re.compile(r"\.\d{8}T\d{6}-[0-9a-f]{8}\.")
+        files = sorted(
+            run.sub(".<run>.", str(path.relative_to(self.tmp.name)))
+            for path in Path(self.tmp.name).rglob("*")
+            if path.is_file()
+        )
+        self.assertEqual(files, [
+            "2025/activity-2025-01.<run>.jsonl.gz",
+            "2025/activity-2025-01.index.json",
+            "2025/activity-2025-02.<run>.jsonl.gz",
+            "2025/activity-2025-02.index.json",
+        ])
+
+        archived = archived_history(self.trip.pk)
+        self.assertEqual([r["to_status"] for r in archived], ["DISPATCHED", "IN_PROGRESS"])
+        self.assertEqual(archived[0]["timestamp"], jan)
+        self.assertEqual(
+            [r["to_status"] for r in activity_history(self.trip.pk)],
+            ["DISPATCHED", "IN_PROGRESS", "COMPLETED"],
+        )
+
+    def test_reruns_add_files_and_dry_run_keeps_rows(self):
+        jan = datetime(2025, 1, 10, tzinfo=dt_timezone.utc)
+        self.log(self.trip, "DISPATCHED", jan)
+        self.archive(older_than=30)
+        self.log(self.trip, "CANCELLED", jan + timedelta(days=1))
+
+        self.archive(older_than=30, dry_run=True)
+        self.assertEqual(ActivityLog.objects.count(), 1)
+
+        self.archive(older_than=30)
+        self.assertFalse(ActivityLog.objects.exists())
+        self.assertEqual(
+            [r["to_status"] for r in archived_history(self.trip.pk)],
+            ["DISPATCHED", "CANCELLED"],
+        )
+        self.assertEqual(archived_history(self.other.pk), [])
+        self.assertEqual(len(list(Path(self.tmp.name).glob("2025/*.jsonl.gz"))), 2)
+
+    def test_crashed_run_is_read_up_to_its_truncated_tail(self):
+        jan = datetime(2025, 1, 10, tzinfo=dt_timezone.utc)
+        self.log(self.trip, "DISPATCHED", jan)
+        self.archive(older_than=30)
+        [finished] = Path(self.tmp.name).glob("2025/*.jsonl.gz")
+
+        # A run that synced a batch, deleted it and died before close().
+        self.log(self.trip, "CANCELLED", jan + timedelta(days=1))
+        writer = ArchiveWriter()
+        for row in ActivityLog.objects.values_list(*FIELDS):
+            writer.write(row)
+        writer.sync()
+        ActivityLog.objects.all().delete()
+
+        # And a finished file that lost its gzip trailer.
+        finished.write_bytes(finished.read_bytes()[:-8])
+
+        self.assertEqual(
+            [r["to_status"] for r in archived_history(self.trip.pk)],
+            ["DISPATCHED", "CANCELLED"],
+        )
+
+
+class TestTripAutocomplete(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+        self.client.force_login(self.manager)
+
+        self.small = Vehicle.objects.create(
+            name="Van-01",
+            license_plate="AC001",
+            vehicle_type=Vehicle.VehicleType.VAN,
+            max_capacity=500,
+            acquisition_cost=100,
+            odometer_current=0,
+        )
+        self.large = Vehicle.objects.create(
+            name="Truck-01",
+            license_plate="VT002",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=5000,
+            acquisition_cost=100,
+            odometer_current=0,
+        )
+        Vehicle.objects.create(
+            name="Van-02",
+            license_plate="AC003",
+            vehicle_type=Vehicle.VehicleType.VAN,
+            max_capacity=800,
+            acquisition_cost=100,
+            odometer_current=0,
+            status=Vehicle.Status.IN_SHOP,
+        )
+
+        self.drivers = [
+            Driver.objects.create(
+                user=User.objects.create(
+                    username=f"driver_{n}", role=User.Role.DISPATCHER
+                ),
+                license_expiry=timezone.localdate() + timedelta(days=30),
+            )
+            for n in range(3)
+        ]
+        Driver.objects.create(
+            user=User.objects.create(username="driver_expired"),
+            license_expiry=timezone.localdate() - timedelta(days=1),
+        )
+
+    def results(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.json()["results"]]
+
+    def test_vehicle_prefix_and_capacity_filter(self):
+        self.assertEqual(
+            self.results("vehicle_autocomplete", q="van"), [self.small.pk]
+        )
+        self.assertEqual(
+            self.results("vehicle_autocomplete", q="vt"), [self.large.pk]
+        )
+        self.assertEqual(
+            self.results("vehicle_autocomplete", min_capacity="750"),
+            [self.large.pk],
+        )
+
+        for value in ("heavy", "NaN", "Infinity", "-inf"):
+            response = self.client.get(
+                reverse("vehicle_autocomplete"), {"min_capacity": value}
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_driver_prefix_limit_and_license(self):
+        self.assertEqual(
+            self.results("driver_autocomplete", q="driver_"),
+            [driver.pk for driver in self.drivers],
+        )
+        self.assertEqual(
+            self.results("driver_autocomplete", q="driver_", limit=2),
+            [driver.pk for driver in self.drivers[:2]],
+        )
+
+    def test_endpoints_require_dispatch_role(self):
+        self.client.force_login(User.objects.create(
+            username="analyst_test",
+            role=User.Role.FINANCIAL_ANALYST
+        ))
+
+        response = self.client.get(reverse("driver_autocomplete"))
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_form_validates_by_pk_without_listing_choices(self):
+        url = reverse("trip-management")
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        before = len(ctx.captured_queries)
+
+        for n in range(5):
+            Driver.objects.create(
+                user=User.objects.create(username=f"extra_{n}"),
+                license_expiry=timezone.localdate() + timedelta(days=30),
+            )
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        self.assertEqual(len(ctx.captured_queries), before)
+
+        response = self.client.post(url, {
+            "title": "Autocomplete trip",
+            "description": "Test",
+            "vehicle": self.large.pk,
+            "driver": self.drivers[0].pk,
+            "cargo_weight": 1000,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            WorkItem.objects.filter(
+                vehicle=self.large, driver=self.drivers[0]
+            ).exists()
+        )
+
+        response = self.client.post(url, {
+            "title": "Too heavy",
+            "description": "Test",
+            "vehicle": self.small.pk,
+            "driver": self.drivers[1].pk,
+            "cargo_weight": 1000,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["form"].errors)
+
+
+class TestTripSearch(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+        self.client.force_login(self.manager)
+
+        self.cement = WorkItem.objects.create(
+            title="Cement to Mumbai",
+            description="Forty bags, handle with care",
+            origin="Pune",
+            destination="Mumbai",
+            created_by=self.manager,
+        )
+        self.steel = WorkItem.objects.create(
+            title="Steel coils",
+            description="Deliver to the Mumbai port warehouse",
+            origin="Nagpur",
+            destination="Chennai",
+            created_by=self.manager,
+        )
+
+    def ids(self, query):
+        return [pk for pk, _ in search_trips(query)]
+
+    def test_prefix_terms_ranked_title_first(self):
+        self.assertEqual(self.ids("mumb"), [self.cement.pk, self.steel.pk])
+        self.assertEqual(self.ids("mumb cem"), [self.cement.pk])
+        self.assertEqual(self.ids('steel" OR "cement'), [])
+        self.assertEqual(self.ids("  "), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.steel.title = "Granite slabs"
+        self.steel.save()
+        WorkItem.objects.filter(pk=self.cement.pk).update(origin="Kolhapur")
+
+        self.assertEqual(self.ids("steel"), [])
+        self.assertEqual(self.ids("granite"), [self.steel.pk])
+        self.assertEqual(self.ids("kolhap"), [self.cement.pk])
+
+        self.steel.delete()
+        self.assertEqual(self.ids("granite"), [])
+
+    def test_endpoint_and_admin_use_index(self):
+        response = self.client.get(reverse("trip_search"), {"q": "chennai"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["id"] for row in response.json()["results"]], [self.steel.pk]
+        )
+
+        self.manager.is_staff = self.manager.is_superuser = True
+        self.manager.save()
+        response = self.client.get(
+            reverse("admin:workflow_workitem_changelist"), {"q": "pune"}
+        )
+        self.assertEqual(
+            [trip.pk for trip in response.context["cl"].result_list],
+            [self.cement.pk],
+        )
+
+    def test_rebuild_restores_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER workflow_workitem_fts_ai")
+        call_command("rebuild_trip_search", stdout=StringIO())
+
+        trip = WorkItem.objects.create(
+            title="Rice sacks", description="", created_by=self.manager
+        )
+        self.assertEqual(self.ids("rice"), [trip.pk])
+
+
+class TestAdminChangelists(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create(
+            username="admin_test",
+            role=User.Role.FLEET_MANAGER,
+            is_staff=True,
+            is_superuser=True,
+        )
+        self.client.force_login(self.admin)
+
+    def add_trips(self, count):
+        start = WorkItem.objects.count()
+        for n in range(start, start + count):
+            vehicle = Vehicle.objects.create(
+                name=f"Truck-{n}",
+                license_plate=f"ADM{n:03d}",
+                vehicle_type=Vehicle.VehicleType.TRUCK,
+                max_capacity=1000,
+                acquisition_cost=100,
+                odometer_current=0,
+            )
+            driver = Driver.objects.create(
+                user=User.objects.create(username=f"admin_driver_{n}"),
+                license_expiry=date(2030, 1, 1),
+            )
+            trip = WorkItem.objects.create(
+                title=f"Trip {n}",
+                description="Test",
+                vehicle=vehicle,
+                driver=driver,
+                created_by=self.admin,
+            )
+            FuelLog.objects.create(
+                vehicle=vehicle, trip=trip, liters=10, cost=900,
+                odometer_reading=100, date=date(2026, 1, 1),
+            )
+            MaintenanceLog.objects.create(
+                vehicle=vehicle, description="Service", cost=50,
+            )
+
+    def queries(self, model):
+        url = reverse(f"admin:workflow_{model}_changelist")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+            executed = len(ctx.captured_queries)
+        self.assertEqual(response.status_code, 200)
+        return executed
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        models = ["workitem", "driver", "fuellog", "maintenancelog"]
+        self.add_trips(2)
+        before = {model: self.queries(model) for model in models}
+
+        self.add_trips(6)
+
+        self.assertEqual({model: self.queries(model) for model in models}, before)
+
+    def test_large_tables_use_estimated_count(self):
+        self.add_trips(3)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        with self.settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=2):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse("admin:workflow_workitem_changelist"))
+                sql = [query["sql"] for query in ctx.captured_queries]
+
+        self.assertEqual(response.context["cl"].result_count, 3)
+        self.assertFalse(any("COUNT(*)" in statement for statement in sql))
+        self.assertTrue(any("sqlite_stat1" in statement for statement in sql))
+
+        with self.settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1000):
+            response = self.client.get(reverse("admin:workflow_workitem_changelist"))
+        self.assertEqual(response.context["cl"].result_count, 3)
+
+
+class TestVehicleFinancialMemoization(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+        for n in range(3):
+            vehicle = Vehicle.objects.create(
+                name=f"Truck-{n}",
+                license_plate=f"MEMO{n}",
+                vehicle_type=Vehicle.VehicleType.TRUCK,
+                max_capacity=1000,
+                acquisition_cost=1000,
+                odometer_current=100,
+            )
+            FuelLog.objects.create(
+                vehicle=vehicle, liters=10, cost=200,
+                odometer_reading=200, date=date(2026, 1, 1),
+            )
+            WorkItem.objects.create(
+                title=f"Trip {n}", description="Test", created_by=self.manager,
+                vehicle=vehicle, revenue=1500,
+            )
+
+    def figures(self, vehicle):
+        return (
+            vehicle.total_operational_cost(),
+            vehicle.total_profit(),
+            vehicle.cost_per_km(),
+            vehicle.profit_per_km(),
+        )
+
+    def test_methods_aggregate_once_per_instance(self):
+        vehicle = Vehicle.objects.get(license_plate="MEMO0")
+
+        with self.assertNumQueries(3):
+            first = self.figures(vehicle)
+            self.assertEqual(self.figures(vehicle), first)
+
+        self.assertEqual(first[:2], (1200, 300))
+
+    def test_prefetch_financials_is_one_query_per_list(self):
+        with self.assertNumQueries(2):
+            vehicles = list(Vehicle.objects.prefetch_financials().order_by("pk"))
+            rows = [self.figures(vehicle) for vehicle in vehicles]
+
+        self.assertEqual(
+            rows,
+            [self.figures(vehicle) for vehicle in Vehicle.objects.order_by("pk")],
+        )
+        self.assertEqual(
+            Vehicle.objects.prefetch_financials().filter(
+                license_plate="MEMO1"
+            ).get().total_revenue(),
+            1500,
+        )
+
+    def test_saving_log_through_instance_invalidates(self):
+        vehicle = Vehicle.objects.prefetch_financials().get(license_plate="MEMO2")
+        self.assertEqual(vehicle.total_fuel_cost(), 200)
+
+        vehicle.fuel_logs.create(
+            liters=5, cost=100, odometer_reading=300, date=date(2026, 1, 2)
+        )
+        MaintenanceLog.objects.create(vehicle=vehicle, description="Tyres", cost=50)
+
+        self.assertEqual(vehicle.total_fuel_cost(), 300)
+        self.assertEqual(vehicle.total_operational_cost(), 1350)
+
+
+class TestTripFinancials(TestCase):
+
+    def setUp(self):
+        self.driver_user = User.objects.create(
+            username="driver_test",
+            role=User.Role.DISPATCHER
+        )
+        self.driver = Driver.objects.create(
+            user=self.driver_user,
+            license_expiry=date(2099, 12, 31),
+        )
+        self.vehicle = Vehicle.objects.create(
+            name="Truck-01",
+            license_plate="PNL001",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=100,
+        )
+
+    def trip(self, status, **fields):
+        trip = WorkItem.objects.create(
+            title="Cement",
+            description="Test",
+            created_by=self.driver_user,
+            vehicle=self.vehicle,
+            driver=self.driver,
+            status=status,
+            origin="Pune",
+            destination="Mumbai",
+            revenue=1000,
+            estimated_fuel_cost=250,
+            start_odometer=100,
+            end_odometer=300,
+            **fields,
+        )
+        FuelLog.objects.create(
+            vehicle=self.vehicle, trip=trip, liters=10, cost=200,
+            odometer_reading=300, date=date(2026, 1, 1),
+        )
+        FuelLog.objects.create(
+            vehicle=self.vehicle, trip=trip, liters=5, cost=100,
+            odometer_reading=300, date=date(2026, 1, 2),
+        )
+        return trip
+
+    def test_completion_writes_snapshot(self):
+        trip = self.trip(WorkItem.TripStatus.IN_PROGRESS)
+
+        transition(trip, WorkItem.TripStatus.COMPLETED, self.driver_user)
+
+        snapshot = TripFinancials.objects.get(work_item=trip)
+        self.assertEqual(snapshot.distance, 200)
+        self.assertEqual(snapshot.fuel_cost, 300)
+        self.assertEqual(snapshot.fuel_variance, 50)
+        self.assertEqual(snapshot.profit, 700)
+        self.assertEqual(snapshot.revenue_per_km, Decimal("5.00"))
+        self.assertEqual(snapshot.margin, Decimal("0.7000"))
+        self.assertEqual(snapshot.vehicle_id, self.vehicle.pk)
+        self.assertEqual(snapshot.completed_at, trip.updated_at)
+
+        self.assertEqual(
+            profitability("lane"),
+            [{
+                "origin": "Pune",
+                "destination": "Mumbai",
+                "trips": 1,
+                "distance": 200,
+                "revenue": Decimal("1000"),
+                "fuel_cost": Decimal("300"),
+                "profit": Decimal("700"),
+                "margin": Decimal("0.7000"),
+            }],
+        )
+
+    def test_backfill_uses_audit_completion_time(self):
+        completed = self.trip(WorkItem.TripStatus.COMPLETED)
+        self.trip(WorkItem.TripStatus.CANCELLED)
+        at = timezone.now() - timedelta(days=30)
+        ActivityLog.objects.create(
+            work_item=completed,
+            action="Status changed to COMPLETED",
+            to_status=WorkItem.TripStatus.COMPLETED,
+            performed_by=self.driver_user,
+            timestamp=at,
+        )
+
+        call_command("backfill_trip_financials", stdout=StringIO())
+
+        snapshot = TripFinancials.objects.get()
+        self.assertEqual(snapshot.work_item_id, completed.pk)
+        self.assertEqual(snapshot.completed_at, at)
+
+        # Bulk writes skip the refresh signal.
+        FuelLog.objects.bulk_create([FuelLog(
+            vehicle=self.vehicle, trip=completed, liters=1, cost=50,
+            odometer_reading=300, date=date(2026, 1, 3),
+        )])
+        call_command("backfill_trip_financials", stdout=StringIO())
+        self.assertEqual(TripFinancials.objects.get().fuel_cost, 300)
+
+        call_command("backfill_trip_financials", "--refresh", stdout=StringIO())
+        self.assertEqual(TripFinancials.objects.get().fuel_cost, 350)
+
+
+    def test_fuel_log_changes_refresh_completed_snapshot(self):
+        trip = self.trip(WorkItem.TripStatus.IN_PROGRESS)
+        transition(trip, WorkItem.TripStatus.COMPLETED, self.driver_user)
+        completed_at = TripFinancials.objects.get().completed_at
+
+        late = FuelLog.objects.create(
+            vehicle=self.vehicle, trip=trip, liters=1, cost=50,
+            odometer_reading=300, date=date(2026, 1, 3),
+        )
+        snapshot = TripFinancials.objects.get()
+        self.assertEqual(snapshot.fuel_cost, 350)
+        self.assertEqual(snapshot.profit, 650)
+        self.assertEqual(snapshot.completed_at, completed_at)
+
+        late.trip = None
+        late.save()
+        self.assertEqual(TripFinancials.objects.get().fuel_cost, 300)
+
+        trip.fuel_logs.get(cost=200).delete()
+        self.assertEqual(TripFinancials.objects.get().fuel_cost, 100)
+
+        # Trips that are not completed have no snapshot to refresh.
+        open_trip = self.trip(WorkItem.TripStatus.IN_PROGRESS)
+        self.assertFalse(TripFinancials.objects.filter(work_item=open_trip).exists())
+
+    def test_margin_left_empty_when_revenue_is_tiny(self):
+        trip = self.trip(WorkItem.TripStatus.IN_PROGRESS)
+        trip.revenue = Decimal("0.01")
+        trip.save()
+        FuelLog.objects.create(
+            vehicle=self.vehicle, trip=trip, liters=50, cost=1000,
+            odometer_reading=300, date=date(2026, 1, 3),
+        )
+
+        transition(trip, WorkItem.TripStatus.COMPLETED, self.driver_user)
+
+        snapshot = TripFinancials.objects.get()
+        # -1299.99 / 0.01 does not fit the margin column.
+        self.assertEqual(snapshot.profit, Decimal("-1299.99"))
+        self.assertIsNone(snapshot.margin)
+
+
+class TestFuelAnalytics(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create(
+            username="manager_test",
+            role=User.Role.FLEET_MANAGER
+        )
+        self.client.force_login(self.manager)
+
+        self.vehicle = Vehicle.objects.create(
+            name="Truck-01",
+            license_plate="FUEL001",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=0,
+        )
+        odometer = 0
+        for day in range(1, 9):
+            odometer += 100
+            self.refuel(day, odometer, liters=10 + day % 2)
+
+        self.guzzler = self.refuel(9, odometer + 100, liters=30)
+        self.stalled = self.refuel(10, odometer + 100, liters=20)
+
+    def refuel(self, day, odometer, liters):
+        return FuelLog.objects.create(
+            vehicle=self.vehicle,
+            liters=liters,
+            cost=liters * 100,
+            odometer_reading=odometer,
+            date=date(2026, 1, day),
+        )
+
+    def test_lag_distance_and_zscore_flags(self):
+        anomalies = fuel_anomalies()
+
+        self.assertEqual(
+            [row["id"] for row in anomalies], [self.stalled.pk, self.guzzler.pk]
+        )
+        guzzler = anomalies[1]
+        self.assertEqual(guzzler["distance"], 100)
+        self.assertAlmostEqual(guzzler["km_per_liter"], 3.333)
+        self.assertLess(guzzler["efficiency_z"], -3)
+        self.assertGreater(guzzler["cost_z"], 3)
+        self.assertEqual(anomalies[0]["distance"], 0)
+
+        [row] = vehicle_efficiency()
+        self.assertEqual(row["refuels"], 10)
+        self.assertEqual(row["distance"], 800)
+        self.assertEqual(row["anomalies"], 2)
+
+        self.assertEqual(fuel_anomalies(date_to=date(2026, 1, 8)), [])
+        self.assertEqual(
+            [row["id"] for row in fuel_anomalies(date_from=date(2026, 1, 10))],
+            [self.stalled.pk],
+        )
+
+    def test_vehicles_without_efficiency_sort_last(self):
+        # A single refuel has no previous reading, so no km/L.
+        idle = Vehicle.objects.create(
+            name="Truck-00",
+            license_plate="FUEL000",
+            vehicle_type=Vehicle.VehicleType.TRUCK,
+            max_capacity=1000,
+            acquisition_cost=1000,
+            odometer_current=0,
+        )
+        FuelLog.objects.create(
+            vehicle=idle, liters=10, cost=1000,
+            odometer_reading=50, date=date(2026, 1, 1),
+        )
+
+        rows = vehicle_efficiency()
+
+        self.assertEqual(
+            [row["vehicle_id"] for row in rows], [self.vehicle.pk, idle.pk]
+        )
+        self.assertIsNone(rows[1]["km_per_liter"])
+
+    def test_report_and_api(self):
+        response = self.client.get(reverse("fuel_report"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Truck-01 (FUEL001)")
+
+        response = self.client.get(
+            reverse("fuel_analytics_api"), {"vehicle": self.vehicle.pk, "limit": 1}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["id"] for row in response.json()["anomalies"]], [self.stalled.pk]
+        )
+        # 800 km over the 103 L of the refuels after the first one.
+        self.assertEqual(response.json()["vehicles"][0]["km_per_liter"], 7.767)
+
+        response = self.client.get(reverse("fuel_analytics_api"), {"date_from": "soon"})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestColumnarAnalytics(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username="analyst_test",
+            role=User.Role.FINANCIAL_ANALYST
+        )
+        self.truck, self.van = [
+            Vehicle.objects.create(
+                name=name,
+                license_plate=name.upper(),
+                vehicle_type=vehicle_type,
+                max_capacity=1000,
+                acquisition_cost=1000,
+                odometer_current=0,
+            )
+            for name, vehicle_type in (
+                ("Truck-01", Vehicle.VehicleType.TRUCK),
+                ("Van-01", Vehicle.VehicleType.VAN),
+            )
+        ]
+        for vehicle, day, cost in (
+            (self.truck, date(2026, 1, 5), "10.10"),
+            (self.truck, date(2026, 1, 20), "20.20"),
+            (self.truck, date(2026, 3, 2), "30.05"),
+            (self.van, date(2026, 1, 9), "0.10"),
+        ):
+            FuelLog.objects.create(
+                vehicle=vehicle, liters=1, cost=Decimal(cost),
+                odometer_reading=0, date=day,
+            )
+        WorkItem.objects.create(
+            title="Unassigned",
+            description="Test",
+            created_by=self.user,
+            origin="Pune",
+            destination="Mumbai",
+            revenue=Decimal("99.99"),
+        )
+
+    def test_money_columns_are_integer_cents(self):
+        columns = columnar_analytics.load_money("fuel_cost", chunk_size=3)
+
+        self.assertEqual(columns.cents.dtype.kind, "i")
+        self.assertEqual(sorted(columns.cents.tolist()), [10, 1010, 2020, 3005])
+        self.assertEqual(str(columns.day.dtype), "datetime64[D]")
+
+        columns = columnar_analytics.load_money("fuel_cost", date_from=date(2026, 2, 1))
+        self.assertEqual(columns.cents.tolist(), [3005])
+
+    def test_group_statistics(self):
+        columns = columnar_analytics.load_money("fuel_cost")
+
+        truck = columnar_analytics.summarize(columns, "vehicle")[0]
+        self.assertEqual(truck["key"], self.truck.pk)
+        self.assertEqual(truck["count"], 3)
+        self.assertEqual(truck["sum"], Decimal("60.35"))
+        self.assertEqual(truck["min"], Decimal("10.10"))
+        self.assertEqual(truck["max"], Decimal("30.05"))
+        self.assertEqual(truck["p50"], Decimal("20.20"))
+        self.assertEqual(truck["p90"], Decimal("28.08"))
+
+        by_type = columnar_analytics.summarize(columns, "type")
+        self.assertEqual(
+            [(row["key"], row["sum"]) for row in by_type],
+            [("TRUCK", Decimal("60.35")), ("VAN", Decimal("0.10"))],
+        )
+
+        by_month = columnar_analytics.summarize(columns, "month")
+        self.assertEqual(
+            [(row["key"], row["count"]) for row in by_month],
+            [(date(2026, 1, 1), 3), (date(2026, 3, 1), 1)],
+        )
+
+        rolling = columnar_analytics.rolling_monthly(columns, window=2)
+        self.assertEqual(
+            [(row["total"], row["rolling_mean"]) for row in rolling],
+            [
+                (Decimal("30.40"), None),
+                (Decimal("0.00"), Decimal("15.20")),
+                (Decimal("30.05"), Decimal("15.02")),
+            ],
+        )
+
+    def test_unassigned_revenue_and_orm_reference(self):
+        from apps.workflow.management.commands.bench import orm_fleet_statistics
+
+        stats = columnar_analytics.fleet_statistics()
+        [revenue] = stats["revenue"]["by_type"]
+        self.assertEqual(revenue["key"], "UNASSIGNED")
+        self.assertEqual(revenue["sum"], Decimal("99.99"))
+
+        reference = orm_fleet_statistics()["fuel_cost"]["by_vehicle"]
+        for row, expected in zip(stats["fuel_cost"]["by_vehicle"], reference):
+            self.assertEqual(row["key"], expected["key"])
+            self.assertEqual(row["count"], expected["count"])
+            for name in ("sum", "min", "max", "mean", "p50", "p90", "p99"):
+                self.assertEqual(row[name], expected[name].quantize(Decimal("0.01")))
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import trip_management, driver_management, maintenance_management, close_maintenance, fuel_management
+from .views import trip_management, driver_management, maintenance_management, close_maintenance, fuel_management, export_data, vehicle_autocomplete, driver_autocomplete, trip_search, fuel_report, fuel_analytics_api
 
 urlpatterns = [
     path("", trip_management, name="trip-management"),
@@ -7,4 +7,10 @@ urlpatterns = [
     path("maintenance/", maintenance_management, name="maintenance_management"),
     path("maintenance/<int:pk>/close/", close_maintenance, name="close_maintenance"),
     path("fuel/", fuel_management, name="fuel_management"),
+    path("fuel/report/", fuel_report, name="fuel_report"),
+    path("fuel/analytics/", fuel_analytics_api, name="fuel_analytics_api"),
+    path("export/<slug:dataset>.<slug:fmt>", export_data, name="export_data"),
+    path("autocomplete/vehicles/", vehicle_autocomplete, name="vehicle_autocomplete"),
+    path("autocomplete/drivers/", driver_autocomplete, name="driver_autocomplete"),
+    path("search/", trip_search, name="trip_search"),
 ]
\ No newline at end of file
@@ -1,11 +1,30 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.exceptions import PermissionDenied
-from .forms import TripCreateForm, MaintenanceForm, FuelLogForm
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import (
+    HttpResponseBadRequest,
+    JsonResponse,
+)
+from .forms import (
+    TripCreateForm,
+    TripFilterForm,
+    ExportFilterForm,
+    MaintenanceForm,
+    FuelLogForm,
+)
 from .models import WorkItem, Vehicle, Driver, MaintenanceLog, FuelLog
+from .pagination import keyset_page
+from apps.accounts.models import User
 from django.utils import timezone
 
-from django.db.models import Sum
+from django.db.models import Q, Sum
+from decimal import Decimal, InvalidOperation
+from services.export_service import build_export_response
+from services.workflow_service import translate_integrity_errors
+from services.db_timeouts import statement_timeout
+from services.trip_search import search_trips
+from services.db_routing import analytics_reads
+from services.fuel_analytics import MAX_ANOMALIES, fuel_anomalies, vehicle_efficiency
 
 """
 Workflow views for FleetFlow.
@@ -14,37 +33,83 @@ Handles vehicle management, trip dispatching,
 maintenance logging, and operational workflows.
 """
 
+TRIP_PAGE_SIZE = 50
+TRIP_MAX_PAGE_SIZE = 200
+
+AUTOCOMPLETE_LIMIT = 20
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+FUEL_ANOMALY_LIMIT = 50
+
+
+def _page_size(request, default, maximum, param="page_size"):
+    try:
+        size = int(request.GET.get(param, default))
+    except ValueError:
+        return default
+    return max(1, min(size, maximum))
+
+
 @login_required
+@statement_timeout("interactive")
 def trip_management(request):
 
     if not request.user.is_dispatcher and not request.user.is_manager:
         raise PermissionDenied("Access denied.")
 
-    trips = WorkItem.objects.select_related(
-        "vehicle", "driver"
-    ).order_by("-created_at")
-
     if request.method == "POST":
         form = TripCreateForm(request.POST)
         if form.is_valid():
             trip = form.save(commit=False)
             trip.created_by = request.user
             trip.status = WorkItem.TripStatus.DISPATCHED
-            trip.save()
 
-            # Update vehicle status
-            vehicle = trip.vehicle
-            vehicle.status = Vehicle.Status.ON_TRIP
-            vehicle.save()
-
-            return redirect("trip-management")
+            try:
+                with translate_integrity_errors():
+                    trip.save()
+
+                    # Update vehicle status
+                    vehicle = trip.vehicle
+                    vehicle.status = Vehicle.Status.ON_TRIP
+                    vehicle.save()
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                return redirect("trip-management")
     else:
         form = TripCreateForm()
 
+    filter_form = TripFilterForm(request.GET or None)
+    trips = filter_form.filter(
+        WorkItem.objects.select_related("vehicle", "driver__user")
+    )
+    trips, next_cursor = keyset_page(
+        trips,
+        request.GET.get("cursor"),
+        _page_size(request, TRIP_PAGE_SIZE, TRIP_MAX_PAGE_SIZE),
+    )
+
+    # Carry the active filters into the pagination links.
+    params = request.GET.copy()
+    params.pop("cursor", None)
+    first_query = params.urlencode()
+
+    next_query = None
+    if next_cursor:
+        params["cursor"] = next_cursor
+        next_query = params.urlencode()
+
     return render(
         request,
         "workflow/trip_management.html",
-        {"trips": trips, "form": form},
+        {
+            "trips": trips,
+            "form": form,
+            "filter_form": filter_form,
+            "first_query": first_query,
+            "next_query": next_query,
+            "is_first_page": not request.GET.get("cursor"),
+        },
     )
 
 @login_required
@@ -63,6 +128,7 @@ def driver_management(request):
 
 
 @login_required
+@statement_timeout("interactive")
 def maintenance_management(request):
 
     # RBAC
@@ -75,13 +141,17 @@ def maintenance_management(request):
     if request.method == "POST":
         form = MaintenanceForm(request.POST)
         if form.is_valid():
-            maintenance = form.save()
-
-            # Move vehicle to IN_SHOP
-            maintenance.vehicle.status = Vehicle.Status.IN_SHOP
-            maintenance.vehicle.save()
-
-            return redirect("maintenance_management")
+            try:
+                with translate_integrity_errors():
+                    maintenance = form.save()
+
+                    # Move vehicle to IN_SHOP
+                    maintenance.vehicle.status = Vehicle.Status.IN_SHOP
+                    maintenance.vehicle.save()
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                return redirect("maintenance_management")
     else:
         form = MaintenanceForm()
 
@@ -96,6 +166,7 @@ def maintenance_management(request):
 
 
 @login_required
+@statement_timeout("interactive")
 def close_maintenance(request, pk):
 
     if request.user.role not in [
@@ -149,4 +220,210 @@ def fuel_management(request):
         "total_fuel_cost": total_fuel_cost,
     }
 
-    return render(request, "fuel/fuel_management.html", context)
\ No newline at end of file
+    return render(request, "fuel/fuel_management.html", context)
+
+
+# ==========================================================
+# Fuel analytics
+# ==========================================================
+
+FUEL_ROLES = [
+    User.Role.FLEET_MANAGER,
+    User.Role.DISPATCHER,
+    User.Role.FINANCIAL_ANALYST,
+]
+
+
+def _fuel_analytics(request):
+    """
+    Efficiency rows and anomalies for the request's filters
+    (vehicle, date_from, date_to, limit), with vehicle labels.
+    """
+    if request.user.role not in FUEL_ROLES:
+        raise PermissionDenied
+
+    filters = ExportFilterForm(request.GET)
+    if not filters.is_valid():
+        return None, filters.errors.as_text()
+
+    efficiency = vehicle_efficiency(**filters.cleaned_data)
+    anomalies = fuel_anomalies(
+        limit=_page_size(request, FUEL_ANOMALY_LIMIT, MAX_ANOMALIES, "limit"),
+        **filters.cleaned_data,
+    )
+
+    labels = {
+        pk: str(vehicle)
+        for pk, vehicle in Vehicle.objects.only("name", "license_plate").in_bulk(
+            {row["vehicle_id"] for row in efficiency + anomalies}
+        ).items()
+    }
+    for row in efficiency + anomalies:
+        row["vehicle"] = labels.get(row["vehicle_id"], "")
+
+    return {"vehicles": efficiency, "anomalies": anomalies}, None
+
+
+@login_required
+@analytics_reads()
+def fuel_report(request):
+
+    data, error = _fuel_analytics(request)
+    if error:
+        return HttpResponseBadRequest(error)
+
+    return render(request, "fuel/fuel_report.html", data)
+
+
+@login_required
+@analytics_reads()
+def fuel_analytics_api(request):
+    """
+    km/L per vehicle and flagged refuels as JSON
+    (services.fuel_analytics).
+    """
+
+    data, error = _fuel_analytics(request)
+    if error:
+        return HttpResponseBadRequest(error)
+
+    return JsonResponse(data)
+
+
+# Roles allowed to export each dataset from the workflow pages; mirrors
+# the access rules of the matching management views.
+EXPORT_ROLES = {
+    "trips": [User.Role.FLEET_MANAGER, User.Role.DISPATCHER],
+    "fuel-logs": [
+        User.Role.FLEET_MANAGER,
+        User.Role.DISPATCHER,
+        User.Role.FINANCIAL_ANALYST,
+    ],
+    "maintenance-logs": [User.Role.FLEET_MANAGER, User.Role.SAFETY_OFFICER],
+    "activity": [User.Role.FLEET_MANAGER],
+}
+
+
+# ==========================================================
+# Autocomplete
+# ==========================================================
+
+@login_required
+def vehicle_autocomplete(request):
+    """
+    AVAILABLE vehicles whose name or plate starts with ``q``, limited
+    to ``limit`` results. ``min_capacity`` (the cargo weight) drops
+    vehicles that cannot carry it.
+    """
+
+    if not request.user.is_dispatcher and not request.user.is_manager:
+        raise PermissionDenied
+
+    prefix = request.GET.get("q", "").strip()
+    vehicles = Vehicle.objects.filter(status=Vehicle.Status.AVAILABLE)
+
+    if prefix:
+        vehicles = vehicles.filter(
+            Q(name__istartswith=prefix) | Q(license_plate__istartswith=prefix)
+        )
+
+    min_capacity = request.GET.get("min_capacity")
+    if min_capacity:
+        try:
+            min_capacity = Decimal(min_capacity)
+        except InvalidOperation:
+            min_capacity = None
+        # Decimal() also accepts NaN / Infinity, which the field rejects.
+        if min_capacity is None or not min_capacity.is_finite():
+            return HttpResponseBadRequest("min_capacity must be a number.")
+        vehicles = vehicles.filter(max_capacity__gte=min_capacity)
+
+    limit = _page_size(request, AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT, "limit")
+    rows = vehicles.order_by("name", "pk").values(
+        "pk", "name", "license_plate", "max_capacity"
+    )[:limit]
+
+    return JsonResponse({
+        "results": [
+            {
+                "id": row["pk"],
+                "label": f"{row['name']} ({row['license_plate']})",
+                "max_capacity": str(row["max_capacity"]),
+            }
+            for row in rows
+        ]
+    })
+
+
+@login_required
+def driver_autocomplete(request):
+    """
+    ON_DUTY drivers with a valid license whose username starts with
+    ``q``, limited to ``limit`` results.
+    """
+
+    if not request.user.is_dispatcher and not request.user.is_manager:
+        raise PermissionDenied
+
+    prefix = request.GET.get("q", "").strip()
+    drivers = Driver.objects.filter(
+        status=Driver.Status.ON_DUTY,
+        license_expiry__gte=timezone.localdate(),
+    )
+
+    if prefix:
+        drivers = drivers.filter(user__username__istartswith=prefix)
+
+    limit = _page_size(request, AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT, "limit")
+    rows = drivers.order_by("user__username", "pk").values_list(
+        "pk", "user__username"
+    )[:limit]
+
+    return JsonResponse({
+        "results": [{"id": pk, "label": username} for pk, username in rows]
+    })
+
+
+@login_required
+@statement_timeout("interactive")
+def trip_search(request):
+    """
+    Ranked full-text search over trips (services.trip_search), best
+    match first, at most ``limit`` results.
+    """
+
+    if not request.user.is_dispatcher and not request.user.is_manager:
+        raise PermissionDenied
+
+    query = request.GET.get("q", "")
+    limit = _page_size(request, AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT, "limit")
+    ranked = search_trips(query, limit)
+
+    trips = WorkItem.objects.only(
+        "title", "status", "origin", "destination"
+    ).in_bulk([pk for pk, _ in ranked])
+
+    return JsonResponse({
+        "query": query,
+        "results": [
+            {
+                "id": pk,
+                "title": trips[pk].title,
+                "status": trips[pk].status,
+                "origin": trips[pk].origin,
+                "destination": trips[pk].destination,
+                "rank": round(rank, 4),
+            }
+            for pk, rank in ranked
+            if pk in trips
+        ],
+    })
+
+
+@login_required
+def export_data(request, dataset, fmt):
+
+    if request.user.role not in EXPORT_ROLES.get(dataset, []):
+        raise PermissionDenied
+
+    return build_export_response(request, dataset, fmt)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,11 +47,14 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "accounts.User"
 
 MIDDLEWARE = [
+    'services.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'services.db_routing.PrimaryPinningMiddleware',
+    'services.audit.AuditBufferMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -59,7 +63,8 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus render timing for services.metrics.
+        'BACKEND': 'services.metrics.InstrumentedTemplates',
         'DIRS': [BASE_DIR / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -77,12 +82,200 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
+#
+# SQLite by default. FLEETFLOW_DB_ENGINE=postgres selects the
+# production profile, configured by the FLEETFLOW_DB_* variables:
+#
+#   NAME / USER / PASSWORD / HOST / PORT   connection parameters
+#   POOL_MIN / POOL_MAX / POOL_TIMEOUT     psycopg 3 pool sizing
+#   CONN_MAX_AGE                           persistent-connection lifetime,
+#                                          used when pooling is unavailable
+#   STATEMENT_TIMEOUT                      default per-statement budget (ms)
+#
+# With psycopg 3 and psycopg-pool installed (requirements.txt),
+# connections come from Django's native pool; without the pool they
+# are kept open for CONN_MAX_AGE seconds. Either way short requests such as trip
+# transitions skip the connect/auth handshake, and health checks
+# discard connections the server has dropped.
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+if os.environ.get("FLEETFLOW_DB_ENGINE", "sqlite") == "postgres":
+    from importlib.util import find_spec
+
+    _db_options = {
+        # Session default; views adjust it via services.db_timeouts.
+        'options': '-c statement_timeout=%d'
+                   % _env_int("FLEETFLOW_DB_STATEMENT_TIMEOUT", 5000),
+    }
+    _db_pooled = (
+        find_spec("psycopg") is not None
+        and find_spec("psycopg_pool") is not None
+    )
+    if _db_pooled:
+        _db_options['pool'] = {
+            'min_size': _env_int("FLEETFLOW_DB_POOL_MIN", 2),
+            'max_size': _env_int("FLEETFLOW_DB_POOL_MAX", 10),
+            'timeout': _env_int("FLEETFLOW_DB_POOL_TIMEOUT", 10),
+        }
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get("FLEETFLOW_DB_NAME", "fleetflow"),
+            'USER': os.environ.get("FLEETFLOW_DB_USER", "fleetflow"),
+            'PASSWORD': os.environ.get("FLEETFLOW_DB_PASSWORD", ""),
+            'HOST': os.environ.get("FLEETFLOW_DB_HOST", "localhost"),
+            'PORT': os.environ.get("FLEETFLOW_DB_PORT", "5432"),
+            # The pool manages connection lifetime itself and refuses
+            # persistent connections.
+            'CONN_MAX_AGE': (
+                0 if _db_pooled
+                else _env_int("FLEETFLOW_DB_CONN_MAX_AGE", 60)
+            ),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': _db_options,
+        }
+    }
+
+    # Streaming replica for analytics reads (services.db_routing).
+    if os.environ.get("FLEETFLOW_DB_REPLICA_HOST"):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ["FLEETFLOW_DB_REPLICA_HOST"],
+            'PORT': os.environ.get(
+                "FLEETFLOW_DB_REPLICA_PORT", DATABASES['default']['PORT']
+            ),
+            'OPTIONS': {**_db_options},
+            'TEST': {'MIRROR': 'default'},
+        }
+        ANALYTICS_DB_ALIAS = 'replica'
+    else:
+        ANALYTICS_DB_ALIAS = None
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        },
+        # Stand-in replica: the same file in development (analytics
+        # routing is off), a separate file under tests so routing can
+        # be observed.
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'TEST': {'NAME': BASE_DIR / 'test_replica.sqlite3'},
+        },
+    }
+    ANALYTICS_DB_ALIAS = None
+
+DATABASE_ROUTERS = ['services.db_routing.ReplicaRouter']
+
+# Requests within this many seconds of a write read from the primary.
+REPLICA_PIN_SECONDS = 10
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Per-view statement budgets in milliseconds (0 = unlimited), applied
+# with services.db_timeouts.statement_timeout on PostgreSQL.
+STATEMENT_TIMEOUTS = {
+    'interactive': _env_int("FLEETFLOW_DB_INTERACTIVE_TIMEOUT", 2000),
+    'export': _env_int("FLEETFLOW_DB_EXPORT_TIMEOUT", 0),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+#
+# Local-memory by default; set FLEETFLOW_CACHE_DIR to share cached
+# KPIs between worker processes through the file backend.
+
+if os.environ.get("FLEETFLOW_CACHE_DIR"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ["FLEETFLOW_CACHE_DIR"],
+        }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'fleetflow',
+        }
+    }
+
+# Safety-net TTL (seconds) for KPIs cached by services.kpi_cache;
+# entries are normally invalidated by model signals first.
+KPI_CACHE_TIMEOUT = 300
+
+# Run the async dashboard's independent KPI queries on separate
+# threads/connections. Off for SQLite, which serializes access anyway.
+KPI_PARALLEL_QUERIES = (
+    DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3'
+)
+
+
+# Request metrics
+# Per-view latency, SQL and template timings served at /metrics in
+# Prometheus format (services.metrics). Scrapers must send
+# "Authorization: Bearer <FLEETFLOW_METRICS_TOKEN>"; without a token
+# the endpoint is only open when DEBUG is on. Histogram buckets default
+# to services.metrics and can be overridden with METRICS_*_BUCKETS.
+
+METRICS_ENABLED = os.environ.get("FLEETFLOW_METRICS_ENABLED", "1") == "1"
+
+METRICS_TOKEN = os.environ.get("FLEETFLOW_METRICS_TOKEN", "")
+
+
+# Audit trail (services.audit)
+# ActivityLog entries are written after commit, batched per request.
+# The background writer moves the INSERT off the request thread; its
+# queue holds AUDIT_QUEUE_SIZE batches, and producers wait at most
+# AUDIT_QUEUE_TIMEOUT seconds before writing a batch themselves.
+# Failed writes are retried AUDIT_WRITE_RETRIES times, starting
+# AUDIT_RETRY_DELAY seconds apart and doubling; a batch that still
+# fails is logged with its entries and dropped.
+
+AUDIT_BUFFER_SIZE = 500
+
+AUDIT_BACKGROUND_WRITER = (
+    os.environ.get("FLEETFLOW_AUDIT_BACKGROUND_WRITER", "0") == "1"
+)
+
+AUDIT_QUEUE_SIZE = 100
+
+AUDIT_QUEUE_TIMEOUT = 0.5
+
+AUDIT_WRITE_RETRIES = 3
+
+AUDIT_RETRY_DELAY = 0.1
+
+# Where `manage.py archive_activity` moves old audit rows
+# (services.activity_archive). The in-checkout default is git-ignored;
+# set FLEETFLOW_ARCHIVE_DIR to durable storage in production.
+ACTIVITY_ARCHIVE_DIR = os.environ.get(
+    "FLEETFLOW_ARCHIVE_DIR", BASE_DIR / "archive" / "activity"
+)
+
+# Admin changelists over tables estimated above this many rows show
+# the planner's row estimate instead of running COUNT(*)
+# (apps.workflow.pagination.EstimatedCountPaginator).
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
+# Regression budgets for `manage.py bench`: target -> {"p95_ms", "queries"}.
+# Query counts for these targets must not grow with fleet size.
+BENCH_BUDGETS = {
+    'view:dashboard': {'queries': 4},
+    'view:financial_analytics': {'queries': 8},
+    'view:operational_reports': {'queries': 7},
+    'view:trip-management': {'queries': 4},
+    'service:fleet_kpi_snapshot': {'queries': 1},
+    'service:fleet_total_operational_cost': {'queries': 1},
+    'service:vehicle_financials': {'queries': 1},
+    'service:costliest_vehicles': {'queries': 1},
+    'service:monthly_totals': {'queries': 1},
 }
 
 
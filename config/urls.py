@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
+from services.metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -8,4 +9,5 @@ urlpatterns = [
     path("login/", auth_views.LoginView.as_view(template_name="login.html"), name="login"),
     path("logout/", auth_views.LogoutView.as_view(next_page="login"), name="logout"),
     path("trips/", include("apps.workflow.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
\ No newline at end of file
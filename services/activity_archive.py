@@ -0,0 +1,239 @@
+import gzip
+import json
+import os
+import uuid
+import zlib
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+from apps.workflow.models import ActivityLog
+
+"""
+Cold storage for ActivityLog.
+
+Archived rows live under settings.ACTIVITY_ARCHIVE_DIR, partitioned
+by month of timestamp (UTC), with one gzip JSONL file per archiving
+run and partition, e.g.
+
+    2025/activity-2025-11.20261018T020000-1f3a9c2e.jsonl.gz
+    2025/activity-2025-11.index.json   work item ids in the partition
+
+A run writes to a ``.part`` file and renames it into place once the
+gzip stream is complete, so finished files are never modified again.
+The sidecar index lets archived_history() open only the partitions
+holding a given work item. Rows are written (and fsynced) before they
+are deleted from the table, so an interrupted run can leave a row in
+both places but never in neither: readers also read the ``.part``
+files of crashed runs, up to their truncated tail, and drop
+duplicates by id.
+"""
+
+FIELDS = (
+    "id",
+    "work_item_id",
+    "action",
+    "from_status",
+    "to_status",
+    "performed_by_id",
+    "timestamp",
+)
+
+
+def archive_dir():
+    return Path(settings.ACTIVITY_ARCHIVE_DIR)
+
+
+def partition_of(timestamp):
+    utc = timestamp.astimezone(dt_timezone.utc)
+    return f"{utc.year:04d}-{utc.month:02d}"
+
+
+def _folder(partition):
+    return archive_dir() / partition[:4]
+
+
+def _index_path(partition):
+    return _folder(partition) / f"activity-{partition}.index.json"
+
+
+def _data_path(partition, run):
+    return _folder(partition) / f"activity-{partition}.{run}.jsonl.gz"
+
+
+def _data_files(partition):
+    """
+    Every data file of a partition, unfinished ``.part`` files included.
+    """
+    return sorted(
+        path for path in _folder(partition).glob(f"activity-{partition}.*")
+        if path.name.endswith((".jsonl.gz", ".jsonl.gz.part"))
+    )
+
+
+def _part_path(data_path):
+    return data_path.with_name(data_path.name + ".part")
+
+
+# ==========================================================
+# Writing
+# ==========================================================
+
+class ArchiveWriter:
+    """
+    Writes rows to this run's file of their month partitions. Use as a
+    context manager; call sync() before deleting the rows it has been
+    given. close() renames the finished files into place.
+    """
+
+    def __init__(self):
+        stamp = datetime.now(dt_timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self.run = f"{stamp}-{uuid.uuid4().hex[:8]}"
+        self._files = {}
+        self._indexes = {}
+        self._dirty = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def write(self, row):
+        """
+        ``row`` is a tuple in FIELDS order.
+        """
+        record = dict(zip(FIELDS, row))
+        partition = partition_of(record["timestamp"])
+        record["timestamp"] = record["timestamp"].isoformat()
+
+        self._file(partition).write(json.dumps(record) + "\n")
+        self._index(partition).add(record["work_item_id"])
+        self._dirty.add(partition)
+
+    def sync(self):
+        """
+        Make everything written so far durable, indexes included.
+        """
+        for partition in self._dirty:
+            handle = self._files[partition]
+            # Text wrapper -> GzipFile (sync flush) -> file on disk.
+            handle.flush()
+            os.fsync(handle.buffer.fileobj.fileno())
+            self._save_index(partition)
+        self._dirty.clear()
+
+    def close(self):
+        self.sync()
+        for partition, handle in self._files.items():
+            # Writes the gzip trailer; the file is complete from here.
+            handle.close()
+            data_path = _data_path(partition, self.run)
+            part_path = _part_path(data_path)
+            with open(part_path, "rb") as fh:
+                os.fsync(fh.fileno())
+            os.replace(part_path, data_path)
+        self._files.clear()
+
+    def _file(self, partition):
+        handle = self._files.get(partition)
+        if handle is None:
+            data_path = _data_path(partition, self.run)
+            data_path.parent.mkdir(parents=True, exist_ok=True)
+            handle = self._files[partition] = gzip.open(
+                _part_path(data_path), "wt", encoding="utf-8"
+            )
+        return handle
+
+    def _index(self, partition):
+        if partition not in self._indexes:
+            self._indexes[partition] = set(_load_index(partition))
+        return self._indexes[partition]
+
+    def _save_index(self, partition):
+        index_path = _index_path(partition)
+        tmp = index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"work_items": sorted(self._indexes[partition])}))
+        os.replace(tmp, index_path)
+
+
+# ==========================================================
+# Reading
+# ==========================================================
+
+def _load_index(partition):
+    index_path = _index_path(partition)
+    try:
+        mtime = index_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return frozenset()
+    return _read_index(str(index_path), mtime)
+
+
+@lru_cache(maxsize=256)
+def _read_index(path, mtime):
+    with open(path) as fh:
+        return frozenset(json.load(fh)["work_items"])
+
+
+def partitions():
+    return sorted(
+        path.name[len("activity-"):-len(".index.json")]
+        for path in archive_dir().glob("*/activity-*.index.json")
+    )
+
+
+def _read_records(path):
+    """
+    Records of one data file. A file cut short by a crashed run ends
+    at its last complete line instead of raising.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        try:
+            for line in fh:
+                if not line.endswith("\n"):
+                    return
+                yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            return
+
+
+def archived_history(work_item_id):
+    """
+    Archived audit entries of one work item as dicts (timestamp parsed
+    back to a datetime), oldest first.
+    """
+    entries = {}
+    for partition in partitions():
+        if work_item_id not in _load_index(partition):
+            continue
+        for path in _data_files(partition):
+            for record in _read_records(path):
+                if record["work_item_id"] == work_item_id:
+                    entries[record["id"]] = record
+
+    for record in entries.values():
+        record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+    return sorted(entries.values(), key=lambda r: (r["timestamp"], r["id"]))
+
+
+def activity_history(work_item_id):
+    """
+    Complete audit history of one work item: archived entries followed
+    by the ones still in the table, as dicts with the FIELDS keys.
+    """
+    hot = [
+        dict(zip(FIELDS, row))
+        for row in (
+            ActivityLog.objects
+            .filter(work_item_id=work_item_id)
+            .order_by("timestamp", "id")
+            .values_list(*FIELDS)
+        )
+    ]
+    hot_ids = {row["id"] for row in hot}
+    cold = [row for row in archived_history(work_item_id) if row["id"] not in hot_ids]
+    return cold + hot
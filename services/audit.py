@@ -0,0 +1,228 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from apps.workflow.models import ActivityLog
+
+"""
+Buffered ActivityLog writer.
+
+record() builds the entry immediately (timestamp included) but only
+hands it on once the surrounding transaction commits, via
+transaction.on_commit; entries from rolled-back transactions or
+savepoints are dropped with them.
+
+Committed entries are collected in the active audit_batch() (one per
+request, opened by AuditBufferMiddleware) and written with a single
+bulk_create when the batch closes or reaches AUDIT_BUFFER_SIZE.
+Outside a batch they are written straight after the commit.
+
+With AUDIT_BACKGROUND_WRITER, batches are handed to a writer thread
+through a bounded queue instead. When the queue is full the caller
+waits up to AUDIT_QUEUE_TIMEOUT seconds and then writes the batch
+itself, so a slow database slows producers down rather than growing
+memory without bound.
+
+Entries are written after the work they describe has committed, so a
+failed write never fails the request. Each batch is written in its
+own transaction and retried AUDIT_WRITE_RETRIES times with backoff; a
+batch that still fails is logged at ERROR level with every entry's
+fields and then dropped. Such entries are lost from ActivityLog and
+have to be recovered from the logs.
+"""
+
+logger = logging.getLogger(__name__)
+
+_batch = ContextVar("fleetflow_audit_batch", default=None)
+
+
+def _buffer_size():
+    return getattr(settings, "AUDIT_BUFFER_SIZE", 500)
+
+
+def _bulk_write(entries):
+    # One transaction, so a retry never duplicates a partial write.
+    with transaction.atomic():
+        ActivityLog.objects.bulk_create(entries, batch_size=_buffer_size())
+
+
+def _describe(entry):
+    if not isinstance(entry, ActivityLog):
+        return repr(entry)
+    return (
+        f"work_item={entry.work_item_id} performed_by={entry.performed_by_id} "
+        f"action={entry.action!r} from={entry.from_status!r} "
+        f"to={entry.to_status!r} timestamp={entry.timestamp.isoformat()}"
+    )
+
+
+def _write_with_retries(write, entries):
+    """
+    Call ``write(entries)``, retrying failures with exponential
+    backoff. Gives up by logging the entries; never raises.
+    """
+    retries = getattr(settings, "AUDIT_WRITE_RETRIES", 3)
+    delay = getattr(settings, "AUDIT_RETRY_DELAY", 0.1)
+    for attempt in range(retries + 1):
+        try:
+            write(entries)
+            return True
+        except Exception:
+            if attempt == retries:
+                logger.exception(
+                    "Dropping %d audit entries after %d attempts:\n%s",
+                    len(entries),
+                    retries + 1,
+                    "\n".join(_describe(entry) for entry in entries),
+                )
+                return False
+            time.sleep(delay * 2 ** attempt)
+
+
+# ==========================================================
+# Recording
+# ==========================================================
+
+def build_entry(work_item, user, from_status="", to_status="", action=None):
+    if action is None:
+        action = f"Status changed to {to_status}"
+    return ActivityLog(
+        work_item=work_item,
+        action=action,
+        from_status=from_status,
+        to_status=to_status,
+        performed_by=user,
+        timestamp=timezone.now(),
+    )
+
+
+def record(work_item, user, from_status="", to_status="", action=None):
+    """
+    Audit one event; written once the current transaction commits.
+    """
+    record_many([build_entry(work_item, user, from_status, to_status, action)])
+
+
+def record_many(entries):
+    entries = list(entries)
+    if entries:
+        transaction.on_commit(lambda: _collect(entries))
+
+
+def _collect(entries):
+    batch = _batch.get()
+    if batch is None:
+        _dispatch(entries)
+        return
+
+    batch.extend(entries)
+    if len(batch) >= _buffer_size():
+        _dispatch(batch[:])
+        batch.clear()
+
+
+@contextmanager
+def audit_batch():
+    """
+    Collect entries committed inside the block and write them together
+    when it exits.
+    """
+    batch = []
+    token = _batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _batch.reset(token)
+        if batch:
+            _dispatch(batch)
+
+
+class AuditBufferMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with audit_batch():
+            return self.get_response(request)
+
+
+# ==========================================================
+# Background writer
+# ==========================================================
+
+class AuditWriter:
+    """
+    Daemon thread writing batches from a bounded queue.
+    """
+
+    def __init__(self, maxsize=100, put_timeout=0.5, write=_bulk_write):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.put_timeout = put_timeout
+        self.write = write
+        self.thread = threading.Thread(
+            target=self._run, name="audit-writer", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, entries):
+        try:
+            self.queue.put(entries, timeout=self.put_timeout)
+        except queue.Full:
+            # Backpressure: the producer pays for the write itself.
+            _write_with_retries(self.write, entries)
+
+    def drain(self):
+        """
+        Block until every submitted batch has been written.
+        """
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            entries = self.queue.get()
+            # Coalesce whatever else is already waiting.
+            batches = 1
+            while True:
+                try:
+                    entries = entries + self.queue.get_nowait()
+                    batches += 1
+                except queue.Empty:
+                    break
+            try:
+                _write_with_retries(self.write, entries)
+            finally:
+                close_old_connections()
+                for _ in range(batches):
+                    self.queue.task_done()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AuditWriter(
+                maxsize=getattr(settings, "AUDIT_QUEUE_SIZE", 100),
+                put_timeout=getattr(settings, "AUDIT_QUEUE_TIMEOUT", 0.5),
+            )
+            atexit.register(_writer.drain)
+        return _writer
+
+
+def _dispatch(entries):
+    if getattr(settings, "AUDIT_BACKGROUND_WRITER", False):
+        get_writer().submit(entries)
+    else:
+        _write_with_retries(_bulk_write, entries)
@@ -0,0 +1,258 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import islice
+
+import numpy as np
+from django.db.models import BigIntegerField, F, Value
+from django.db.models.functions import Cast, Coalesce, Round, TruncDate
+
+from apps.workflow.models import FuelLog, MaintenanceLog, Vehicle, WorkItem
+
+"""
+Columnar fleet statistics with NumPy.
+
+Money columns are loaded as int64 cents and dates as datetime64[D]
+straight from values_list() chunks: the database does the conversion
+(ROUND(amount * 100), TruncDate in the current time zone), so no
+Decimal or model instance is built per row. Statistics are then
+vectorized group-bys over those arrays: one sort per grouping, with
+counts, sums, min / max and linearly interpolated percentiles read
+off the sorted runs.
+
+Sums are exact (integer cents). Means and percentiles are rounded
+half-even to the cent, as Decimal.quantize does, when converted back
+to Decimal.
+
+Intended for analyst reviews over the whole history; dashboards keep
+using the SQL rollups in services.finance_service.
+"""
+
+# metric -> (model, amount field, date field); same sources and date
+# bucketing as MonthlyFinanceRollup.
+SOURCES = {
+    "fuel_cost": (FuelLog, "cost", "date"),
+    "maintenance_cost": (MaintenanceLog, "cost", "created_at"),
+    "revenue": (WorkItem, "revenue", "created_at"),
+}
+
+PERCENTILES = (50, 90, 99)
+
+CHUNK_SIZE = 50_000
+
+# vehicle id used for revenue of trips without a vehicle
+UNASSIGNED = 0
+
+
+@dataclass
+class MoneyColumns:
+    vehicle: np.ndarray  # int64 vehicle ids (UNASSIGNED for none)
+    day: np.ndarray      # datetime64[D]
+    cents: np.ndarray    # int64
+
+    def __len__(self):
+        return len(self.cents)
+
+    def months(self):
+        return self.day.astype("datetime64[M]")
+
+
+# ==========================================================
+# Loading
+# ==========================================================
+
+def load_money(metric, date_from=None, date_to=None, chunk_size=CHUNK_SIZE):
+    """
+    One metric of SOURCES as MoneyColumns, read in ``chunk_size`` rows
+    at a time.
+    """
+    model, field, date_field = SOURCES[metric]
+    is_datetime = date_field == "created_at"
+
+    rows = model.objects.filter(**{f"{field}__isnull": False})
+    day = TruncDate(date_field) if is_datetime else F(date_field)
+    rows = rows.annotate(
+        _vehicle=Coalesce("vehicle_id", Value(UNASSIGNED)),
+        _day=day,
+        _cents=Cast(Round(F(field) * 100), BigIntegerField()),
+    )
+    if date_from is not None:
+        rows = rows.filter(_day__gte=date_from)
+    if date_to is not None:
+        rows = rows.filter(_day__lte=date_to)
+
+    vehicles, days, cents = [], [], []
+    iterator = rows.order_by().values_list(
+        "_vehicle", "_day", "_cents"
+    ).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(iterator, chunk_size)):
+        vehicle, day, amount = zip(*chunk)
+        vehicles.append(np.fromiter(vehicle, dtype=np.int64, count=len(chunk)))
+        days.append(np.array(day, dtype="datetime64[D]"))
+        cents.append(np.fromiter(amount, dtype=np.int64, count=len(chunk)))
+
+    if not cents:
+        return MoneyColumns(
+            np.empty(0, np.int64),
+            np.empty(0, "datetime64[D]"),
+            np.empty(0, np.int64),
+        )
+    return MoneyColumns(
+        np.concatenate(vehicles), np.concatenate(days), np.concatenate(cents)
+    )
+
+
+def vehicle_types():
+    """
+    (sorted vehicle ids, their vehicle_type labels) as arrays.
+    """
+    rows = list(Vehicle.objects.order_by("pk").values_list("pk", "vehicle_type"))
+    ids = np.fromiter((pk for pk, _ in rows), dtype=np.int64, count=len(rows))
+    return ids, np.array([label for _, label in rows], dtype=object)
+
+
+def _type_positions(vehicle, ids):
+    """
+    Index into ``ids`` of every vehicle id, len(ids) where unknown
+    (including UNASSIGNED).
+    """
+    if not len(ids):
+        return np.zeros(len(vehicle), dtype=np.int64)
+    position = np.minimum(np.searchsorted(ids, vehicle), len(ids) - 1)
+    return np.where(ids[position] == vehicle, position, len(ids))
+
+
+# ==========================================================
+# Vectorized statistics
+# ==========================================================
+
+def _money(cents):
+    return Decimal(int(np.round(cents))).scaleb(-2)
+
+
+def group_stats(keys, cents):
+    """
+    Per distinct key: count, sum, min, max, mean and PERCENTILES of
+    ``cents``, as arrays aligned with the returned sorted keys.
+    """
+    if len(keys) == 0:
+        return keys, {}
+
+    order = np.lexsort((cents, keys))
+    keys, values = keys[order], cents[order]
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+    last = starts + counts - 1
+
+    stats = {
+        "count": counts,
+        "sum": np.add.reduceat(values, starts),
+        "min": values[starts],
+        "max": values[last],
+    }
+    stats["mean"] = stats["sum"] / counts
+
+    for pct in PERCENTILES:
+        position = starts + (counts - 1) * (pct / 100)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        stats[f"p{pct}"] = values[low] + (values[high] - values[low]) * (position - low)
+
+    return keys[starts], stats
+
+
+def _rows(labels, stats):
+    rows = []
+    for i, label in enumerate(labels):
+        row = {"key": label, "count": int(stats["count"][i])}
+        for name, column in stats.items():
+            if name != "count":
+                row[name] = _money(column[i])
+        rows.append(row)
+    return rows
+
+
+def summarize(columns, by, types=None):
+    """
+    Group-by statistics of ``columns`` per "vehicle", "type" or
+    "month". ``types`` is the vehicle_types() pair (loaded when
+    missing).
+    """
+    if by == "vehicle":
+        keys, stats = group_stats(columns.vehicle, columns.cents)
+        return _rows(keys.tolist(), stats)
+
+    if by == "month":
+        months = columns.months()
+        keys, stats = group_stats(months.astype(np.int64), columns.cents)
+        labels = keys.astype("datetime64[M]").astype("datetime64[D]").tolist()
+        return _rows(labels, stats)
+
+    if by == "type":
+        ids, labels = types if types is not None else vehicle_types()
+        known = np.append(labels, "UNASSIGNED").astype(object)
+        names, codes = np.unique(known, return_inverse=True)
+        position = _type_positions(columns.vehicle, ids)
+        keys, stats = group_stats(codes[position], columns.cents)
+        return _rows(names[keys].tolist(), stats)
+
+    raise ValueError(f"Unknown grouping: {by}")
+
+
+def rolling_monthly(columns, window=3):
+    """
+    Fleet total per calendar month (gaps filled with zero) and its
+    trailing ``window``-month mean, None until ``window`` months exist.
+    """
+    if len(columns) == 0:
+        return []
+
+    months = columns.months().astype(np.int64)
+    first = months.min()
+    totals = np.zeros(months.max() - first + 1, dtype=np.int64)
+    keys, stats = group_stats(months, columns.cents)
+    totals[keys - first] = stats["sum"]
+
+    running = np.cumsum(np.r_[0, totals])
+    means = np.full(len(totals), np.nan)
+    if len(totals) >= window:
+        means[window - 1:] = (running[window:] - running[:-window]) / window
+
+    labels = (np.arange(len(totals)) + first).astype("datetime64[M]")
+    return [
+        {
+            "month": label.astype("datetime64[D]").item(),
+            "total": _money(total),
+            "rolling_mean": None if np.isnan(mean) else _money(mean),
+        }
+        for label, total, mean in zip(labels, totals, means)
+    ]
+
+
+def histogram(columns, bins=20):
+    if len(columns) == 0:
+        return []
+    counts, edges = np.histogram(columns.cents, bins=bins)
+    return [
+        {"from": _money(edges[i]), "to": _money(edges[i + 1]), "count": int(count)}
+        for i, count in enumerate(counts)
+    ]
+
+
+def fleet_statistics(date_from=None, date_to=None, window=3, bins=20):
+    """
+    For every metric of SOURCES: statistics by vehicle, type and
+    month, the rolling monthly mean and a histogram of amounts.
+    """
+    types = vehicle_types()
+    result = {}
+    for metric in SOURCES:
+        columns = load_money(metric, date_from, date_to)
+        result[metric] = {
+            "by_vehicle": summarize(columns, "vehicle"),
+            "by_type": summarize(columns, "type", types),
+            "by_month": summarize(columns, "month"),
+            "rolling": rolling_monthly(columns, window),
+            "histogram": histogram(columns, bins),
+        }
+    return result
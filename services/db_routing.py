@@ -0,0 +1,99 @@
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+
+"""
+Read-replica routing for analytics.
+
+Reads made inside analytics_reads() (a context manager, or a
+decorator for sync and async views) go to settings.ANALYTICS_DB_ALIAS;
+everything else, and every write, uses the primary ("default").
+
+PrimaryPinningMiddleware gives read-your-writes: a POST (or any unsafe
+method) and the requests that follow it within REPLICA_PIN_SECONDS
+read from the primary even inside analytics_reads(), so a user never
+sees a dashboard that lags behind what they just saved.
+
+The flags are context variables, so they follow asyncio tasks and
+sync_to_async worker threads.
+"""
+
+PIN_COOKIE = "fleetflow_primary"
+
+_analytics = ContextVar("fleetflow_analytics_reads", default=False)
+_pinned = ContextVar("fleetflow_primary_pinned", default=False)
+
+
+def analytics_alias():
+    """
+    Alias reads should use right now, or None for the default.
+    """
+    alias = getattr(settings, "ANALYTICS_DB_ALIAS", None)
+    if alias and _analytics.get() and not _pinned.get():
+        return alias
+    return None
+
+
+class analytics_reads(ContextDecorator):
+
+    def _recreate_cm(self):
+        return type(self)()
+
+    def __enter__(self):
+        self.token = _analytics.set(True)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _analytics.reset(self.token)
+        return False
+
+    def __call__(self, func):
+        if iscoroutinefunction(func):
+
+            @wraps(func)
+            async def inner(*args, **kwargs):
+                with self._recreate_cm():
+                    return await func(*args, **kwargs)
+
+            return inner
+        return super().__call__(func)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        return analytics_alias()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+
+class PrimaryPinningMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        unsafe = request.method not in ("GET", "HEAD", "OPTIONS", "TRACE")
+        token = _pinned.set(unsafe or PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned.reset(token)
+
+        if unsafe:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=getattr(settings, "REPLICA_PIN_SECONDS", 10),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,48 @@
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+"""
+Per-view statement timeouts.
+
+The connection-wide default comes from the database OPTIONS in
+config/settings.py; views that legitimately need a different budget
+(short for interactive dispatch, longer for exports) wrap their
+queries in statement_timeout("<profile>"), where the profile is a key
+of settings.STATEMENT_TIMEOUTS (milliseconds, 0 = unlimited).
+
+Only PostgreSQL supports this; on other backends it is a no-op.
+"""
+
+
+class statement_timeout(ContextDecorator):
+
+    def __init__(self, profile, using=DEFAULT_DB_ALIAS):
+        self.profile = profile
+        self.using = using
+        self.active = False
+
+    def _recreate_cm(self):
+        # Fresh state per decorated call; the decorator instance is
+        # shared between threads.
+        return type(self)(self.profile, self.using)
+
+    def __enter__(self):
+        connection = connections[self.using]
+        timeout = getattr(settings, "STATEMENT_TIMEOUTS", {}).get(self.profile)
+
+        if connection.vendor == "postgresql" and timeout is not None:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SET statement_timeout = {int(timeout)}")
+            self.active = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.active:
+            # Back to the session default from the connection options,
+            # so pooled / persistent connections don't leak the budget.
+            with connections[self.using].cursor() as cursor:
+                cursor.execute("RESET statement_timeout")
+            self.active = False
+        return False
@@ -0,0 +1,229 @@
+import csv
+import json
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+
+from apps.workflow.forms import ExportFilterForm
+from apps.workflow.models import WorkItem, FuelLog, MaintenanceLog, ActivityLog
+from services.db_timeouts import statement_timeout
+
+"""
+Streaming exports of FleetFlow history.
+
+Rows are read with values_list().iterator(chunk_size=...) and encoded
+chunk by chunk, so memory stays flat for exports of any length and
+the response can start before the query has finished.
+
+Under ASGI the response gets an async iterator (astream_export) that
+pulls each chunk from the sync generator through sync_to_async;
+StreamingHttpResponse would otherwise collect a sync iterator into a
+list before sending anything.
+"""
+
+CHUNK_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    model: type
+    fields: tuple
+    date_field: str
+    vehicle_field: str
+
+
+EXPORTS = {
+    "trips": ExportSpec(
+        model=WorkItem,
+        fields=(
+            "id",
+            "title",
+            "status",
+            "origin",
+            "destination",
+            "vehicle_id",
+            "vehicle__license_plate",
+            "driver_id",
+            "cargo_weight",
+            "estimated_fuel_cost",
+            "revenue",
+            "start_odometer",
+            "end_odometer",
+            "created_by_id",
+            "created_at",
+        ),
+        date_field="created_at",
+        vehicle_field="vehicle",
+    ),
+    "fuel-logs": ExportSpec(
+        model=FuelLog,
+        fields=(
+            "id",
+            "vehicle_id",
+            "vehicle__license_plate",
+            "trip_id",
+            "liters",
+            "cost",
+            "odometer_reading",
+            "date",
+            "created_at",
+        ),
+        date_field="date",
+        vehicle_field="vehicle",
+    ),
+    "maintenance-logs": ExportSpec(
+        model=MaintenanceLog,
+        fields=(
+            "id",
+            "vehicle_id",
+            "vehicle__license_plate",
+            "description",
+            "cost",
+            "status",
+            "created_at",
+            "closed_at",
+        ),
+        date_field="created_at",
+        vehicle_field="vehicle",
+    ),
+    "activity": ExportSpec(
+        model=ActivityLog,
+        fields=(
+            "id",
+            "work_item_id",
+            "action",
+            "from_status",
+            "to_status",
+            "performed_by_id",
+            "timestamp",
+        ),
+        date_field="timestamp",
+        vehicle_field="work_item__vehicle",
+    ),
+}
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_rows(dataset, vehicle=None, date_from=None, date_to=None):
+    """
+    Lazily iterate ``dataset`` rows as tuples in EXPORTS field order.
+    """
+    spec = EXPORTS[dataset]
+    queryset = spec.model.objects.all()
+
+    if vehicle is not None:
+        queryset = queryset.filter(**{spec.vehicle_field: vehicle})
+
+    # Day-boundary ranges keep DateTimeField filters index-friendly.
+    is_datetime = spec.model._meta.get_field(spec.date_field).get_internal_type() == "DateTimeField"
+    if date_from is not None:
+        start = _day_start(date_from) if is_datetime else date_from
+        queryset = queryset.filter(**{f"{spec.date_field}__gte": start})
+    if date_to is not None:
+        if is_datetime:
+            queryset = queryset.filter(
+                **{f"{spec.date_field}__lt": _day_start(date_to + timedelta(days=1))}
+            )
+        else:
+            queryset = queryset.filter(**{f"{spec.date_field}__lte": date_to})
+
+    return (
+        queryset
+        .order_by("pk")
+        .values_list(*spec.fields)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+class _Echo:
+    # csv.writer target that hands each encoded line straight back.
+    def write(self, value):
+        return value
+
+
+def _chunked(lines):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_export(dataset, fmt, **filters):
+    """
+    Generator of encoded text chunks for a StreamingHttpResponse.
+    The CSV header is yielded before the query runs, so the client
+    gets its first byte immediately.
+    """
+    header = EXPORTS[dataset].fields
+    rows = export_rows(dataset, **filters)
+
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(header)
+        lines = (writer.writerow(row) for row in rows)
+    else:
+        lines = (
+            json.dumps(dict(zip(header, row)), default=str) + "\n"
+            for row in rows
+        )
+
+    # The queries run while the response streams, after the view has
+    # returned, so the export budget is applied here.
+    with statement_timeout("export"):
+        yield from _chunked(lines)
+
+
+_DONE = object()
+
+
+async def astream_export(dataset, fmt, **filters):
+    """
+    Async counterpart of stream_export() for ASGI responses. Every
+    chunk is produced on the same sync thread (thread_sensitive), so
+    the export's cursor and statement timeout stay on one connection.
+    """
+    chunks = stream_export(dataset, fmt, **filters)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await next_chunk(chunks, _DONE)) is not _DONE:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+def build_export_response(request, dataset, fmt):
+    """
+    StreamingHttpResponse for ``dataset`` in ``fmt`` (csv / ndjson),
+    filtered by the vehicle / date_from / date_to query parameters.
+    Shared by the workflow and finance export views.
+    """
+    if dataset not in EXPORTS or fmt not in CONTENT_TYPES:
+        raise Http404("Unknown export.")
+
+    filters = ExportFilterForm(request.GET)
+    if not filters.is_valid():
+        return HttpResponseBadRequest(filters.errors.as_text())
+
+    stream = astream_export if isinstance(request, ASGIRequest) else stream_export
+    response = StreamingHttpResponse(
+        stream(dataset, fmt, **filters.cleaned_data),
+        content_type=CONTENT_TYPES[fmt],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{dataset}.{fmt}"'
+    return response
@@ -1,72 +1,370 @@
-from apps.workflow.models import Vehicle, WorkItem, FuelLog
-from django.db.models import Sum
+import asyncio
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+
+from apps.workflow.models import (
+    Vehicle,
+    WorkItem,
+    FuelLog,
+    MaintenanceLog,
+    VehicleFinancials,
+    MonthlyFinanceRollup,
+)
+from django.db.models import (
+    Count,
+    DecimalField,
+    IntegerField,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from services.db_routing import analytics_reads
+from services.kpi_cache import cached_kpi
+from services.ranking_service import rank_vehicles
+
+# Models whose changes can move fleet cost figures (the rollup is
+# written through FuelLog/MaintenanceLog signals and the rebuild command).
+COST_MODELS = (Vehicle, FuelLog, MaintenanceLog, VehicleFinancials)
+
 
 # ==========================================================
 # Financial Aggregations
 # ==========================================================
 
+@cached_kpi(WorkItem)
 def fleet_total_revenue():
     return WorkItem.objects.aggregate(
         total=Sum("revenue")
     )["total"] or 0
 
 
+@cached_kpi(*COST_MODELS)
 def fleet_total_operational_cost():
-    total = 0
-    for vehicle in Vehicle.objects.all():
-        total += vehicle.total_operational_cost()
-    return total
+    # Reads the VehicleFinancials rollup: one pass over vehicles,
+    # independent of fuel/maintenance history size.
+    totals = Vehicle.objects.aggregate(
+        acquisition=Sum("acquisition_cost"),
+        fuel=Sum("financials__fuel_cost"),
+        maintenance=Sum("financials__maintenance_cost"),
+    )
+    return (
+        (totals["acquisition"] or 0)
+        + (totals["fuel"] or 0)
+        + (totals["maintenance"] or 0)
+    )
+
+
+@cached_kpi(FuelLog, VehicleFinancials)
+def fleet_total_fuel_cost():
+    return VehicleFinancials.objects.aggregate(
+        total=Sum("fuel_cost")
+    )["total"] or 0
+
+
+@cached_kpi(MaintenanceLog, VehicleFinancials)
+def fleet_total_maintenance_cost():
+    return VehicleFinancials.objects.aggregate(
+        total=Sum("maintenance_cost")
+    )["total"] or 0
+
+
+def vehicle_financials():
+    """
+    Every vehicle with its financial metrics annotated from the
+    rollup, materialized so it can cross thread boundaries.
+    """
+    return list(Vehicle.objects.with_rollup_financials())
+
 
+@cached_kpi(*COST_MODELS)
+def costliest_vehicles(limit=5):
+    """
+    [(vehicle name, operational cost), ...] for the ``limit`` vehicles
+    with the highest operational cost.
+    """
+    return [
+        (row["name"], row["value"])
+        for row in rank_vehicles("cost", k=limit)
+    ]
 
+
+@cached_kpi(WorkItem, *COST_MODELS)
 def fleet_total_profit():
     return fleet_total_revenue() - fleet_total_operational_cost()
 
 
+def _current_month_range():
+    today = timezone.localdate()
+    start = today.replace(day=1)
+    if start.month == 12:
+        end = date(start.year + 1, 1, 1)
+    else:
+        end = date(start.year, start.month + 1, 1)
+    return start, end
+
+
+@cached_kpi(FuelLog, MonthlyFinanceRollup, vary=_current_month_range)
 def fuel_cost_this_month():
-    now = timezone.now()
-    return FuelLog.objects.filter(
-        date__year=now.year,
-        date__month=now.month
+    start, _ = _current_month_range()
+    return MonthlyFinanceRollup.objects.filter(
+        month=start,
+        metric=MonthlyFinanceRollup.Metric.FUEL_COST,
     ).aggregate(
-        total=Sum("cost")
+        total=Sum("amount")
     )["total"] or 0
 
 
+@cached_kpi(WorkItem, FuelLog, MaintenanceLog, MonthlyFinanceRollup)
+def monthly_totals(metric):
+    """
+    [{"month": date, "total": Decimal}, ...] for one metric across the
+    whole fleet, read from MonthlyFinanceRollup.
+    """
+    return list(
+        MonthlyFinanceRollup.objects
+        .filter(metric=metric)
+        .values("month")
+        .annotate(total=Sum("amount"))
+        .order_by("month")
+    )
+
+
 # ==========================================================
 # Fleet State KPIs (Command Center)
 # ==========================================================
 
+@cached_kpi(Vehicle)
 def active_fleet():
     return Vehicle.objects.filter(
         status=Vehicle.Status.ON_TRIP
     ).count()
 
 
+@cached_kpi(Vehicle)
 def maintenance_alerts():
     return Vehicle.objects.filter(
         status=Vehicle.Status.IN_SHOP
     ).count()
 
 
+@cached_kpi(Vehicle)
 def total_active_vehicles():
     return Vehicle.objects.exclude(
         status=Vehicle.Status.RETIRED
     ).count()
 
 
-def utilization_rate():
-    total = total_active_vehicles()
-    active = active_fleet()
-
+def _utilization(active, total):
     if total == 0:
         return 0
 
     return round((active / total) * 100, 2)
 
 
+@cached_kpi(Vehicle)
+def utilization_rate():
+    counts = Vehicle.objects.aggregate(
+        active=Count("pk", filter=Q(status=Vehicle.Status.ON_TRIP)),
+        total=Count("pk", filter=~Q(status=Vehicle.Status.RETIRED)),
+    )
+    return _utilization(counts["active"], counts["total"])
+
+
+@cached_kpi(WorkItem)
 def pending_cargo():
     return WorkItem.objects.filter(
         status=WorkItem.TripStatus.DRAFT
-    ).count()
\ No newline at end of file
+    ).count()
+
+
+# ==========================================================
+# Dashboard Snapshot
+# ==========================================================
+
+@dataclass(frozen=True)
+class FleetKPISnapshot:
+    active_fleet: int
+    maintenance_alerts: int
+    total_active_vehicles: int
+    utilization_rate: float
+    pending_cargo: int
+    total_revenue: Decimal
+    total_operational_cost: Decimal
+    total_profit: Decimal
+    fuel_cost_this_month: Decimal
+
+
+def _total(queryset, aggregate, output_field):
+    """
+    Uncorrelated scalar subquery computing ``aggregate`` over the
+    whole of ``queryset``, coalesced to 0: the _sum_subquery pattern
+    grouped by a constant instead of the outer vehicle.
+    """
+    subquery = (
+        queryset
+        .order_by()
+        .annotate(_all=Value(1))
+        .values("_all")
+        .annotate(total=aggregate)
+        .values("total")
+    )
+    return Coalesce(
+        Subquery(subquery, output_field=output_field),
+        Value(0),
+        output_field=output_field,
+    )
+
+
+@cached_kpi(
+    WorkItem, MonthlyFinanceRollup, *COST_MODELS, vary=_current_month_range
+)
+def fleet_kpi_snapshot():
+    """
+    Every number shown on fleet_dashboard, computed in one SQL
+    statement: conditional counts and rollup sums over vehicles,
+    plus scalar subqueries for trip and fuel figures.
+    """
+    money = DecimalField(max_digits=14, decimal_places=2)
+    start, _ = _current_month_range()
+
+    rows = list(
+        Vehicle.objects
+        .annotate(_all=Value(1))
+        .values("_all")
+        .annotate(
+            active_fleet=Count("pk", filter=Q(status=Vehicle.Status.ON_TRIP)),
+            maintenance_alerts=Count(
+                "pk", filter=Q(status=Vehicle.Status.IN_SHOP)
+            ),
+            total_active_vehicles=Count(
+                "pk", filter=~Q(status=Vehicle.Status.RETIRED)
+            ),
+            acquisition=Coalesce(
+                Sum("acquisition_cost"), Value(0), output_field=money
+            ),
+            fuel=Coalesce(
+                Sum("financials__fuel_cost"), Value(0), output_field=money
+            ),
+            maintenance=Coalesce(
+                Sum("financials__maintenance_cost"), Value(0), output_field=money
+            ),
+            pending_cargo=_total(
+                WorkItem.objects.filter(status=WorkItem.TripStatus.DRAFT),
+                Count("pk"),
+                IntegerField(),
+            ),
+            total_revenue=_total(WorkItem.objects.all(), Sum("revenue"), money),
+            fuel_cost_this_month=_total(
+                MonthlyFinanceRollup.objects.filter(
+                    month=start,
+                    metric=MonthlyFinanceRollup.Metric.FUEL_COST,
+                ),
+                Sum("amount"),
+                money,
+            ),
+        )
+    )
+
+    if rows:
+        row = rows[0]
+    else:
+        # No vehicles means no group and no row; read the trip and
+        # rollup figures on their own.
+        row = {
+            "active_fleet": 0,
+            "maintenance_alerts": 0,
+            "total_active_vehicles": 0,
+            "acquisition": 0,
+            "fuel": 0,
+            "maintenance": 0,
+            "pending_cargo": pending_cargo.uncached(),
+            "total_revenue": fleet_total_revenue.uncached(),
+            "fuel_cost_this_month": fuel_cost_this_month.uncached(),
+        }
+
+    operational_cost = row["acquisition"] + row["fuel"] + row["maintenance"]
+
+    return FleetKPISnapshot(
+        active_fleet=row["active_fleet"],
+        maintenance_alerts=row["maintenance_alerts"],
+        total_active_vehicles=row["total_active_vehicles"],
+        utilization_rate=_utilization(
+            row["active_fleet"], row["total_active_vehicles"]
+        ),
+        pending_cargo=row["pending_cargo"],
+        total_revenue=row["total_revenue"],
+        total_operational_cost=operational_cost,
+        total_profit=row["total_revenue"] - operational_cost,
+        fuel_cost_this_month=row["fuel_cost_this_month"],
+    )
+
+
+# ==========================================================
+# Async variants
+# ==========================================================
+#
+# Each a* function runs its sync counterpart (caching included) via
+# sync_to_async, so both paths share one implementation. With
+# settings.KPI_PARALLEL_QUERIES the calls run on separate worker
+# threads, each with its own database connection, so asyncio.gather()
+# overlaps the queries; otherwise they run one after another on the
+# request's connection (required for SQLite and TestCase transactions).
+# Async variants always read through analytics_reads(), i.e. from the
+# replica when one is configured.
+
+def _parallel():
+    return getattr(settings, "KPI_PARALLEL_QUERIES", False)
+
+
+def _async_variant(func):
+
+    def in_worker_thread(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # Worker threads own their connections; retire them the way
+            # the request cycle would.
+            close_old_connections()
+
+    @wraps(func)
+    @analytics_reads()
+    async def wrapper(*args, **kwargs):
+        if _parallel():
+            return await sync_to_async(
+                in_worker_thread, thread_sensitive=False
+            )(*args, **kwargs)
+        return await sync_to_async(func)(*args, **kwargs)
+
+    return wrapper
+
+
+afleet_total_revenue = _async_variant(fleet_total_revenue)
+afleet_total_operational_cost = _async_variant(fleet_total_operational_cost)
+afleet_total_fuel_cost = _async_variant(fleet_total_fuel_cost)
+afleet_total_maintenance_cost = _async_variant(fleet_total_maintenance_cost)
+afleet_total_profit = _async_variant(fleet_total_profit)
+avehicle_financials = _async_variant(vehicle_financials)
+acostliest_vehicles = _async_variant(costliest_vehicles)
+afuel_cost_this_month = _async_variant(fuel_cost_this_month)
+amonthly_totals = _async_variant(monthly_totals)
+afleet_kpi_snapshot = _async_variant(fleet_kpi_snapshot)
+
+
+async def gather_kpis(**calls):
+    """
+    Await several async KPI calls concurrently:
+    ``await gather_kpis(revenue=afleet_total_revenue(), ...)`` returns
+    ``{"revenue": ..., ...}``.
+    """
+    values = await asyncio.gather(*calls.values())
+    return dict(zip(calls, values))
@@ -0,0 +1,231 @@
+from django.db import connections, router
+
+from apps.workflow.models import FuelLog
+
+"""
+Fuel efficiency and refuel anomaly detection.
+
+Everything runs in one SQL statement over workflow_fuellog using
+window functions (SQLite >= 3.28 and PostgreSQL):
+
+1. LAG(odometer_reading) per vehicle, in (date, odometer, id) order,
+   gives each refuel the distance driven since the previous one and
+   from that km/L and fuel cost per km.
+2. A rolling baseline of the vehicle's previous BASELINE_WINDOW
+   refuels (AVG over a ROWS frame, variance as E[x^2] - E[x]^2)
+   scores each refuel with a z-score for both figures.
+3. A refuel is flagged when its efficiency is Z_THRESHOLD standard
+   deviations below the baseline, its cost per km that far above it,
+   or the odometer did not move at all (a refuel with no progress).
+
+The database returns only summary rows or the flagged refuels, so
+the row count reaching Python does not grow with FuelLog. Baselines
+look back over each vehicle's whole history up to ``date_to``;
+``date_from`` only limits what is reported.
+"""
+
+BASELINE_WINDOW = 10
+MIN_BASELINE_SAMPLES = 4
+Z_THRESHOLD = 3.0
+# Floor for the baseline standard deviation, as a fraction of the
+# baseline mean, so near-constant histories do not turn rounding
+# noise into outliers: with the defaults a refuel must be at least
+# 15 % off its baseline to be flagged.
+MIN_RELATIVE_SPREAD = 0.05
+
+MAX_ANOMALIES = 500
+
+# Float arithmetic on both backends (Postgres would otherwise keep
+# NUMERIC; SQLite reads the type name as REAL affinity).
+_FLOAT = "DOUBLE PRECISION"
+
+
+def _z_score(value, mean, mean_sq):
+    variance = f"({mean_sq} - {mean} * {mean})"
+    floor = f"({mean} * {MIN_RELATIVE_SPREAD}) * ({mean} * {MIN_RELATIVE_SPREAD})"
+    return (
+        f"CASE WHEN baseline_samples >= {MIN_BASELINE_SAMPLES} AND {mean} > 0 "
+        f"THEN ({value} - {mean}) / SQRT("
+        f"CASE WHEN {variance} > {floor} THEN {variance} ELSE {floor} END) END"
+    )
+
+
+REFUELS_SQL = f"""
+WITH refuels AS (
+    SELECT id, vehicle_id, trip_id, date, liters, cost, odometer_reading,
+           odometer_reading - LAG(odometer_reading) OVER vehicle_order AS distance
+    FROM workflow_fuellog
+    {{where}}
+    WINDOW vehicle_order AS (PARTITION BY vehicle_id ORDER BY date, odometer_reading, id)
+),
+efficiency AS (
+    SELECT refuels.*,
+           CASE WHEN distance > 0 AND liters > 0
+                THEN CAST(distance AS {_FLOAT}) / CAST(liters AS {_FLOAT}) END AS km_per_liter,
+           CASE WHEN distance > 0
+                THEN CAST(cost AS {_FLOAT}) / CAST(distance AS {_FLOAT}) END AS cost_per_km
+    FROM refuels
+),
+baselines AS (
+    SELECT efficiency.*,
+           COUNT(km_per_liter) OVER previous AS baseline_samples,
+           AVG(km_per_liter) OVER previous AS baseline_km_per_liter,
+           AVG(km_per_liter * km_per_liter) OVER previous AS baseline_km_per_liter_sq,
+           AVG(cost_per_km) OVER previous AS baseline_cost_per_km,
+           AVG(cost_per_km * cost_per_km) OVER previous AS baseline_cost_per_km_sq
+    FROM efficiency
+    WINDOW previous AS (
+        PARTITION BY vehicle_id ORDER BY date, odometer_reading, id
+        ROWS BETWEEN {BASELINE_WINDOW} PRECEDING AND 1 PRECEDING
+    )
+),
+scored AS (
+    SELECT baselines.*,
+           {_z_score("km_per_liter", "baseline_km_per_liter", "baseline_km_per_liter_sq")}
+               AS efficiency_z,
+           {_z_score("cost_per_km", "baseline_cost_per_km", "baseline_cost_per_km_sq")}
+               AS cost_z
+    FROM baselines
+),
+flagged AS (
+    SELECT scored.*,
+           CASE WHEN distance IS NOT NULL AND distance <= 0 THEN 1
+                WHEN efficiency_z <= -{Z_THRESHOLD} OR cost_z >= {Z_THRESHOLD} THEN 1
+                ELSE 0 END AS is_anomaly
+    FROM scored
+)
+"""
+
+ANOMALY_COLUMNS = [
+    "id",
+    "vehicle_id",
+    "trip_id",
+    "date",
+    "liters",
+    "cost",
+    "odometer_reading",
+    "distance",
+    "km_per_liter",
+    "cost_per_km",
+    "baseline_km_per_liter",
+    "efficiency_z",
+    "cost_z",
+]
+
+
+def _alias():
+    return router.db_for_read(FuelLog) or "default"
+
+
+def _query(select, vehicle=None, date_from=None, date_to=None,
+           conditions=(), params_after=()):
+    """
+    Run the REFUELS_SQL pipeline followed by ``select``, whose
+    {report_where} receives the date_from filter and ``conditions``.
+    """
+    where, params = [], []
+    if vehicle is not None:
+        where.append("vehicle_id = %s")
+        params.append(vehicle)
+    if date_to is not None:
+        where.append("date <= %s")
+        params.append(date_to)
+
+    sql = REFUELS_SQL.format(
+        where=f"WHERE {' AND '.join(where)}" if where else "",
+    )
+
+    report = list(conditions)
+    if date_from is not None:
+        report.append("date >= %s")
+        params.append(date_from)
+    sql += select.format(
+        report_where=f"WHERE {' AND '.join(report)}" if report else ""
+    )
+    params += list(params_after)
+
+    with connections[_alias()].cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _rounded(row, *names, digits=3):
+    for name in names:
+        if row[name] is not None:
+            row[name] = round(float(row[name]), digits)
+    return row
+
+
+# ==========================================================
+# Reports
+# ==========================================================
+
+def vehicle_efficiency(date_from=None, date_to=None, vehicle=None):
+    """
+    One row per vehicle with refuels in the range: refuel count,
+    distance, liters (of refuels with a measurable distance), overall
+    km/L and cost per km, and the number of flagged refuels. Least
+    efficient first; vehicles without a measurable km/L last.
+    """
+    rows = _query(
+        f"""
+        SELECT * FROM (
+            SELECT vehicle_id,
+                   COUNT(*) AS refuels,
+                   SUM(CASE WHEN distance > 0 THEN distance ELSE 0 END) AS distance,
+                   SUM(CASE WHEN distance > 0 THEN liters ELSE 0 END) AS liters,
+                   CAST(SUM(CASE WHEN distance > 0 THEN distance ELSE 0 END) AS {_FLOAT})
+                       / NULLIF(CAST(SUM(CASE WHEN distance > 0 THEN liters ELSE 0 END) AS {_FLOAT}), 0)
+                       AS km_per_liter,
+                   CAST(SUM(CASE WHEN distance > 0 THEN cost ELSE 0 END) AS {_FLOAT})
+                       / NULLIF(CAST(SUM(CASE WHEN distance > 0 THEN distance ELSE 0 END) AS {_FLOAT}), 0)
+                       AS cost_per_km,
+                   SUM(is_anomaly) AS anomalies
+            FROM flagged
+            {{report_where}}
+            GROUP BY vehicle_id
+        ) AS per_vehicle
+        ORDER BY CASE WHEN km_per_liter IS NULL THEN 1 ELSE 0 END,
+                 km_per_liter, vehicle_id
+        """,
+        vehicle=vehicle,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    for row in rows:
+        row["liters"] = float(row["liters"] or 0)
+        _rounded(row, "km_per_liter", "cost_per_km")
+    return rows
+
+
+def fuel_anomalies(date_from=None, date_to=None, vehicle=None, limit=100):
+    """
+    Flagged refuels, newest first, at most ``limit`` (capped at
+    MAX_ANOMALIES), with the figures that triggered them.
+    """
+    rows = _query(
+        f"""
+        SELECT {", ".join(ANOMALY_COLUMNS)} FROM flagged
+        {{report_where}}
+        ORDER BY date DESC, id DESC
+        LIMIT %s
+        """,
+        vehicle=vehicle,
+        date_from=date_from,
+        date_to=date_to,
+        conditions=["is_anomaly = 1"],
+        params_after=[max(1, min(limit, MAX_ANOMALIES))],
+    )
+    for row in rows:
+        row["liters"] = float(row["liters"])
+        row["cost"] = float(row["cost"])
+        _rounded(
+            row,
+            "km_per_liter",
+            "cost_per_km",
+            "baseline_km_per_liter",
+            "efficiency_z",
+            "cost_z",
+        )
+    return rows
@@ -0,0 +1,159 @@
+import hashlib
+import threading
+import time
+import zlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from services.db_routing import analytics_alias
+
+"""
+Event-invalidated cache for finance/KPI service functions.
+
+Each cached function declares the models it reads. Cache keys embed
+a per-model generation counter, so a save or delete on one model
+(signalled from apps.workflow.signals) only orphans the entries that
+depend on it. A TTL (settings.KPI_CACHE_TIMEOUT) bounds staleness if
+an invalidation is ever missed.
+
+Generations start from time.time_ns() rather than 0, so a counter
+the cache evicted never comes back at a value older entries were
+stored under.
+
+Keys also carry the database alias the value is read from. Values
+computed on the analytics replica are never served to requests pinned
+to the primary (read-your-writes), and expire after
+REPLICA_PIN_SECONDS, the replication lag pinning already allows for.
+
+Concurrent misses on the same key are coalesced (single-flight):
+threads in one process share a striped lock, and processes share a
+short-lived cache.add() lock while one of them recomputes.
+"""
+
+_MISSING = object()
+
+# Striped locks keep memory bounded however many keys exist.
+_LOCKS = [threading.Lock() for _ in range(64)]
+
+LOCK_TIMEOUT = 30
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _cache():
+    return caches[getattr(settings, "KPI_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "KPI_CACHE_TIMEOUT", 300)
+
+
+def _generation_key(label):
+    return f"kpi:gen:{label}"
+
+
+def _generations(labels):
+    cache = _cache()
+    keys = [_generation_key(label) for label in labels]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        found.update(cache.get_many(missing))
+    return [found.get(key, 0) for key in keys]
+
+
+def _bump(label):
+    cache = _cache()
+    key = _generation_key(label)
+    # add() seeds the counter without racing another process's incr().
+    cache.add(key, time.time_ns(), None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_kpis(model):
+    """
+    Orphan every cached value that depends on ``model``.
+
+    Bumps immediately (same-request readers see fresh data) and again
+    on commit, so a reader that recomputed from pre-commit data in
+    between cannot leave a stale entry behind.
+    """
+    label = model._meta.label_lower
+    _bump(label)
+    transaction.on_commit(lambda: _bump(label))
+
+
+def _get_or_compute(key, compute, timeout):
+    cache = _cache()
+
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    with _LOCKS[zlib.crc32(key.encode()) % len(_LOCKS)]:
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        lock_key = f"{key}:lock"
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            # Another process is computing; wait for its result.
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                value = cache.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+
+    return value
+
+
+def cached_kpi(*models, vary=None):
+    """
+    Cache a service function's result until one of ``models`` changes.
+
+    ``vary`` is an optional callable whose return value is folded into
+    the key, for results that also depend on time (e.g. current month).
+    The undecorated function stays available as ``func.uncached``.
+    """
+    labels = sorted(model._meta.label_lower for model in models)
+
+    def decorator(func):
+        prefix = f"kpi:{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            alias = analytics_alias()
+            parts = [prefix, alias or "default", *map(str, _generations(labels))]
+            variant = (
+                vary() if vary is not None else None,
+                args,
+                sorted(kwargs.items()),
+            )
+            if variant != (None, (), []):
+                parts.append(hashlib.md5(repr(variant).encode()).hexdigest())
+            key = ":".join(parts)
+
+            timeout = _timeout()
+            if alias:
+                timeout = min(timeout, getattr(settings, "REPLICA_PIN_SECONDS", 10))
+
+            return _get_or_compute(key, lambda: func(*args, **kwargs), timeout)
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
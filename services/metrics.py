@@ -0,0 +1,271 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.db import connections
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates
+
+"""
+Per-request instrumentation exported in Prometheus text format.
+
+RequestMetricsMiddleware records, per URL name:
+  - request latency (until the view returns a response)
+  - number of SQL queries and time spent in them, through
+    connection.execute_wrapper on every configured alias
+  - template render time, through the InstrumentedTemplates backend
+
+metrics_view serves the registry at /metrics. Series live in process
+memory, so each worker exposes its own; Prometheus sums across
+targets. Queries run on sync_to_async worker threads with
+KPI_PARALLEL_QUERIES are not attributed to the request.
+
+Configured by METRICS_ENABLED, METRICS_TOKEN and the
+METRICS_*_BUCKETS settings.
+"""
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_current = ContextVar("fleetflow_request_metrics", default=None)
+
+
+# ==========================================================
+# Registry
+# ==========================================================
+
+def _escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labels, labels)} {value}"
+
+
+class Histogram:
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0
+                ]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = {
+                labels: (list(counts), total, count)
+                for labels, (counts, total, count) in self._series.items()
+            }
+        for labels, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            bounds = [*(repr(float(b)) for b in self.buckets), "+Inf"]
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                label_str = _labels(self.labels, labels, [("le", bound)])
+                yield f"{self.name}_bucket{label_str} {cumulative}"
+            label_str = _labels(self.labels, labels)
+            yield f"{self.name}_sum{label_str} {total}"
+            yield f"{self.name}_count{label_str} {count}"
+
+
+def _buckets(setting, default):
+    return getattr(settings, setting, default)
+
+
+REQUESTS = Counter(
+    "fleetflow_requests_total",
+    "HTTP requests by view, method and status code.",
+    ("view", "method", "status"),
+)
+REQUEST_LATENCY = Histogram(
+    "fleetflow_request_duration_seconds",
+    "Time until the view returned a response.",
+    ("view", "method"),
+    _buckets("METRICS_LATENCY_BUCKETS", LATENCY_BUCKETS),
+)
+SQL_QUERIES = Histogram(
+    "fleetflow_request_sql_queries",
+    "SQL queries executed per request.",
+    ("view",),
+    _buckets("METRICS_QUERY_COUNT_BUCKETS", QUERY_COUNT_BUCKETS),
+)
+SQL_LATENCY = Histogram(
+    "fleetflow_request_sql_duration_seconds",
+    "Time spent executing SQL per request.",
+    ("view",),
+    _buckets("METRICS_LATENCY_BUCKETS", LATENCY_BUCKETS),
+)
+TEMPLATE_LATENCY = Histogram(
+    "fleetflow_request_template_duration_seconds",
+    "Time spent rendering templates per request.",
+    ("view",),
+    _buckets("METRICS_LATENCY_BUCKETS", LATENCY_BUCKETS),
+)
+
+REGISTRY = [REQUESTS, REQUEST_LATENCY, SQL_QUERIES, SQL_LATENCY, TEMPLATE_LATENCY]
+
+
+def render_metrics(registry=REGISTRY):
+    lines = []
+    for metric in registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# ==========================================================
+# Request instrumentation
+# ==========================================================
+
+class RequestStats:
+
+    __slots__ = ("queries", "sql_time", "template_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook.
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+
+
+class RequestMetricsMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else "<unresolved>"
+
+        if view != "metrics":
+            REQUESTS.inc(view, request.method, str(response.status_code))
+            REQUEST_LATENCY.observe(elapsed, view, request.method)
+            SQL_QUERIES.observe(stats.queries, view)
+            SQL_LATENCY.observe(stats.sql_time, view)
+            TEMPLATE_LATENCY.observe(stats.template_time, view)
+        return response
+
+
+class _TimedTemplate:
+
+    def __init__(self, wrapped):
+        self._wrapped = wrapped
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return self._wrapped.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self._wrapped.render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """
+    The Django template backend, timing top-level renders for
+    RequestMetricsMiddleware.
+    """
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Scrapers must send
+    ``Authorization: Bearer <METRICS_TOKEN>``; without a token set the
+    endpoint is only served when DEBUG is on.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token:
+        if not settings.DEBUG:
+            raise PermissionDenied
+    elif request.headers.get("Authorization") != f"Bearer {token}":
+        raise PermissionDenied
+
+    return HttpResponse(
+        render_metrics(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,114 @@
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, NullIf
+
+from apps.workflow.models import Vehicle
+
+"""
+Per-vehicle financial rankings.
+
+rank_vehicles() orders the fleet by one metric with RANK() and gives
+each vehicle its PERCENT_RANK() within its vehicle_type, both window
+functions over one row of figures per vehicle, so the database
+returns only the K rows asked for however many vehicles there are.
+
+Without a date range the figures are all-time and come from the
+VehicleFinancials rollup: cost is the operational cost including
+acquisition and distance is the odometer, as on Vehicle. With a range
+they are aggregated from the logs of that period
+(VehicleQuerySet.with_period_financials): cost is fuel + maintenance
+and distance comes from the odometer readings of its trips.
+"""
+
+METRICS = ("cost", "revenue", "profit", "cost_per_km")
+
+MAX_RANK_LIMIT = 100
+
+CENT = Decimal("0.01")
+
+
+def _ranking_queryset(date_from=None, date_to=None):
+    if date_from is None and date_to is None:
+        vehicles = Vehicle.objects.with_rollup_financials().annotate(
+            cost=F("operational_cost"),
+            revenue=F("revenue_sum"),
+            distance=F("odometer_current"),
+        )
+    else:
+        vehicles = Vehicle.objects.with_period_financials(
+            date_from, date_to
+        ).annotate(
+            cost=F("period_operational_cost"),
+            revenue=F("period_revenue"),
+            profit=F("period_profit"),
+            distance=F("period_distance"),
+        )
+
+    # Float division so SQLite does not truncate integral amounts;
+    # vehicles without distance get NULL and are left out.
+    return vehicles.annotate(
+        cost_per_km=Cast("cost", FloatField()) / NullIf(F("distance"), 0),
+    )
+
+
+def rank_vehicles(
+    metric,
+    k=10,
+    bottom=False,
+    date_from=None,
+    date_to=None,
+    vehicle_type=None,
+):
+    """
+    Top (or with ``bottom``, bottom) ``k`` vehicles by ``metric``, a
+    key of METRICS.
+
+    Returns dicts with id, name, license_plate, vehicle_type, value,
+    rank (1 = highest value, or lowest for ``bottom``; ties share a
+    rank) and type_percentile (0.0 lowest .. 1.0 highest value within
+    the vehicle type).
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown ranking metric: {metric}")
+
+    vehicles = _ranking_queryset(date_from, date_to)
+    if vehicle_type:
+        vehicles = vehicles.filter(vehicle_type=vehicle_type)
+    figures = vehicles.values(
+        "id", "name", "license_plate", "vehicle_type", value=F(metric)
+    )
+    inner, params = figures.query.get_compiler(using=figures.db).as_sql()
+
+    # The windows run over the per-vehicle figures as a derived table,
+    # so each vehicle's subqueries are evaluated once, not once per
+    # window / filter that mentions them.
+    direction = "ASC" if bottom else "DESC"
+    sql = f"""
+        SELECT id, name, license_plate, vehicle_type, value,
+               RANK() OVER (ORDER BY value {direction}) AS rank,
+               PERCENT_RANK() OVER (
+                   PARTITION BY vehicle_type ORDER BY value
+               ) AS type_percentile
+        FROM ({inner}) AS vehicle_figures
+        WHERE value IS NOT NULL
+        ORDER BY rank, id
+        LIMIT %s
+    """
+    with connections[figures.db].cursor() as cursor:
+        cursor.execute(sql, (*params, max(1, min(k, MAX_RANK_LIMIT))))
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    for row in rows:
+        row["value"] = _normalize(metric, row["value"])
+        row["type_percentile"] = float(row["type_percentile"])
+    return rows
+
+
+def _normalize(metric, value):
+    # SQLite hands NUMERIC results back as int / float.
+    if metric == "cost_per_km":
+        return float(value)
+    return Decimal(str(value)).quantize(CENT)
@@ -0,0 +1,202 @@
+from decimal import Decimal
+
+from django.db.models import Count, Max, Sum
+
+from apps.workflow.models import ActivityLog, FuelLog, TripFinancials, WorkItem
+
+"""
+Per-trip P&L snapshots (TripFinancials).
+
+snapshot_trips() computes the figures of completed trips from their
+own row and fuel logs with one query for any number of trips, and
+upserts them. transition() / transition_many() call it when trips
+complete; the backfill command calls it in batches.
+
+A trip's cost is its actual fuel cost: maintenance and acquisition
+belong to the vehicle, not to a trip. margin is profit / revenue as a
+fraction (0.25 = 25 %), left empty when revenue is so small that the
+ratio does not fit the column (|margin| > MAX_MARGIN).
+
+Fuel logs saved or deleted against a completed trip refresh its
+snapshot through refresh_snapshots() (apps.workflow.signals).
+
+profitability() aggregates the snapshots by vehicle, driver or lane.
+"""
+
+CENT = Decimal("0.01")
+RATIO = Decimal("0.0001")
+
+# Largest |margin| TripFinancials.margin (max_digits=9, 4 places) holds.
+MAX_MARGIN = Decimal("99999.9999")
+
+SNAPSHOT_FIELDS = [
+    "vehicle",
+    "driver",
+    "origin",
+    "destination",
+    "completed_at",
+    "distance",
+    "revenue",
+    "fuel_cost",
+    "fuel_variance",
+    "profit",
+    "revenue_per_km",
+    "margin",
+]
+
+
+def _margin(profit, revenue):
+    if not revenue:
+        return None
+    margin = (profit / revenue).quantize(RATIO)
+    return margin if abs(margin) <= MAX_MARGIN else None
+
+
+def build_snapshot(work_item, fuel_cost, completed_at):
+    revenue = work_item.revenue or Decimal("0")
+    fuel_cost = fuel_cost or Decimal("0")
+    profit = revenue - fuel_cost
+
+    distance = None
+    if work_item.start_odometer is not None and work_item.end_odometer is not None:
+        distance = max(work_item.end_odometer - work_item.start_odometer, 0)
+
+    fuel_variance = None
+    if work_item.estimated_fuel_cost is not None:
+        fuel_variance = fuel_cost - work_item.estimated_fuel_cost
+
+    return TripFinancials(
+        work_item=work_item,
+        vehicle_id=work_item.vehicle_id,
+        driver_id=work_item.driver_id,
+        origin=work_item.origin or "",
+        destination=work_item.destination or "",
+        completed_at=completed_at,
+        distance=distance,
+        revenue=revenue,
+        fuel_cost=fuel_cost,
+        fuel_variance=fuel_variance,
+        profit=profit,
+        revenue_per_km=(
+            (revenue / distance).quantize(CENT) if distance else None
+        ),
+        margin=_margin(profit, revenue),
+    )
+
+
+def snapshot_trips(work_items, completed_at=None):
+    """
+    Write (or overwrite) the snapshots of ``work_items``.
+
+    ``completed_at`` is one time for all trips or a {trip id: time}
+    dict. Trips it does not cover use their updated_at, which is the
+    completion time when called right after the transition.
+    """
+    work_items = list(work_items)
+    if not work_items:
+        return []
+    if not isinstance(completed_at, dict):
+        completed_at = {work_item.pk: completed_at for work_item in work_items}
+
+    fuel = dict(
+        FuelLog.objects
+        .filter(trip_id__in=[work_item.pk for work_item in work_items])
+        .values_list("trip_id")
+        .annotate(total=Sum("cost"))
+        .order_by()
+    )
+    snapshots = [
+        build_snapshot(
+            work_item,
+            fuel.get(work_item.pk),
+            completed_at.get(work_item.pk) or work_item.updated_at,
+        )
+        for work_item in work_items
+    ]
+    TripFinancials.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=["work_item"],
+        update_fields=SNAPSHOT_FIELDS,
+    )
+    return snapshots
+
+
+def refresh_snapshots(work_item_ids):
+    """
+    Recompute the existing snapshots of ``work_item_ids`` from their
+    trips' current fuel logs, keeping each completed_at. Trips without
+    a snapshot (not completed) are skipped.
+    """
+    completed_at = dict(
+        TripFinancials.objects
+        .filter(work_item_id__in=work_item_ids)
+        .values_list("work_item_id", "completed_at")
+    )
+    if not completed_at:
+        return []
+    return snapshot_trips(
+        WorkItem.objects.filter(
+            pk__in=completed_at, status=WorkItem.TripStatus.COMPLETED
+        ),
+        completed_at=completed_at,
+    )
+
+
+def completion_times(work_item_ids):
+    """
+    {trip id: time of its COMPLETED audit entry} for trips whose entry
+    is still in the ActivityLog table.
+    """
+    return dict(
+        ActivityLog.objects
+        .filter(
+            work_item_id__in=work_item_ids,
+            to_status=WorkItem.TripStatus.COMPLETED,
+        )
+        .values_list("work_item_id")
+        .annotate(at=Max("timestamp"))
+        .order_by()
+    )
+
+
+# ==========================================================
+# Reports
+# ==========================================================
+
+DIMENSIONS = {
+    "vehicle": ("vehicle_id",),
+    "driver": ("driver_id",),
+    "lane": ("origin", "destination"),
+}
+
+
+def profitability(dimension, date_from=None, date_to=None):
+    """
+    Completed-trip totals per vehicle, driver or lane (origin,
+    destination), most profitable first.
+    """
+    snapshots = TripFinancials.objects.all()
+    if date_from is not None:
+        snapshots = snapshots.filter(completed_at__gte=date_from)
+    if date_to is not None:
+        snapshots = snapshots.filter(completed_at__lt=date_to)
+
+    rows = list(
+        snapshots
+        .values(*DIMENSIONS[dimension])
+        .annotate(
+            trips=Count("pk"),
+            distance=Sum("distance"),
+            revenue=Sum("revenue"),
+            fuel_cost=Sum("fuel_cost"),
+            profit=Sum("profit"),
+        )
+        .order_by("-profit", *DIMENSIONS[dimension])
+    )
+    for row in rows:
+        row["margin"] = (
+            (row["profit"] / row["revenue"]).quantize(RATIO)
+            if row["revenue"] else None
+        )
+    return rows
@@ -0,0 +1,175 @@
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from apps.workflow.models import WorkItem
+
+"""
+Full-text search over trips (WorkItem title, description, origin and
+destination).
+
+SQLite: an external-content FTS5 table, workflow_workitem_fts, kept in
+sync with workflow_workitem by triggers. PostgreSQL: a generated
+tsvector column, search_vector, with a GIN index. Both are created by
+migration 0017 and follow every write (save(), update(), bulk_create,
+raw SQL) because the database maintains them.
+
+Queries are free text. Each word is matched as a prefix and all words
+must match, so "mumb cem" finds "Cement to Mumbai". Results come back
+best match first.
+
+SQLite drops the triggers when Django rebuilds workflow_workitem for
+a schema change; run `manage.py rebuild_trip_search` after such a
+migration. On backends without full-text support, search falls back
+to icontains.
+"""
+
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TERMS = 8
+
+SQLITE_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS workflow_workitem_fts USING fts5(
+        title, description, origin, destination,
+        content='workflow_workitem', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS workflow_workitem_fts_ai AFTER INSERT ON workflow_workitem BEGIN
+        INSERT INTO workflow_workitem_fts(rowid, title, description, origin, destination)
+        VALUES (new.id, new.title, new.description, new.origin, new.destination);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS workflow_workitem_fts_ad AFTER DELETE ON workflow_workitem BEGIN
+        INSERT INTO workflow_workitem_fts(workflow_workitem_fts, rowid, title, description, origin, destination)
+        VALUES ('delete', old.id, old.title, old.description, old.origin, old.destination);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS workflow_workitem_fts_au
+    AFTER UPDATE OF title, description, origin, destination ON workflow_workitem BEGIN
+        INSERT INTO workflow_workitem_fts(workflow_workitem_fts, rowid, title, description, origin, destination)
+        VALUES ('delete', old.id, old.title, old.description, old.origin, old.destination);
+        INSERT INTO workflow_workitem_fts(rowid, title, description, origin, destination)
+        VALUES (new.id, new.title, new.description, new.origin, new.destination);
+    END
+    """,
+]
+
+# Column weights for bm25(): title, description, origin, destination.
+SQLITE_RANK = "bm25(workflow_workitem_fts, 10.0, 1.0, 4.0, 4.0)"
+
+
+def terms(query):
+    return TERM_RE.findall(query.lower())[:MAX_TERMS]
+
+
+def _fts5_query(words):
+    # Quoted so that FTS5 operators typed by users are plain text.
+    return " AND ".join(f'"{word}"*' for word in words)
+
+
+def _tsquery(words):
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def _alias():
+    return router.db_for_read(WorkItem) or "default"
+
+
+# ==========================================================
+# Queries
+# ==========================================================
+
+def matching(queryset, query):
+    """
+    Narrow ``queryset`` to trips matching ``query`` (no ordering).
+    """
+    words = terms(query)
+    if not words:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        return queryset.filter(pk__in=RawSQL(
+            "SELECT rowid FROM workflow_workitem_fts WHERE workflow_workitem_fts MATCH %s",
+            (_fts5_query(words),),
+        ))
+    if vendor == "postgresql":
+        return queryset.filter(pk__in=RawSQL(
+            "SELECT id FROM workflow_workitem WHERE search_vector @@ to_tsquery('english', %s)",
+            (_tsquery(words),),
+        ))
+
+    condition = Q()
+    for word in words:
+        condition &= (
+            Q(title__icontains=word)
+            | Q(description__icontains=word)
+            | Q(origin__icontains=word)
+            | Q(destination__icontains=word)
+        )
+    return queryset.filter(condition)
+
+
+def search_trips(query, limit=20):
+    """
+    Best ``limit`` matches for ``query`` as a list of (pk, rank), rank
+    descending. The rank is backend-specific and only meaningful for
+    ordering.
+    """
+    words = terms(query)
+    if not words:
+        return []
+
+    alias = _alias()
+    vendor = connections[alias].vendor
+
+    if vendor == "sqlite":
+        sql = (
+            f"SELECT rowid, -{SQLITE_RANK} AS rank FROM workflow_workitem_fts "
+            "WHERE workflow_workitem_fts MATCH %s ORDER BY rank DESC LIMIT %s"
+        )
+        params = (_fts5_query(words), limit)
+    elif vendor == "postgresql":
+        sql = (
+            "SELECT id, ts_rank(search_vector, query) AS rank "
+            "FROM workflow_workitem, to_tsquery('english', %s) query "
+            "WHERE search_vector @@ query ORDER BY rank DESC LIMIT %s"
+        )
+        params = (_tsquery(words), limit)
+    else:
+        pks = matching(WorkItem.objects.using(alias), query).order_by(
+            "-created_at", "-pk"
+        ).values_list("pk", flat=True)[:limit]
+        return [(pk, 0.0) for pk in pks]
+
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(pk, float(rank)) for pk, rank in cursor.fetchall()]
+
+
+# ==========================================================
+# Maintenance
+# ==========================================================
+
+def rebuild(using="default"):
+    """
+    Recreate the SQLite index objects if missing and reindex every
+    trip. PostgreSQL maintains its generated column itself.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+
+    with connection.cursor() as cursor:
+        for sql in SQLITE_SCHEMA:
+            cursor.execute(sql)
+        cursor.execute(
+            "INSERT INTO workflow_workitem_fts(workflow_workitem_fts) VALUES ('rebuild')"
+        )
+    return True
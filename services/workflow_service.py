@@ -1,6 +1,15 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+
 from django.core.exceptions import ValidationError
-from apps.workflow.models import WorkItem, ActivityLog
+from django.db import IntegrityError, transaction
+from django.db.models import Q, prefetch_related_objects
+from django.utils import timezone
+
+from apps.workflow.models import WorkItem
 from apps.workflow.models import MaintenanceLog
+from services import audit, trip_financials
+from services.kpi_cache import invalidate_kpis
 
 ALLOWED_TRANSITIONS = {
     WorkItem.TripStatus.DRAFT: [
@@ -19,8 +28,138 @@ ALLOWED_TRANSITIONS = {
     WorkItem.TripStatus.CANCELLED: [],
 }
 
+ACTIVE_STATUSES = [
+    WorkItem.TripStatus.DISPATCHED,
+    WorkItem.TripStatus.IN_PROGRESS,
+]
 
-def transition(work_item, new_status, user):
+# Fields validated in memory before a status change. FKs are left out
+# because they are already loaded and checked by the dispatch rules.
+CLEAN_EXCLUDE = ["vehicle", "driver", "created_by"]
+
+
+# ==========================================================
+# Database-enforced invariants
+# ==========================================================
+
+def _constraint_messages():
+    """
+    Map both the constraint name (Postgres error text) and the
+    "table.column" SQLite reports for a failed partial unique index
+    to the constraint's user-facing message.
+    """
+    messages = {}
+    for model in (WorkItem, MaintenanceLog):
+        for constraint in model._meta.constraints:
+            message = constraint.violation_error_message
+            messages[constraint.name] = message
+            for field_name in constraint.fields:
+                column = model._meta.get_field(field_name).column
+                messages[f"{model._meta.db_table}.{column}"] = message
+    return messages
+
+
+CONSTRAINT_MESSAGES = _constraint_messages()
+
+
+@contextmanager
+def translate_integrity_errors():
+    """
+    Run a write in a savepoint and re-raise violations of the dispatch
+    unique constraints as ValidationError with the usual message.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        text = str(exc)
+        for key, message in CONSTRAINT_MESSAGES.items():
+            if key in text:
+                raise ValidationError(message) from exc
+        raise
+
+
+# ==========================================================
+# Conflict lookups
+# ==========================================================
+
+class _QueryConflicts:
+    """
+    Dispatch conflict checks for a single trip. Vehicle and driver
+    overlap are left to the unique constraints at save time.
+    """
+
+    def vehicle_in_maintenance(self, work_item):
+        return MaintenanceLog.objects.filter(
+            vehicle=work_item.vehicle,
+            status=MaintenanceLog.Status.OPEN
+        ).exists()
+
+    def vehicle_busy(self, work_item):
+        return False
+
+    def driver_busy(self, work_item):
+        return False
+
+    def claim(self, work_item):
+        pass
+
+
+class _BatchConflicts:
+    """
+    Dispatch conflict checks for many trips from three prefetched
+    sets. Trips dispatched earlier in the same batch claim their
+    vehicle and driver, so conflicts inside the batch are caught too.
+    """
+
+    def __init__(self, work_items):
+        vehicle_ids = {w.vehicle_id for w in work_items if w.vehicle_id}
+        driver_ids = {w.driver_id for w in work_items if w.driver_id}
+
+        self.maintenance = set(
+            MaintenanceLog.objects.filter(
+                vehicle_id__in=vehicle_ids,
+                status=MaintenanceLog.Status.OPEN,
+            ).values_list("vehicle_id", flat=True)
+        )
+
+        self.vehicle_trips = {}
+        self.driver_trips = {}
+        active = WorkItem.objects.filter(
+            status__in=ACTIVE_STATUSES,
+        ).filter(
+            Q(vehicle_id__in=vehicle_ids) | Q(driver_id__in=driver_ids)
+        ).values_list("id", "vehicle_id", "driver_id")
+
+        for trip_id, vehicle_id, driver_id in active:
+            if vehicle_id in vehicle_ids:
+                self.vehicle_trips.setdefault(vehicle_id, set()).add(trip_id)
+            if driver_id in driver_ids:
+                self.driver_trips.setdefault(driver_id, set()).add(trip_id)
+
+    def vehicle_in_maintenance(self, work_item):
+        return work_item.vehicle_id in self.maintenance
+
+    def vehicle_busy(self, work_item):
+        return bool(
+            self.vehicle_trips.get(work_item.vehicle_id, set()) - {work_item.id}
+        )
+
+    def driver_busy(self, work_item):
+        return bool(
+            self.driver_trips.get(work_item.driver_id, set()) - {work_item.id}
+        )
+
+    def claim(self, work_item):
+        self.vehicle_trips.setdefault(work_item.vehicle_id, set()).add(work_item.id)
+        self.driver_trips.setdefault(work_item.driver_id, set()).add(work_item.id)
+
+
+# ==========================================================
+# Transition rules
+# ==========================================================
+
+def _validate_transition(work_item, new_status, user, conflicts):
     current_status = work_item.status
 
     # Structural validation
@@ -51,39 +190,18 @@ def transition(work_item, new_status, user):
         if work_item.driver.status == work_item.driver.Status.OFF_DUTY:
             raise ValidationError("Driver is off duty.")
 
-        if work_item.vehicle.is_retired:
+        if work_item.vehicle.status == work_item.vehicle.Status.RETIRED:
             raise ValidationError("Retired vehicles cannot be dispatched.")
 
 
-        active_maintenance = MaintenanceLog.objects.filter(
-            vehicle=work_item.vehicle,
-            status=MaintenanceLog.Status.OPEN
-        ).exists()
-
-        if active_maintenance:
+        if conflicts.vehicle_in_maintenance(work_item):
             raise ValidationError("Vehicle is currently in maintenance.")
 
-        vehicle_active_trip = WorkItem.objects.filter(
-            vehicle=work_item.vehicle,
-            status__in=[
-                WorkItem.TripStatus.DISPATCHED,
-                WorkItem.TripStatus.IN_PROGRESS,
-            ],
-        ).exclude(id=work_item.id).exists()
-
-        if vehicle_active_trip:
+        if conflicts.vehicle_busy(work_item):
             raise ValidationError("Vehicle already assigned to an active trip.")
 
         # Prevent overlapping driver assignment
-        driver_active_trip = WorkItem.objects.filter(
-            driver=work_item.driver,
-            status__in=[
-                WorkItem.TripStatus.DISPATCHED,
-                WorkItem.TripStatus.IN_PROGRESS,
-            ],
-        ).exclude(id=work_item.id).exists()
-
-        if driver_active_trip:
+        if conflicts.driver_busy(work_item):
             raise ValidationError(
                 "Driver already assigned to an active trip."
             )
@@ -106,15 +224,137 @@ def transition(work_item, new_status, user):
                 "Only the assigned driver can complete the trip."
             )
 
+
+def transition(work_item, new_status, user):
+    _validate_transition(work_item, new_status, user, _QueryConflicts())
+
     # Apply transition
+    previous_status = work_item.status
     work_item.status = new_status
-    work_item.full_clean()
-    work_item.save()
+    try:
+        work_item.full_clean(exclude=CLEAN_EXCLUDE, validate_constraints=False)
+
+        with translate_integrity_errors():
+            work_item.save()
+
+            if new_status == WorkItem.TripStatus.COMPLETED:
+                trip_financials.snapshot_trips([work_item])
+
+            # Written after commit, batched per request.
+            audit.record(work_item, user, previous_status, new_status)
+    except ValidationError:
+        work_item.status = previous_status
+        raise
+
+    return work_item
+
+
+# ==========================================================
+# Batch transitions
+# ==========================================================
+
+@dataclass
+class TransitionResult:
+    work_item: WorkItem
+    ok: bool
+    error: str = ""
+
+
+def _save_each(accepted, results):
+    """
+    Save accepted (work_item, previous_status, result index) entries in
+    their own savepoints, turning constraint violations into failed
+    results. Returns the entries that were saved.
+    """
+    saved = []
+    for work_item, previous_status, index in accepted:
+        try:
+            with translate_integrity_errors():
+                work_item.save(update_fields=["status", "updated_at"])
+        except ValidationError as exc:
+            work_item.status = previous_status
+            results[index] = TransitionResult(
+                work_item, False, "; ".join(exc.messages)
+            )
+            continue
+        saved.append((work_item, previous_status, index))
+    return saved
+
+
+def transition_many(work_items, new_status, user):
+    """
+    Apply ``new_status`` to many trips with the same rules as
+    transition(), in a constant number of queries.
+
+    Conflict sets are prefetched once and every trip is validated in
+    memory, including conflicts between trips of the same batch. Valid
+    trips are saved with bulk_update and audited with bulk_create in
+    one transaction; invalid ones are left untouched. If a concurrent
+    dispatch makes bulk_update violate a unique constraint, trips are
+    saved one by one instead and only the conflicting ones fail.
+
+    Returns one TransitionResult per input trip, in input order.
+    """
+    work_items = list(work_items)
+    prefetch_related_objects(work_items, "vehicle", "driver__user")
+
+    results = []
+    accepted = []
+
+    with transaction.atomic():
+        conflicts = _BatchConflicts(work_items)
+        now = timezone.now()
+
+        for work_item in work_items:
+            previous_status = work_item.status
+            try:
+                _validate_transition(work_item, new_status, user, conflicts)
+                work_item.status = new_status
+                work_item.full_clean(
+                    exclude=CLEAN_EXCLUDE,
+                    validate_unique=False,
+                    validate_constraints=False,
+                )
+            except ValidationError as exc:
+                work_item.status = previous_status
+                results.append(
+                    TransitionResult(work_item, False, "; ".join(exc.messages))
+                )
+                continue
+
+            if new_status in ACTIVE_STATUSES:
+                conflicts.claim(work_item)
+
+            work_item.updated_at = now
+            accepted.append((work_item, previous_status, len(results)))
+            results.append(TransitionResult(work_item, True))
+
+        if accepted:
+            try:
+                with transaction.atomic():
+                    WorkItem.objects.bulk_update(
+                        [work_item for work_item, _, _ in accepted],
+                        ["status", "updated_at"],
+                    )
+            except IntegrityError:
+                # A concurrent dispatch slipped past the prefetched
+                # sets. Save one by one so only the conflicting trips
+                # fail.
+                accepted = _save_each(accepted, results)
+
+            accepted = [(work_item, previous) for work_item, previous, _ in accepted]
+
+            if new_status == WorkItem.TripStatus.COMPLETED:
+                trip_financials.snapshot_trips(
+                    [work_item for work_item, _ in accepted], completed_at=now
+                )
+
+            audit.record_many(
+                audit.build_entry(work_item, user, previous_status, new_status)
+                for work_item, previous_status in accepted
+            )
 
-    ActivityLog.objects.create(
-        work_item=work_item,
-        action=f"Status changed to {new_status}",
-        performed_by=user,
-    )
+            # bulk_update skips post_save, so invalidate explicitly.
+            invalidate_kpis(WorkItem)
 
-    return work_item
\ No newline at end of file
+    return results